@@ -3,6 +3,7 @@ from appdirs import user_data_dir
 import numpy as np
 # from scipy import ndimage
 from colormaps import apply_colormap
+from frame_decoder import FrameDecoder
 from PIL import Image, ImageTk
 import serial.tools.list_ports as list_ports
 import serial
@@ -105,10 +106,11 @@ class PressureSensorApp(tk.Tk):
         self.available_com_ports: list[str] = [port.name for port in list_ports.comports()]
 
         # Variable to hold the data that will be displayed on the heatmap
-        self.data: np.ndarray = np.zeros((10, 10))
+        self.data: np.ndarray = np.zeros((10, 10), dtype=np.uint16)
 
         # Variables for managing serial communication
         self.serialcomm: serial.Serial = serial.Serial()
+        self.frame_decoder: FrameDecoder = FrameDecoder()
         
         # Create the GUI state JSON file if it doesn't exist
         if not os.path.exists(STATE_FILE_PATH):
@@ -652,23 +654,9 @@ class PressureSensorApp(tk.Tk):
     def get_data_from_com_port(self) -> np.ndarray:
         return read_data.get_data_from_com_port(self)
  
-    def serial_read_uint16(self) -> int:
-        vals: bytes = self.serialcomm.read(2) # read two bytes of binary data
-        value = int.from_bytes(vals, 'little') # convert the bytes to an integer
-        return value
-    
     def serial_read_int_array(self) -> np.ndarray:
-        rows: int = self.serial_read_uint16() # read the number of rows
-        cols: int = self.serial_read_uint16() # read the number of columns
-        vals: bytes = self.serialcomm.read(rows * cols * 2) # read all data
-        
-        # iterate over the vals and fill the data array
-        data: np.ndarray = np.zeros((rows, cols), dtype=int)
-        for i in range(0, len(vals), 2):
-            row: int = i // (cols * 2)
-            col: int = (i // 2) % cols
-            data[row, col] = int.from_bytes(vals[i:i+2], 'little')
-        return data
+        # Read the number of rows and columns, then all of the data, into a reused frame buffer
+        return self.frame_decoder.read_frame(self.serialcomm)
 
     def get_data_from_recorded_data(self) -> np.ndarray:
         return read_data.get_data_from_recorded_data(self)
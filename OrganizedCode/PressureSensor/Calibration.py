@@ -1,5 +1,8 @@
+import numpy as np
+
 # TODO: implement calibration function to get pressure data
 
 def calibrate_data(data):
-    calibrated_data = data
+    # Raw readings (uint16) in, calibrated values (float32) out
+    calibrated_data = np.asarray(data, dtype=np.float32)
     return calibrated_data
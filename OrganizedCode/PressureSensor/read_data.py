@@ -4,7 +4,7 @@ import time
 
 def get_data_from_com_port(self) -> np.ndarray:
     if self.app_state.com_port is None or self.app_state.com_port == "":
-        return np.zeros((10, 10))
+        return np.zeros((10, 10), dtype=np.uint16)
 
     # Check if the selected com port has changed
     if self.app_state.com_port != self.serialcomm.port:
@@ -20,7 +20,7 @@ def get_data_from_com_port(self) -> np.ndarray:
             self.app_state.com_port = None
             self.after(0, lambda: self.save_app_state())
             self.after(0, lambda: self.strvar_com_port.set(""))
-            return np.zeros((10, 10))
+            return np.zeros((10, 10), dtype=np.uint16)
 
     # Serial port is open. Request data from the sensor:
     self.serialcomm.write(b'\x01')
@@ -32,18 +32,18 @@ def get_data_from_com_port(self) -> np.ndarray:
     return raw_data
 
 def get_data_from_recorded_data(self) -> np.ndarray:
-    return np.zeros((10, 10))
+    return np.zeros((10, 10), dtype=np.uint16)
 
 def get_data_simulated(self, MIN_VAL, MAX_VAL) -> np.ndarray:
     rows = 16
     cols = 16
-    data = np.zeros((rows, cols))
-    # Generate heatmap data based on sine waves and the current time
-    for i in range(16):
-        for j in range(16):
-            data[i][j] = MIN_VAL + MAX_VAL * np.clip(
-                    np.sin(2 * np.pi * (j + 1 / 2) / rows) * np.sin(np.pi * (i + 1 / 2) / cols) * np.sin(time.time()),
-                    0, 1
-                )
-
-    return data
+    i = np.arange(rows, dtype=np.float32).reshape(-1, 1)
+    j = np.arange(cols, dtype=np.float32).reshape(1, -1)
+    # Generate heatmap data based on sine waves and the current time (in float32)
+    data = MIN_VAL + MAX_VAL * np.clip(
+            np.sin(2 * np.pi * (j + 1 / 2) / rows) * np.sin(np.pi * (i + 1 / 2) / cols) * np.float32(np.sin(time.time())),
+            0, 1
+        )
+
+    # Raw readings, like the Arduino's (uint16)
+    return data.astype(np.uint16)
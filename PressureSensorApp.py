@@ -4,8 +4,21 @@
 # right now it is all commented out
 from appdirs import user_data_dir
 import numpy as np
-from scipy import ndimage
-from colormaps import apply_colormap
+from data_types import RAW_DTYPE, CALIBRATED_DTYPE, PIXEL_DTYPE
+from heatmap_renderer import HeatmapRenderContext
+from heatmap_interpolation import InterpolationMethod, INTERP_LEVELS
+from frame_change_detector import FrameChangeDetector
+from auto_range import AutoRange, RangeMode
+from frame_decoder import FrameDecoder, WireFormat
+from frame_acquisition import FrameAcquirer, AcquisitionMode, RegionOfInterest
+from frame_ring_buffer import FrameRingBuffer
+from frame_scheduler import FrameScheduler
+from raw_recording import RawRecordingWriter, RAW_RECORDING_EXTENSION
+from recording_writer import RecordingWriter, RawFrameSink, VideoSink, QueuePolicy
+from recording_playback import RecordingPlayback, PLAYBACK_SPEEDS
+from video_export import VideoExportSettings, export_video
+from auto_trigger import LoadTrigger, PreTriggerBuffer, TriggerMetric
+from serial_connection import SerialConnectionManager, ConnectionStatus
 from PIL import Image, ImageTk
 import serial.tools.list_ports as list_ports
 import serial
@@ -20,18 +33,68 @@ from dataclasses import dataclass, asdict
 from typing import Literal
 from copy import copy, deepcopy
 import threading
+import multiprocessing
 import time
-import cv2
 
 
 # Constants
 MIN_VAL = 0
 MAX_VAL = 1023
 ASPECT_RATIO = 1.0 # Width/Height of the heatmap cells
-
-SERIAL_BAUD_RATE = 115200 # Bits/sec for serial communication
+DISPLAY_INTERVAL_MS = 15 # How often the main thread checks for a new frame to draw (about 60 times/sec)
+SIMULATION_MAX_FPS = 60 # Frames/sec of simulated data when the frame rate is "Max"
+PLAYBACK_MAX_FPS = 60 # How often a playing recording is checked for the next frame when the frame rate is "Max"
+FRAME_TIMING_INTERVAL_MS = 1000 # How often the achieved frame rate is shown
+REDRAW_THRESHOLDS = (0, 2, 5, 10, 20) # Raw counts a cell must change by to be redrawn (choices in the settings)
+PARTIAL_REDRAW_MAX_FRACTION = 0.5 # If more of the frame than this changed, the whole heatmap is redrawn
+TRACE_RENDER_ALLOCATIONS = False # Show the bytes allocated to draw each frame (slows drawing down a little)
+RENDER_THREADS = 1 # Threads that draw the heatmap in horizontal tiles. Only faster on large canvases with several cores (run 'python heatmap_renderer.py' to compare)
+
+VIDEO_FPS = 30 # Frames/sec of recorded mp4 videos
+VIDEO_EXPORT_WORKERS = None # Processes that render exported videos (None: one per core)
+RAW_RECORDING_QUEUE_CAPACITY = 600 # Raw frames waiting to be written to disk (10 seconds at 60 frames/sec)
+RAW_RECORDING_QUEUE_POLICY: QueuePolicy = "block" # A full queue makes acquisition wait, so no raw frame is lost
+VIDEO_RECORDING_QUEUE_CAPACITY = 60 # Heatmap images waiting to be encoded (each is a full-size image)
+VIDEO_RECORDING_QUEUE_POLICY: QueuePolicy = "drop-oldest" # A slow encoder skips frames instead of holding up the GUI
+AUTO_RECORD_THRESHOLDS = (20, 50, 100, 200, 400, 800) # Raw counts that start an automatic recording (choices in the GUI)
+PRE_TRIGGER_SECONDS = (0, 1, 2, 5) # Seconds recorded from before an automatic recording starts (choices in the GUI)
+AUTO_RECORD_QUIET_SECONDS = (1, 2, 3, 5, 10) # Seconds without load before an automatic recording stops (choices in the GUI)
+
+SERIAL_BAUD_RATE = 115200 # Bits/sec for serial communication, until a faster rate is negotiated
 SERIAL_COMM_SIGNAL = b'\x01' # A '1' byte: signal to request data from the Arduino, and the signal that the Arduino is ready
 
+# Names of the acquisition modes shown in the GUI
+ACQUISITION_MODE_NAMES: dict[AcquisitionMode, str] = {
+    "lock-step": "Por solicitud",
+    "pipelined": "Solicitud anticipada",
+    "streaming": "Continuo",
+}
+
+# Names of the wire formats shown in the GUI
+WIRE_FORMAT_NAMES: dict[WireFormat, str] = {
+    "uint16": "2 bytes por celda",
+    "packed10": "Comprimido (10 bits)",
+    "delta": "Cambios (solo Continuo)",
+}
+
+# Names of the loads that start automatic recordings shown in the GUI
+TRIGGER_METRIC_NAMES: dict[TriggerMetric, str] = {
+    "peak": "Pico",
+    "total": "Promedio",
+}
+
+# Names of the color scale modes shown in the GUI
+COLOR_RANGE_MODE_NAMES: dict[RangeMode, str] = {
+    "rolling": "Último segundo",
+    "session": "Toda la sesión",
+    "fixed": "Fija",
+}
+
+INTERP_METHOD_NAMES: dict[InterpolationMethod, str] = {
+    "bilinear": "Bilineal",
+    "bicubic": "Bicúbica",
+}
+
 # Save directory for saving the GUI state
 SAVE_DIR = user_data_dir("PressureSensorApp", "BYU_GEO_GlobalEngineeringOutreach")
 if not os.path.exists(SAVE_DIR):
@@ -43,11 +106,6 @@ STATE_FILE_PATH = os.path.join(SAVE_DIR, "gui_state.json")
 ICON_FILE_NAME = "icon.png"
 ICON_PATH = os.path.join(getattr(sys, "_MEIPASS", os.path.dirname(__file__)), ICON_FILE_NAME)
 
-#for recorded video
-video = None
-file_name = None
-file_path = None
-
 
 
 # The state of the GUI, in terms of user selections and settings
@@ -58,17 +116,34 @@ class PressureSensorAppState:
     # Automatically determined by the App
     heatmap_canvas_size: tuple[int, int] = (400, 400) # (width, height) in pixels
     # User selections
-    data_source: Literal["com_port", "Simulación"] | None = None
+    data_source: Literal["com_port", "Simulación", "Grabación"] | None = None
     com_port: str | None = None
+    acquisition_mode: AcquisitionMode = "lock-step" # how frames are requested from the Arduino
+    wire_format: WireFormat = "packed10" # falls back to what the Arduino supports
+    negotiate_baud_rate: bool = True # try faster baud rates when connecting (falls back if they fail)
+    roi: RegionOfInterest | None = None # (first row, first col, rows, cols) to scan, or None for the whole matrix
     frames_per_second: int | Literal["Max"] = "Max"
+    playback_file_path: str | None = None # raw recording played back when the data source is "Grabación"
+    playback_speed: float = 1.0 # times the speed it was recorded at
+    playback_loop: bool = True # start again at the end of the recording
     recorded_data_save_directory: str | None = None
     recorded_data_filename: str = "Nombre del Archivo"
+    record_video: bool = False # also record the heatmap as mp4 video (the raw frames are always recorded)
+    auto_record: bool = False # start recording when there is load on the mat, and stop when it is gone
+    auto_record_metric: TriggerMetric = "peak" # the highest reading, or the mean reading ("total" load per cell)
+    auto_record_threshold: int = 200 # raw counts
+    auto_record_pre_trigger_seconds: float = 2.0 # recorded from before the load reached the threshold
+    auto_record_quiet_seconds: float = 3.0 # without load before the recording stops
     # Settings (from the "settings" window at the bottom)
     mirror_heatmap_image: bool = False
     rotate_heatmap_image: Literal[0, 90, 180, 270] = 0 # clockwise
-    interp_level: int = 1
+    interp_level: int = 1 # heatmap samples per cell along each axis (1: no smoothing)
+    interp_method: InterpolationMethod = "bicubic"
+    redraw_threshold: int = 0 # raw counts a cell must change by (since it was drawn) for the heatmap to be redrawn
+    color_range_mode: RangeMode = "rolling" # which frames the color scale is taken from
+    color_range_fixed: tuple[int, int] = (MIN_VAL, MAX_VAL) # (low, high) raw counts for the "fixed" color scale
     # data_units: Literal["raw", "lbs", "mmHg"] = "raw"
-    # display_vals_on_heatmap: bool = False
+    display_vals_on_heatmap: bool = False # draw the reading of each cell on the heatmap
     font_size: int = 11
 
 DEFAULT_STATE = PressureSensorAppState()
@@ -94,17 +169,17 @@ class PressureSensorApp(tk.Tk):
         self.setup_gui_styles()
         self.build_gui()
         
+        self.connection.start()
         self.refresh_gui()
 
         self.thread_data_update = threading.Thread(target=self.threadloop_data_update, daemon=True)
-        self.threadlock_data_update = threading.Lock()
         self.thread_data_update.start()
+        self.after(DISPLAY_INTERVAL_MS, self.display_newest_frame)
+        self.after(FRAME_TIMING_INTERVAL_MS, self.display_frame_timing)
 
     def on_close(self):
-        global video
-        if video is not None:
-            video.release()
-            video = None
+        self.close_recording(wait=True) # write everything that is still queued
+        self.render_context.close()
         self.destroy()
         sys.exit(0)
 
@@ -113,13 +188,49 @@ class PressureSensorApp(tk.Tk):
         self.paused: bool = False
         self.recording: bool = False
         self.time_recording_started: float = time.time()
+        # Writes the recording (raw frames from the data thread, heatmap video from the main thread) in its own
+        # thread, so the disk and the video encoder never hold up acquiring or drawing frames
+        self.recording_writer: RecordingWriter | None = None
+        self.recording_lock = threading.Lock() # a recording may be started by the button or by the data thread (automatic recording)
+        self.recording_started_automatically: bool = False
+
+        # The recording played back when the data source is "Grabación" (opened in 'refresh_frm_data_source')
+        self.playback: RecordingPlayback | None = None
+
+        # Exports a raw recording to mp4 video in the background (see 'video_export.py')
+        self.thread_export_video: threading.Thread | None = None
         self.available_com_ports: list[str] = [port.name for port in list_ports.comports()]
 
-        # Variable to hold the data that will be displayed on the heatmap
-        self.data: np.ndarray = np.zeros((10, 10))
+        # Frames go from the data thread to the main thread through the ring buffer.
+        # 'self.data' is the frame displayed on the heatmap (only used in the main thread).
+        self.frame_ring: FrameRingBuffer = FrameRingBuffer()
+        self.data: np.ndarray = np.zeros((10, 10), dtype=RAW_DTYPE)
+        self.displayed_sequence: int = -1 # sequence number (in the ring buffer) of 'self.data'
 
-        # Variables for managing serial communication
-        self.serialcomm: serial.Serial = serial.Serial()
+        # Draws frames on the heatmap canvas: interpolation, coloring and scaling to the canvas, each into a
+        # buffer that is only reallocated when the canvas is resized or a setting changes (see 'heatmap_renderer.py')
+        self.render_context: HeatmapRenderContext = HeatmapRenderContext(
+            ASPECT_RATIO, "inferno", trace_allocations=TRACE_RENDER_ALLOCATIONS, render_threads=RENDER_THREADS
+        )
+
+        # Compares each frame with the one on the screen, so unchanged frames aren't redrawn
+        # and only the changed cells are redrawn when few of them changed
+        self.frame_change_detector: FrameChangeDetector = FrameChangeDetector()
+        self.heatmap_drawn_with: tuple | None = None # (geometry rebuilds, interpolation settings, values shown, color range) the heatmap was drawn with
+
+        # Paces the data thread to the selected frames per second, and measures the achieved rate
+        self.frame_scheduler: FrameScheduler = FrameScheduler()
+
+        # Variables for managing serial communication. The connection manager opens the port (and reopens it
+        # if it is lost) in its own thread, and reports its state and the available ports in the main thread.
+        self.connection: SerialConnectionManager = SerialConnectionManager(
+            SERIAL_COMM_SIGNAL, SERIAL_BAUD_RATE, 
+            on_state_change=lambda status: self.after(0, self.on_connection_status_change, status),
+            on_ports_change=lambda ports: self.after(0, self.on_com_ports_change, ports),
+        )
+        self.connection_count: int = 0 # connection the frame acquirer was last reset for
+        self.frame_decoder: FrameDecoder = FrameDecoder()
+        self.frame_acquirer: FrameAcquirer = FrameAcquirer(SERIAL_COMM_SIGNAL, self.frame_decoder)
         
         # Create the GUI state JSON file if it doesn't exist
         if not os.path.exists(STATE_FILE_PATH):
@@ -135,10 +246,22 @@ class PressureSensorApp(tk.Tk):
             except TypeError:
                 self.app_state = deepcopy(DEFAULT_STATE)
                 self.new_state = deepcopy(DEFAULT_STATE)
-        
-        if self.app_state.com_port not in self.available_com_ports:
-            self.app_state.com_port = None
-            self.new_state.com_port = None
+        # The selected port is kept even if it isn't plugged in. It is connected to as soon as it is.
+
+        # Chooses the color scale from a histogram of recent frames (see 'auto_range.py')
+        self.auto_range: AutoRange = AutoRange(
+            self.app_state.color_range_mode, fixed_range=tuple(self.app_state.color_range_fixed)
+        )
+        self.color_range: tuple[int, int] = (MIN_VAL, MAX_VAL) # (low, high) of the frame being displayed
+
+        # Automatic recording: the data thread keeps the last seconds of frames, and starts (and stops) a recording
+        # when the load on the mat crosses the threshold (see 'auto_trigger.py')
+        self.pre_trigger_buffer: PreTriggerBuffer = PreTriggerBuffer(
+            self.app_state.auto_record_pre_trigger_seconds, *self.frame_ring.shape
+        )
+        self.load_trigger: LoadTrigger = LoadTrigger(
+            self.app_state.auto_record_metric, self.app_state.auto_record_threshold, self.app_state.auto_record_quiet_seconds
+        )
 
     
     ################################################################################################
@@ -260,13 +383,88 @@ class PressureSensorApp(tk.Tk):
         btn_refresh_com_ports = ttk.Button(parent, text="⟳", style="IconButton.TButton", command=self.on_btn_refresh_com_ports_list)
         btn_refresh_com_ports.grid(row=1, column=2, sticky="w", padx=(self.padding, 0))
 
+        lbl_acquisition_mode = ttk.Label(parent, text="Modo:")
+        lbl_acquisition_mode.grid(row=2, column=0, sticky="e")
+        self.strvar_acquisition_mode = tk.StringVar(parent, value=ACQUISITION_MODE_NAMES[self.app_state.acquisition_mode])
+        self.dropdown_acquisition_mode = ttk.Combobox(parent, width=18, state="readonly", textvariable=self.strvar_acquisition_mode)
+        self.dropdown_acquisition_mode["values"] = list(ACQUISITION_MODE_NAMES.values())
+        self.dropdown_acquisition_mode.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_acquisition_mode())
+        self.dropdown_acquisition_mode.grid(row=2, column=1, columnspan=2, sticky="w")
+
+        lbl_wire_format = ttk.Label(parent, text="Formato:")
+        lbl_wire_format.grid(row=3, column=0, sticky="e")
+        self.strvar_wire_format = tk.StringVar(parent, value=WIRE_FORMAT_NAMES[self.app_state.wire_format])
+        self.dropdown_wire_format = ttk.Combobox(parent, width=18, state="readonly", textvariable=self.strvar_wire_format)
+        self.dropdown_wire_format["values"] = list(WIRE_FORMAT_NAMES.values())
+        self.dropdown_wire_format.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_wire_format())
+        self.dropdown_wire_format.grid(row=3, column=1, columnspan=2, sticky="w")
+
+        self.bvar_chkbtn_negotiate_baud_rate = tk.BooleanVar(parent, value=self.app_state.negotiate_baud_rate)
+        chkbtn_negotiate_baud_rate = ttk.Checkbutton(
+            parent, variable=self.bvar_chkbtn_negotiate_baud_rate, text="Velocidad alta", command=self.on_chkbtn_negotiate_baud_rate
+        )
+        chkbtn_negotiate_baud_rate.grid(row=4, column=0, sticky="e")
+        self.strvar_connection_status = tk.StringVar(parent, value="")
+        lbl_connection_status = ttk.Label(parent, textvariable=self.strvar_connection_status, style="SmallText.TLabel")
+        lbl_connection_status.grid(row=4, column=1, columnspan=2, sticky="w")
+
+        # Region of interest: "first row, first col, rows, cols", or empty for the whole matrix
+        lbl_roi = ttk.Label(parent, text="Región:")
+        lbl_roi.grid(row=5, column=0, sticky="e")
+        roi_text = ", ".join(str(value) for value in self.app_state.roi) if self.app_state.roi else ""
+        self.strvar_roi = tk.StringVar(parent, value=roi_text)
+        self.entry_roi = ttk.Entry(parent, textvariable=self.strvar_roi, width=12)
+        self.entry_roi.grid(row=5, column=1, sticky="w")
+        self.entry_roi.bind("<FocusOut>", lambda e: self.on_entry_roi())
+        self.entry_roi.bind("<Return>", lambda e: self.on_entry_roi())
+        lbl_roi_help = ttk.Label(parent, text="fila, col, filas, cols", style="SmallText.TLabel")
+        lbl_roi_help.grid(row=5, column=2, sticky="w")
 
         radiobtn_simulated_data = ttk.Radiobutton(parent, 
                                                   text="Simulación", 
                                                   variable=self.strvar_radiobtns_data_source, 
                                                   value="Simulación",
                                                   command=self.on_radiobtn_data_source)
-        radiobtn_simulated_data.grid(row=3, column=0, sticky="w")
+        radiobtn_simulated_data.grid(row=6, column=0, sticky="w")
+
+        # Playback of a raw recording
+        radiobtn_recorded_data = ttk.Radiobutton(parent, 
+                                                 text="Grabación", 
+                                                 variable=self.strvar_radiobtns_data_source, 
+                                                 value="Grabación",
+                                                 command=self.on_radiobtn_data_source)
+        radiobtn_recorded_data.grid(row=7, column=0, sticky="w")
+
+        frm_playback_file = ttk.Frame(parent)
+        frm_playback_file.grid(row=7, column=1, columnspan=2, sticky="ew")
+        frm_playback_file.columnconfigure(1, weight=1)
+        btn_playback_file = ttk.Button(frm_playback_file, text=u"\U0001F4C2", style="TButton", width=4, command=self.on_btn_select_playback_file)
+        btn_playback_file.grid(row=0, column=0, sticky="w")
+        playback_file_name = os.path.basename(self.app_state.playback_file_path) if self.app_state.playback_file_path else "← Seleccionar archivo"
+        self.strvar_playback_file = tk.StringVar(frm_playback_file, value=playback_file_name)
+        lbl_playback_file = ttk.Label(frm_playback_file, textvariable=self.strvar_playback_file, style="SmallText.TLabel")
+        lbl_playback_file.grid(row=0, column=1, sticky="w")
+
+        lbl_playback_speed = ttk.Label(parent, text="Velocidad:")
+        lbl_playback_speed.grid(row=8, column=0, sticky="e")
+        self.strvar_playback_speed = tk.StringVar(parent, value=f"{self.app_state.playback_speed:g}x")
+        self.dropdown_playback_speed = ttk.Combobox(parent, width=5, state="readonly", textvariable=self.strvar_playback_speed)
+        self.dropdown_playback_speed["values"] = [f"{speed:g}x" for speed in PLAYBACK_SPEEDS]
+        self.dropdown_playback_speed.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_playback_speed())
+        self.dropdown_playback_speed.grid(row=8, column=1, sticky="w")
+        self.bvar_chkbtn_playback_loop = tk.BooleanVar(parent, value=self.app_state.playback_loop)
+        self.chkbtn_playback_loop = ttk.Checkbutton(
+            parent, variable=self.bvar_chkbtn_playback_loop, text="Repetir", command=self.on_chkbtn_playback_loop
+        )
+        self.chkbtn_playback_loop.grid(row=8, column=2, sticky="w")
+
+        # Position in the recording (seconds). Dragging it jumps to that time.
+        self.dvar_playback_position = tk.DoubleVar(parent, value=0.0)
+        self.scale_playback_position = ttk.Scale(
+            parent, orient="horizontal", from_=0.0, to=1.0, variable=self.dvar_playback_position,
+            command=lambda value: self.on_scale_playback_position()
+        )
+        self.scale_playback_position.grid(row=9, column=0, columnspan=3, sticky="ew")
 
     def build_frm_playpause_etc(self, parent: ttk.Frame):
         self.strvar_playpause_btn = tk.StringVar(parent, value="◼")
@@ -278,9 +476,12 @@ class PressureSensorApp(tk.Tk):
         lbl_framespersecond.grid(row=0, column=1, sticky="e")
         parent.columnconfigure(1, weight=1)
 
-        self.strvar_framespersecond = tk.StringVar(parent, value="Máximo")
+        fps_text = "Máx" if self.app_state.frames_per_second == "Max" else str(self.app_state.frames_per_second)
+        self.strvar_framespersecond = tk.StringVar(parent, value=fps_text)
         cmbbox_framespersecond = ttk.Combobox(parent, textvariable=self.strvar_framespersecond, width=4)
         cmbbox_framespersecond["values"] = ["Máx", "20", "10", "5", "2", "1"]
+        cmbbox_framespersecond.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_frames_per_second())
+        cmbbox_framespersecond.bind("<Return>", lambda e: self.on_dropdown_select_frames_per_second())
         cmbbox_framespersecond.grid(row=0, column=2, sticky="w")
 
         frm_prev_next_frame = ttk.Frame(parent)
@@ -301,6 +502,11 @@ class PressureSensorApp(tk.Tk):
         lbl_frame_number_value = ttk.Label(parent, textvariable=self.strvar_frame_number)
         lbl_frame_number_value.grid(row=2, column=1, sticky="w")
 
+        # Achieved frame rate, and how late frames are (is the selected FPS actually met?)
+        self.strvar_frame_timing = tk.StringVar(parent, value="")
+        lbl_frame_timing = ttk.Label(parent, textvariable=self.strvar_frame_timing, style="SmallText.TLabel")
+        lbl_frame_timing.grid(row=3, column=0, columnspan=3, sticky="w")
+
     # def build_frm_stats(self, parent: ttk.Frame):
     #     lbl_frm_stats = ttk.Label(parent, text="Estadística", style="Header.TLabel")
     #     lbl_frm_stats.grid(row=0, column=0, columnspan=4, sticky="w")
@@ -359,8 +565,13 @@ class PressureSensorApp(tk.Tk):
         self.entry_recording_filename.grid(row=0, column=1, sticky="ew")
         self.entry_recording_filename.bind("<FocusOut>", lambda e: self.on_btn_new_recording_filename())
         frm_recording_filename.columnconfigure(1, weight=1)
-        lbl_vid = ttk.Label(frm_recording_filename, text=".mp4")
+        lbl_vid = ttk.Label(frm_recording_filename, text=RAW_RECORDING_EXTENSION)
         lbl_vid.grid(row=0, column=2, sticky="w")
+        self.bvar_chkbtn_record_video = tk.BooleanVar(frm_recording_filename, value=self.app_state.record_video)
+        self.chkbtn_record_video = ttk.Checkbutton(
+            frm_recording_filename, variable=self.bvar_chkbtn_record_video, text="+ .mp4", command=self.on_chkbtn_record_video
+        )
+        self.chkbtn_record_video.grid(row=0, column=3, sticky="w")
        
         # Frame counter and time elapsed
         frm_frm_counter = ttk.Frame(parent)
@@ -370,6 +581,54 @@ class PressureSensorApp(tk.Tk):
         self.strvar_frame_counter = tk.StringVar(frm_frm_counter, value="0")
         lbl_frame_counter_value = ttk.Label(frm_frm_counter, textvariable=self.strvar_frame_counter)
         lbl_frame_counter_value.grid(row=0, column=1, sticky="w", padx=(self.padding, 0))
+        self.strvar_recording_drops = tk.StringVar(frm_frm_counter, value="")
+        lbl_recording_drops = ttk.Label(frm_frm_counter, textvariable=self.strvar_recording_drops, style="SmallText.TLabel")
+        lbl_recording_drops.grid(row=1, column=0, columnspan=2, sticky="w")
+
+        # Export of a recording to mp4 video, with the timing it was recorded with
+        frm_export_video = ttk.Frame(parent)
+        frm_export_video.grid(row=4, column=0, columnspan=2, sticky="ew")
+        self.btn_export_video = ttk.Button(frm_export_video, text="Exportar .mp4", style="TButton", command=self.on_btn_export_video)
+        self.btn_export_video.grid(row=0, column=0, sticky="w")
+        self.strvar_export_video = tk.StringVar(frm_export_video, value="")
+        lbl_export_video = ttk.Label(frm_export_video, textvariable=self.strvar_export_video, style="SmallText.TLabel")
+        lbl_export_video.grid(row=0, column=1, sticky="w", padx=(self.padding, 0))
+
+        # Automatic recording: starts when the load reaches the threshold (with the seconds before it), stops after the quiet time
+        frm_auto_record = ttk.Frame(parent)
+        frm_auto_record.grid(row=5, column=0, columnspan=2, sticky="ew")
+        self.bvar_chkbtn_auto_record = tk.BooleanVar(frm_auto_record, value=self.app_state.auto_record)
+        self.chkbtn_auto_record = ttk.Checkbutton(
+            frm_auto_record, variable=self.bvar_chkbtn_auto_record, text="Automática:", command=self.on_chkbtn_auto_record
+        )
+        self.chkbtn_auto_record.grid(row=0, column=0, sticky="w")
+        self.strvar_auto_record_metric = tk.StringVar(frm_auto_record, value=TRIGGER_METRIC_NAMES[self.app_state.auto_record_metric])
+        cmbbox_auto_record_metric = ttk.Combobox(frm_auto_record, width=9, state="readonly", textvariable=self.strvar_auto_record_metric)
+        cmbbox_auto_record_metric["values"] = list(TRIGGER_METRIC_NAMES.values())
+        cmbbox_auto_record_metric.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_auto_record())
+        cmbbox_auto_record_metric.grid(row=0, column=1, sticky="w")
+        lbl_auto_record_threshold = ttk.Label(frm_auto_record, text="≥")
+        lbl_auto_record_threshold.grid(row=0, column=2, sticky="w", padx=(self.padding, 0))
+        self.strvar_auto_record_threshold = tk.StringVar(frm_auto_record, value=str(self.app_state.auto_record_threshold))
+        cmbbox_auto_record_threshold = ttk.Combobox(frm_auto_record, width=4, state="readonly", textvariable=self.strvar_auto_record_threshold)
+        cmbbox_auto_record_threshold["values"] = [str(threshold) for threshold in AUTO_RECORD_THRESHOLDS]
+        cmbbox_auto_record_threshold.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_auto_record())
+        cmbbox_auto_record_threshold.grid(row=0, column=3, sticky="w")
+
+        lbl_pre_trigger_seconds = ttk.Label(frm_auto_record, text="Antes (s):")
+        lbl_pre_trigger_seconds.grid(row=1, column=0, sticky="e")
+        self.strvar_pre_trigger_seconds = tk.StringVar(frm_auto_record, value=f"{self.app_state.auto_record_pre_trigger_seconds:g}")
+        cmbbox_pre_trigger_seconds = ttk.Combobox(frm_auto_record, width=3, state="readonly", textvariable=self.strvar_pre_trigger_seconds)
+        cmbbox_pre_trigger_seconds["values"] = [f"{seconds:g}" for seconds in PRE_TRIGGER_SECONDS]
+        cmbbox_pre_trigger_seconds.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_auto_record())
+        cmbbox_pre_trigger_seconds.grid(row=1, column=1, sticky="w")
+        lbl_auto_record_quiet_seconds = ttk.Label(frm_auto_record, text="Silencio (s):")
+        lbl_auto_record_quiet_seconds.grid(row=1, column=2, sticky="e", padx=(self.padding, 0))
+        self.strvar_auto_record_quiet_seconds = tk.StringVar(frm_auto_record, value=f"{self.app_state.auto_record_quiet_seconds:g}")
+        cmbbox_auto_record_quiet_seconds = ttk.Combobox(frm_auto_record, width=3, state="readonly", textvariable=self.strvar_auto_record_quiet_seconds)
+        cmbbox_auto_record_quiet_seconds["values"] = [f"{seconds:g}" for seconds in AUTO_RECORD_QUIET_SECONDS]
+        cmbbox_auto_record_quiet_seconds.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_auto_record())
+        cmbbox_auto_record_quiet_seconds.grid(row=1, column=3, sticky="w")
 
     def build_frm_settings(self, parent: ttk.Frame):
         lbl_settings = ttk.Label(parent, text="Ajustes", style="Header.TLabel")
@@ -411,6 +670,80 @@ class PressureSensorApp(tk.Tk):
         btn_increase_font_size.grid(row=1, column=2, sticky="w")
 
 
+        # Interpolation (smoothing)
+        frm_settings_interpolation = ttk.Frame(parent)
+        frm_settings_interpolation.grid(row=3, column=0, sticky="nsew")
+
+        lbl_interpolation = ttk.Label(frm_settings_interpolation, text="Suavizado")
+        lbl_interpolation.grid(row=0, column=0, sticky="w")
+        frm_settings_interpolation.columnconfigure(0, weight=1)
+
+        self.strvar_interp_level = tk.StringVar(frm_settings_interpolation, value=str(self.app_state.interp_level))
+        self.dropdown_interp_level = ttk.Combobox(frm_settings_interpolation, width=3, state="readonly", textvariable=self.strvar_interp_level)
+        self.dropdown_interp_level["values"] = [str(level) for level in INTERP_LEVELS]
+        self.dropdown_interp_level.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_interpolation())
+        self.dropdown_interp_level.grid(row=0, column=1, sticky="w")
+
+        self.strvar_interp_method = tk.StringVar(frm_settings_interpolation, value=INTERP_METHOD_NAMES[self.app_state.interp_method])
+        self.dropdown_interp_method = ttk.Combobox(frm_settings_interpolation, width=9, state="readonly", textvariable=self.strvar_interp_method)
+        self.dropdown_interp_method["values"] = list(INTERP_METHOD_NAMES.values())
+        self.dropdown_interp_method.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_interpolation())
+        self.dropdown_interp_method.grid(row=0, column=2, sticky="w")
+
+
+        # Change threshold for redrawing the heatmap
+        frm_settings_redraw_threshold = ttk.Frame(parent)
+        frm_settings_redraw_threshold.grid(row=4, column=0, sticky="nsew")
+
+        lbl_redraw_threshold = ttk.Label(frm_settings_redraw_threshold, text="Umbral de cambio")
+        lbl_redraw_threshold.grid(row=0, column=0, sticky="w")
+        frm_settings_redraw_threshold.columnconfigure(0, weight=1)
+
+        self.strvar_redraw_threshold = tk.StringVar(frm_settings_redraw_threshold, value=str(self.app_state.redraw_threshold))
+        cmbbox_redraw_threshold = ttk.Combobox(frm_settings_redraw_threshold, width=3, state="readonly", textvariable=self.strvar_redraw_threshold)
+        cmbbox_redraw_threshold["values"] = [str(threshold) for threshold in REDRAW_THRESHOLDS]
+        cmbbox_redraw_threshold.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_redraw_threshold())
+        cmbbox_redraw_threshold.grid(row=0, column=1, sticky="w")
+
+
+        # Color scale
+        frm_settings_color_range = ttk.Frame(parent)
+        frm_settings_color_range.grid(row=5, column=0, sticky="nsew")
+
+        lbl_color_range = ttk.Label(frm_settings_color_range, text="Escala de color")
+        lbl_color_range.grid(row=0, column=0, sticky="w")
+        frm_settings_color_range.columnconfigure(0, weight=1)
+
+        self.strvar_color_range_mode = tk.StringVar(frm_settings_color_range, value=COLOR_RANGE_MODE_NAMES[self.app_state.color_range_mode])
+        self.dropdown_color_range_mode = ttk.Combobox(frm_settings_color_range, width=14, state="readonly", textvariable=self.strvar_color_range_mode)
+        self.dropdown_color_range_mode["values"] = list(COLOR_RANGE_MODE_NAMES.values())
+        self.dropdown_color_range_mode.bind("<<ComboboxSelected>>", lambda e: self.on_dropdown_select_color_range_mode())
+        self.dropdown_color_range_mode.grid(row=0, column=1, sticky="w")
+
+        self.strvar_color_range_fixed = tk.StringVar(
+            frm_settings_color_range, value=", ".join(str(value) for value in self.app_state.color_range_fixed)
+        )
+        self.entry_color_range_fixed = ttk.Entry(frm_settings_color_range, textvariable=self.strvar_color_range_fixed, width=9)
+        self.entry_color_range_fixed.grid(row=0, column=2, sticky="w")
+        self.entry_color_range_fixed.bind("<FocusOut>", lambda e: self.on_entry_color_range_fixed())
+        self.entry_color_range_fixed.bind("<Return>", lambda e: self.on_entry_color_range_fixed())
+
+
+        # Readings on the heatmap
+        frm_settings_display_vals = ttk.Frame(parent)
+        frm_settings_display_vals.grid(row=6, column=0, sticky="nsew")
+
+        lbl_display_vals = ttk.Label(frm_settings_display_vals, text="Valores en el mapa")
+        lbl_display_vals.grid(row=0, column=0, sticky="w")
+        frm_settings_display_vals.columnconfigure(0, weight=1)
+
+        self.bvar_chkbtn_display_vals = tk.BooleanVar(frm_settings_display_vals, value=self.app_state.display_vals_on_heatmap)
+        chkbtn_display_vals = ttk.Checkbutton(
+            frm_settings_display_vals, variable=self.bvar_chkbtn_display_vals, text="Mostrar", command=self.on_chkbtn_display_vals_on_heatmap
+        )
+        chkbtn_display_vals.grid(row=0, column=1, sticky="w")
+
+
     ################################################################################################
     # Event Handlers
     ################################################################################################
@@ -427,6 +760,8 @@ class PressureSensorApp(tk.Tk):
             self.new_state.data_source = "com_port"
         elif new_source == "Simulación":
             self.new_state.data_source = "Simulación"
+        elif new_source == "Grabación":
+            self.new_state.data_source = "Grabación"
         
         self.refresh_gui()
 
@@ -434,24 +769,119 @@ class PressureSensorApp(tk.Tk):
         self.new_state.com_port = self.dropdown_com_port.get()
         self.refresh_gui()
 
+    def on_dropdown_select_acquisition_mode(self):
+        selected_name = self.dropdown_acquisition_mode.get()
+        for mode, name in ACQUISITION_MODE_NAMES.items():
+            if name == selected_name:
+                self.new_state.acquisition_mode = mode
+        self.refresh_gui()
+
+    def on_dropdown_select_wire_format(self):
+        selected_name = self.dropdown_wire_format.get()
+        for wire_format, name in WIRE_FORMAT_NAMES.items():
+            if name == selected_name:
+                self.new_state.wire_format = wire_format
+        self.refresh_gui()
+
+    def on_chkbtn_negotiate_baud_rate(self):
+        # Takes effect the next time the serial port is connected
+        self.new_state.negotiate_baud_rate = self.bvar_chkbtn_negotiate_baud_rate.get()
+        self.refresh_gui()
+
+    def on_entry_roi(self):
+        # Only scan the region of interest. Anything that isn't 4 numbers means the whole matrix.
+        try:
+            values = [int(value) for value in self.strvar_roi.get().replace(",", " ").split()]
+        except ValueError:
+            values = []
+        if len(values) == 4 and min(values) >= 0 and values[2] > 0 and values[3] > 0:
+            self.new_state.roi = (values[0], values[1], values[2], values[3])
+        else:
+            self.new_state.roi = None
+            self.strvar_roi.set("")
+        self.refresh_gui()
+
     def on_btn_refresh_com_ports_list(self):
         self.available_com_ports = [port.name for port in list_ports.comports()]
         self.dropdown_com_port["values"] = self.available_com_ports
 
+    def on_com_ports_change(self, ports: list[str]):
+        # A port was plugged in or unplugged (reported by the connection manager)
+        self.available_com_ports = ports
+        self.dropdown_com_port["values"] = self.available_com_ports
+
+    def on_connection_status_change(self, status: ConnectionStatus):
+        if status.state == "connected":
+            text = f"Conectado ({status.detail})"
+        elif status.state == "connecting":
+            text = "Conectando..."
+        elif status.state == "waiting_for_port":
+            text = "Esperando a que se conecte el puerto"
+        elif status.state == "retrying":
+            # The error that made the connection fail, so the user can see why it is retrying
+            text = f"Reintentando en {status.retry_delay:g} s" + (f": {status.detail}" if status.detail else "")
+        else:
+            text = ""
+        self.strvar_connection_status.set(text)
+
     def on_btn_playpause(self):
         self.paused = not self.paused
+        if self.paused:
+            self.frame_scheduler.pause()
+        else:
+            self.frame_scheduler.resume()
+        if self.playback is not None:
+            self.playback.set_playing(not self.paused)
+        self.refresh_gui()
+
+    def on_btn_select_playback_file(self):
+        path = filedialog.askopenfilename(filetypes=[("Grabación", "*" + RAW_RECORDING_EXTENSION), ("Todos", "*.*")])
+        if path:
+            self.new_state.playback_file_path = path
+            self.new_state.data_source = "Grabación"
+            self.strvar_radiobtns_data_source.set("Grabación")
+        self.refresh_gui()
+
+    def on_dropdown_select_playback_speed(self):
+        self.new_state.playback_speed = float(self.strvar_playback_speed.get().rstrip("x"))
+        self.refresh_gui()
+
+    def on_chkbtn_playback_loop(self):
+        self.new_state.playback_loop = self.bvar_chkbtn_playback_loop.get()
+        self.refresh_gui()
+
+    def on_scale_playback_position(self):
+        if self.playback is not None:
+            self.playback.seek_time(self.dvar_playback_position.get())
+            if self.paused:
+                self.display_playback_frame()
+
+    def on_dropdown_select_frames_per_second(self):
+        try:
+            frames_per_second = int(self.strvar_framespersecond.get())
+        except ValueError:
+            frames_per_second = 0
+        if frames_per_second > 0:
+            self.new_state.frames_per_second = frames_per_second
+        else:
+            self.new_state.frames_per_second = "Max"
+            self.strvar_framespersecond.set("Máx")
+        self.frame_scheduler.interrupt() # don't wait out a long frame at the old rate
         self.refresh_gui()
 
     def on_btn_prev_frame(self):
-        pass
+        if self.playback is not None:
+            self.playback.step(-1)
+            if self.paused:
+                self.display_playback_frame()
 
     def on_btn_next_frame(self):
-        pass
+        if self.playback is not None:
+            self.playback.step(1)
+            if self.paused:
+                self.display_playback_frame()
 
     def on_btn_record(self):
-        global video
-        global file_name
-        global file_path
         if not self.recording:
             if not self.app_state.recorded_data_save_directory or not self.app_state.recorded_data_filename:
                 return
@@ -459,27 +889,118 @@ class PressureSensorApp(tk.Tk):
             save_name: str = self.app_state.recorded_data_filename
             save_path= os.path.join(self.app_state.recorded_data_save_directory, save_name)            
             # Ask user if they want to overwrite the existing file
-            if os.path.exists(save_path+".mp4"):
+            extensions = [RAW_RECORDING_EXTENSION] + ([".mp4"] if self.app_state.record_video else [])
+            if any(os.path.exists(save_path + extension) for extension in extensions):
                 prompt = f"El archivo '{save_name}' ya existe. La grabación lo sobrescribirá. ¿Continuar?"
-                if messagebox.askyesno("Advertencia", prompt):
-                    self.recording = True
-                    self.time_recording_started = time.time()
-                    self.refresh_gui()
-            else:
-                self.recording = True
-                self.time_recording_started = time.time()
-                self.refresh_gui()
-            file_name = save_name
-            file_path = save_path
+                if not messagebox.askyesno("Advertencia", prompt):
+                    return
+            with self.recording_lock:
+                if self.recording_writer is not None:
+                    return # an automatic recording started in the meantime
+                try:
+                    self.recording_writer = self.open_recording(save_path, self.frame_ring.shape)
+                except OSError as error:
+                    messagebox.showerror("Error", f"No se pudo crear el archivo '{save_name}{RAW_RECORDING_EXTENSION}':\n{error}")
+                    return
+                self.recording_started_automatically = False
+            self.on_recording_started()
         else:
-            self.recording = False
-            # close video
-            if video is not None:
-                video.release()
-                video = None
-            self.refresh_gui()
+            # The writer thread finishes writing what is queued and closes the files, without holding up the GUI
+            self.close_recording(wait=False)
+            self.on_recording_stopped()
+
+    def open_recording(self, save_path: str, frame_shape: tuple[int, int]) -> RecordingWriter:
+        # Create the recording files ('save_path' without the extensions) and the writer thread. Raises OSError.
+        raw_recording = RawRecordingWriter(save_path + RAW_RECORDING_EXTENSION, frame_shape)
+        recording_writer = RecordingWriter()
+        recording_writer.add_sink("raw", RawFrameSink(raw_recording), RAW_RECORDING_QUEUE_CAPACITY, RAW_RECORDING_QUEUE_POLICY)
+        if self.app_state.record_video:
+            recording_writer.add_sink(
+                "video", VideoSink(save_path + ".mp4", VIDEO_FPS), VIDEO_RECORDING_QUEUE_CAPACITY, VIDEO_RECORDING_QUEUE_POLICY
+            )
+        return recording_writer
+
+    def on_recording_started(self):
+        self.recording = True
+        self.time_recording_started = time.time()
+        self.strvar_frame_counter.set("0")
+        self.strvar_recording_drops.set("")
+        self.refresh_gui()
+
+    def on_recording_stopped(self):
+        self.recording = False
+        self.refresh_gui()
         
 
+    def on_btn_export_video(self):
+        # Export a raw recording to mp4 video with the current heatmap settings. The video is rendered by
+        # worker processes, so the App keeps running at full speed while it is exported.
+        if self.thread_export_video is not None and self.thread_export_video.is_alive():
+            return
+        recording_path = filedialog.askopenfilename(
+            filetypes=[("Grabación", "*" + RAW_RECORDING_EXTENSION)], initialdir=self.app_state.recorded_data_save_directory
+        )
+        if not recording_path:
+            return
+        video_path = os.path.splitext(recording_path)[0] + ".mp4"
+        if os.path.exists(video_path):
+            prompt = f"El archivo '{os.path.basename(video_path)}' ya existe. La exportación lo sobrescribirá. ¿Continuar?"
+            if not messagebox.askyesno("Advertencia", prompt):
+                return
+        settings = VideoExportSettings(
+            fps=VIDEO_FPS,
+            frame_size=tuple(self.app_state.heatmap_canvas_size),
+            aspect_ratio=ASPECT_RATIO,
+            colormap=self.render_context.colormap,
+            rotation=self.app_state.rotate_heatmap_image,
+            mirror=self.app_state.mirror_heatmap_image,
+            interp_level=self.app_state.interp_level,
+            interp_method=self.app_state.interp_method,
+            show_values=self.app_state.display_vals_on_heatmap,
+            color_range_mode=self.app_state.color_range_mode,
+            color_range_fixed=tuple(self.app_state.color_range_fixed),
+        )
+        self.btn_export_video.configure(state="disabled")
+        self.strvar_export_video.set("Preparando...")
+        self.thread_export_video = threading.Thread(
+            target=self.thread_export_video_file, args=(recording_path, video_path, settings), daemon=True
+        )
+        self.thread_export_video.start()
+
+    def thread_export_video_file(self, recording_path: str, video_path: str, settings: VideoExportSettings):
+        # Runs in its own thread (the rendering and encoding run in other processes). The GUI is updated from the main thread.
+        def show_progress(frames_done: int, frames: int):
+            self.after(0, lambda: self.strvar_export_video.set(f"Exportando: {100 * frames_done // frames}%"))
+        try:
+            frames = export_video(recording_path, video_path, settings, VIDEO_EXPORT_WORKERS, show_progress)
+        except Exception as error:
+            message = f"No se pudo exportar '{os.path.basename(recording_path)}':\n{error}"
+            self.after(0, self.on_video_export_finished, "Error al exportar", message)
+        else:
+            self.after(0, self.on_video_export_finished, f"{os.path.basename(video_path)}: {frames / settings.fps:.1f} s", None)
+
+    def on_video_export_finished(self, status: str, error_message: str | None):
+        self.strvar_export_video.set(status)
+        self.btn_export_video.configure(state="normal")
+        if error_message is not None:
+            messagebox.showerror("Error", error_message)
+
+    def on_chkbtn_auto_record(self):
+        self.new_state.auto_record = self.bvar_chkbtn_auto_record.get()
+        self.refresh_gui()
+
+    def on_dropdown_select_auto_record(self):
+        metric_names = {name: metric for metric, name in TRIGGER_METRIC_NAMES.items()}
+        self.new_state.auto_record_metric = metric_names[self.strvar_auto_record_metric.get()]
+        self.new_state.auto_record_threshold = int(self.strvar_auto_record_threshold.get())
+        self.new_state.auto_record_pre_trigger_seconds = float(self.strvar_pre_trigger_seconds.get())
+        self.new_state.auto_record_quiet_seconds = float(self.strvar_auto_record_quiet_seconds.get())
+        self.refresh_gui()
+
+    def on_chkbtn_record_video(self):
+        self.new_state.record_video = self.bvar_chkbtn_record_video.get()
+        self.refresh_gui()
+
     def on_btn_select_recording_directory(self):
         # Select a new directory to save the recorded data
         self.new_state.recorded_data_save_directory = filedialog.askdirectory(mustexist=True)
@@ -517,6 +1038,42 @@ class PressureSensorApp(tk.Tk):
             else:
                 self.style.configure(style, font=(font_name, font_size + 1))     
 
+    def on_dropdown_select_interpolation(self):
+        self.new_state.interp_level = int(self.strvar_interp_level.get())
+        selected_name = self.strvar_interp_method.get()
+        for method, name in INTERP_METHOD_NAMES.items():
+            if name == selected_name:
+                self.new_state.interp_method = method
+        self.refresh_gui()
+
+    def on_dropdown_select_redraw_threshold(self):
+        self.new_state.redraw_threshold = int(self.strvar_redraw_threshold.get())
+        self.refresh_gui()
+
+    def on_chkbtn_display_vals_on_heatmap(self):
+        self.new_state.display_vals_on_heatmap = self.bvar_chkbtn_display_vals.get()
+        self.refresh_gui()
+
+    def on_dropdown_select_color_range_mode(self):
+        selected_name = self.strvar_color_range_mode.get()
+        for mode, name in COLOR_RANGE_MODE_NAMES.items():
+            if name == selected_name:
+                self.new_state.color_range_mode = mode
+        # Selecting a mode (even the same one) starts its histogram over
+        self.auto_range.reset()
+        self.refresh_gui()
+
+    def on_entry_color_range_fixed(self):
+        # "low, high" in raw counts. Anything else goes back to the saved range.
+        try:
+            values = [int(value) for value in self.strvar_color_range_fixed.get().replace(",", " ").split()]
+        except ValueError:
+            values = []
+        if len(values) == 2 and MIN_VAL <= values[0] < values[1] <= MAX_VAL:
+            self.new_state.color_range_fixed = (values[0], values[1])
+        self.strvar_color_range_fixed.set(", ".join(str(value) for value in self.new_state.color_range_fixed))
+        self.refresh_gui()
+
     def on_chkbtn_mirror_heatmap_image(self):
         self.new_state.mirror_heatmap_image = self.bvar_chkbtn_mirror_image.get()
         icon: str = "\u27F3" if self.new_state.mirror_heatmap_image else "\u27F2"
@@ -557,11 +1114,45 @@ class PressureSensorApp(tk.Tk):
         self.app_state = deepcopy(self.new_state)
         self.save_app_state()
 
+        # Redraw the heatmap right away if it was rotated, mirrored, the smoothing changed or the readings were shown/hidden
+        # (otherwise 'draw_heatmap' finds that nothing changed and returns)
+        self.draw_heatmap()
+
         # Force the GUI to update the display
         self.update_idletasks()
     
     def refresh_frm_data_source(self):
-        pass
+        # Connect to the selected port only while it is the data source
+        self.connection.negotiate_baud_rate = self.new_state.negotiate_baud_rate
+        if self.new_state.data_source == "com_port":
+            self.connection.set_port(self.new_state.com_port)
+        else:
+            self.connection.set_port(None)
+
+        # Open the recording while it is the data source
+        playback_path = self.new_state.playback_file_path if self.new_state.data_source == "Grabación" else None
+        if self.playback is not None and self.playback.reader.path != playback_path:
+            self.playback = None
+        if self.playback is None and playback_path is not None:
+            try:
+                playback = RecordingPlayback(playback_path, self.new_state.playback_speed, self.new_state.playback_loop)
+            except (OSError, ValueError) as error:
+                messagebox.showerror("Error", f"No se pudo abrir la grabación '{os.path.basename(playback_path)}':\n{error}")
+                self.new_state.playback_file_path = None
+            else:
+                playback.set_playing(not self.paused)
+                self.playback = playback
+                self.scale_playback_position.configure(to=max(playback.duration, 1e-3))
+        if self.playback is not None:
+            self.playback.set_speed(self.new_state.playback_speed)
+            self.playback.loop = self.new_state.playback_loop
+        self.strvar_playback_file.set(
+            os.path.basename(self.new_state.playback_file_path) if self.new_state.playback_file_path else "← Seleccionar archivo"
+        )
+        playback_widgets_state = "normal" if self.playback is not None else "disabled"
+        self.scale_playback_position.configure(state=playback_widgets_state)
+        self.chkbtn_playback_loop.configure(state=playback_widgets_state)
+        self.dropdown_playback_speed.configure(state="readonly" if self.playback is not None else "disabled")
 
     def refresh_frm_playpause_etc(self):
         if self.paused:
@@ -575,16 +1166,26 @@ class PressureSensorApp(tk.Tk):
             self.strvar_record.set("◼")
             self.btn_recording_directory.configure(state="disabled")
             self.entry_recording_filename.configure(state="disabled")
+            self.chkbtn_record_video.configure(state="disabled")
         else:
             self.strvar_record.set("⬤")
             self.btn_recording_directory.configure(state="normal")
             self.entry_recording_filename.configure(state="normal")
+            self.chkbtn_record_video.configure(state="normal")
         
         # Disable/Enable the record button based on whether a directory has been selected
         if not self.new_state.recorded_data_save_directory:
             self.btn_record.configure(state="disabled")
+            self.chkbtn_auto_record.configure(state="disabled")
         else:
             self.btn_record.configure(state="normal")
+            self.chkbtn_auto_record.configure(state="normal")
+
+        # Automatic recording settings (the data thread empties the buffer and resets the trigger when it is turned off)
+        self.load_trigger.metric = self.new_state.auto_record_metric
+        self.load_trigger.threshold = self.new_state.auto_record_threshold
+        self.load_trigger.quiet_seconds = self.new_state.auto_record_quiet_seconds
+        # (the data thread resizes the pre-trigger buffer, since it is the only thread that uses it)
 
         # Update the displayed directory name
         if self.new_state.recorded_data_save_directory != self.app_state.recorded_data_save_directory:
@@ -608,11 +1209,89 @@ class PressureSensorApp(tk.Tk):
         pass
 
     def refresh_frm_settings(self):
-        pass
+        # Level 1 doesn't interpolate, so the method doesn't matter
+        self.dropdown_interp_method.configure(state="readonly" if self.new_state.interp_level > 1 else "disabled")
+
+        color_range_changed = (self.auto_range.mode, self.auto_range.fixed_range) != (
+            self.new_state.color_range_mode, tuple(self.new_state.color_range_fixed)
+        )
+        self.auto_range.mode = self.new_state.color_range_mode
+        self.auto_range.fixed_range = tuple(self.new_state.color_range_fixed)
+        if self.displayed_sequence >= 0 and (color_range_changed or self.auto_range.frames == 0):
+            # A new color scale (or its histogram was started over): take the range of the frame on the screen,
+            # instead of waiting for the next frame (there isn't one while paused)
+            self.color_range = self.auto_range.update(self.data)
+        self.entry_color_range_fixed.configure(state="normal" if self.new_state.color_range_mode == "fixed" else "disabled")
+
+
+    ################################################################################################
+    # Main Thread: Draw the newest frame on the heatmap
+    ################################################################################################
+    # The data thread (below) only writes frames to the ring buffer. The main thread draws the newest
+    # one on a timer, so a slow draw doesn't slow down acquisition (it just skips frames), and the
+    # widgets are only touched from the main thread.
+    ################################################################################################
+
+    def display_newest_frame(self):
+        newest = self.frame_ring.read_newest(out=self.data)
+        if newest is not None and newest[1] != self.displayed_sequence:
+            self.data, self.displayed_sequence, _ = newest
+            self.color_range = self.auto_range.update(self.data) # each frame is added to the color scale once
+            self.draw_heatmap()
+            # Each new frame goes into the video once, also when it looked the same as the last one and
+            # wasn't redrawn (redraws after a resize or a setting change aren't new frames)
+            if self.recording and hasattr(self, 'array_for_recorded_data'):
+                self.record_video_frame(self.array_for_recorded_data)
+            if self.playback is not None:
+                self.display_playback_position()
+        self.after(DISPLAY_INTERVAL_MS, self.display_newest_frame)
+
+    def display_playback_frame(self):
+        # While paused, the data thread doesn't run, so a frame that was stepped or jumped to is drawn from here
+        self.data = np.array(self.playback.frame(self.playback.index))
+        self.color_range = self.auto_range.update(self.data)
+        self.draw_heatmap()
+        self.display_playback_position()
+
+    def display_playback_position(self):
+        index = self.playback.index
+        self.strvar_frame_number.set(f"{index + 1} / {len(self.playback)}  ({self.playback.position(index):.2f} s)")
+        self.dvar_playback_position.set(self.playback.position(index))
+
+    def display_frame_timing(self):
+        stats = self.frame_scheduler.stats()
+        if self.paused or stats.frames == 0:
+            self.strvar_frame_timing.set("")
+        elif stats.target_fps is None:
+            self.strvar_frame_timing.set(f"Real: {stats.achieved_fps:.1f} FPS, p95 {stats.frame_time_ms[1]:.0f} ms/fotograma")
+        else:
+            self.strvar_frame_timing.set(
+                f"Real: {stats.achieved_fps:.1f} FPS, retraso p95 {stats.jitter_ms[1]:.1f} ms, {stats.missed_deadlines} perdidos"
+            )
+        if self.render_context.trace_allocations:
+            self.strvar_frame_timing.set(
+                self.strvar_frame_timing.get() + f"\nDibujo: {self.render_context.bytes_allocated} bytes asignados por fotograma"
+                f" (máx. {self.render_context.max_bytes_allocated})"
+            )
+        recording_writer = self.recording_writer
+        if recording_writer is not None:
+            stats = [recording_writer.stats(name) for name in recording_writer.sink_names()]
+            self.strvar_frame_counter.set(str(recording_writer.stats("raw").written))
+            text = f"Descartados: {sum(stat.dropped for stat in stats)}   Con retraso: {sum(stat.late for stat in stats)}"
+            skipped = recording_writer.stats("raw").skipped
+            if skipped:
+                # The size of the frames changed during the recording (e.g. a new region of interest)
+                text += f"\n¡{skipped} fotogramas no se grabaron: son de otro tamaño que la grabación!"
+            errors = [stat.error for stat in stats if stat.error is not None]
+            if errors:
+                # E.g. a full disk. The frames that failed are counted as dropped.
+                text += f"\n¡Error al grabar! {errors[0]}"
+            self.strvar_recording_drops.set(text)
+        self.after(FRAME_TIMING_INTERVAL_MS, self.display_frame_timing)
 
 
     ################################################################################################
-    # Background Thread: Continuously retrieve data and update the heatmap 
+    # Background Thread: Continuously retrieve data and put it in the ring buffer
     ################################################################################################
     # NOTE: all changes to GUI widgets should be done in the main thread, not in this thread.
     # If a widget needs to be updated in this thread, use 'self.after(0, lambda: method_name)' 
@@ -621,206 +1300,230 @@ class PressureSensorApp(tk.Tk):
 
     def threadloop_data_update(self):
         while True:
-            update_started: float = time.time()
+            # Wait until the next frame is due. While the GUI is paused, this waits (without using the CPU) until it is resumed.
+            self.frame_scheduler.wait_for_next_frame(self.target_frames_per_second())
 
-            # If GUI is paused, don't update the data
-            if self.paused:
-                time.sleep(0.1)
-                continue
-                
-            # Get new data
+            # Get new data and hand it to the main thread
             if self.app_state.data_source == "com_port":
-                self.data = self.get_data_from_com_port()
+                frame = self.get_data_from_com_port()
+                if frame is None:
+                    continue # no frame from the mat (the connection state is shown below the port)
             elif self.app_state.data_source == "Simulación":
-                self.data = self.get_data_simulated()
-                
-            # Update the heatmap
-            self.draw_heatmap()
-
-            # Wait until the next frame should happen
-            if self.app_state.frames_per_second == "Max":
+                frame = self.get_data_simulated()
+            elif self.app_state.data_source == "Grabación":
+                frame = self.get_data_from_recorded_data()
+                if frame is None:
+                    continue # still the same frame of the recording (or none is open)
+            else:
+                time.sleep(0.1) # no data source selected
                 continue
-            time_per_frame = 1 / self.app_state.frames_per_second
-            time_to_wait = time_per_frame - (time.time() - update_started)
-            if time_to_wait > 0:
-                time.sleep(time_to_wait)
-
-    def get_data_from_com_port(self) -> np.ndarray:
-        if self.app_state.com_port is None or self.app_state.com_port == "":
-            return np.zeros((10, 10))
-        
-        # Check if the selected com port has changed
-        if self.app_state.com_port != self.serialcomm.port:
-            self.close_serial()
-
-        # Check that the serial port is open and ready
-        if not self.serialcomm.is_open:
-            opened = self.open_serial(self.app_state.com_port)
-            if not opened:
-                # Set the serial port to None so that the user can select a new one
-                # and to prevent the program from trying to open the same port again
-                self.new_state.com_port = None
-                self.app_state.com_port = None
-                self.after(0, lambda: self.save_app_state())
-                self.after(0, lambda: self.strvar_com_port.set(""))
-                return np.zeros((10, 10))
-        
-        # Serial port is open. Request data from the sensor:
-        self.serialcomm.write(b'\x01')
+            timestamp = time.monotonic()
+            sequence = self.frame_ring.write(frame, timestamp)
 
-        # Get the raw data from the sensor
-        raw_data: np.ndarray = self.serial_read_int_array()
+            # Record every frame (not just the ones that are drawn), exactly as it was read
+            if self.app_state.auto_record and self.app_state.recorded_data_save_directory:
+                recording_writer = self.update_auto_recording(frame, timestamp, sequence)
+            else:
+                if self.load_trigger.active or self.pre_trigger_buffer.count:
+                    self.load_trigger.reset()
+                    self.pre_trigger_buffer.clear()
+                recording_writer = self.recording_writer
+            if recording_writer is not None:
+                recording_writer.submit("raw", frame, timestamp, sequence)
+
+    def update_auto_recording(self, frame: np.ndarray, timestamp: float, sequence: int) -> RecordingWriter | None:
+        # Start or stop an automatic recording on this frame. Returns the recording to add the frame to (None if not recording).
+        event = self.load_trigger.update(frame, timestamp)
+        pre_trigger_buffer = self.pre_trigger_buffer
+        if pre_trigger_buffer.seconds != self.app_state.auto_record_pre_trigger_seconds:
+            pre_trigger_buffer.set_seconds(self.app_state.auto_record_pre_trigger_seconds)
+        recording_writer = self.recording_writer
+        if recording_writer is None:
+            if event != "start":
+                pre_trigger_buffer.push(frame, timestamp, sequence)
+                return None
+            # Each automatic recording gets its own file, named after the time it started
+            save_path = os.path.join(
+                self.app_state.recorded_data_save_directory,
+                f"{self.app_state.recorded_data_filename}_{time.strftime('%Y%m%d_%H%M%S')}",
+            )
+            with self.recording_lock:
+                if self.recording_writer is not None:
+                    return self.recording_writer # the record button was pressed in the meantime
+                try:
+                    recording_writer = self.open_recording(save_path, frame.shape)
+                except OSError as error:
+                    # No new attempt until the load is gone and comes back (the trigger stays active until then)
+                    message = f"No se pudo crear el archivo '{os.path.basename(save_path)}{RAW_RECORDING_EXTENSION}':\n{error}"
+                    self.after(0, lambda: messagebox.showerror("Error", message))
+                    return None
+                # The frames from before the load reached the threshold go first
+                for old_frame, old_timestamp, old_sequence in pre_trigger_buffer.drain(timestamp):
+                    recording_writer.submit("raw", old_frame, old_timestamp, old_sequence)
+                self.recording_writer = recording_writer
+                self.recording_started_automatically = True
+            self.after(0, self.on_recording_started)
+        elif event == "stop" and self.recording_started_automatically:
+            # This frame ends the quiet period, so it is recorded before the recording is closed (a closed writer
+            # drops it). A recording started with the button is only stopped with the button.
+            recording_writer.submit("raw", frame, timestamp, sequence)
+            self.close_recording(wait=False)
+            self.after(0, self.on_recording_stopped)
+            return None
+        return recording_writer
+
+    def target_frames_per_second(self) -> float | None:
+        # Frame rate for the scheduler. None means as fast as the Arduino can send frames.
+        if self.app_state.frames_per_second != "Max":
+            return self.app_state.frames_per_second
+        if self.app_state.data_source == "Simulación":
+            return SIMULATION_MAX_FPS # nothing else would slow the simulation down
+        if self.app_state.data_source == "Grabación":
+            return PLAYBACK_MAX_FPS # the playback follows the recording's own timing, this is just how often it is checked
+        return None
+
+    def get_data_from_com_port(self) -> np.ndarray | None:
+        # The next frame from the mat, or None if there isn't one (not connected, or timed out). No placeholder
+        # frame is made up then: it would change the size of the frames in the ring buffer and in recordings.
+        # Wait (without using the CPU) while the connection manager connects to the port
+        if not self.connection.wait_until_connected(timeout=0.1):
+            return None
+
+        with self.connection.lock:
+            if not self.connection.connected:
+                return None
+            if self.connection.connection_count != self.connection_count:
+                # New connection. The Arduino has reset, so forget what was negotiated with it.
+                self.frame_acquirer.reset()
+                self.connection_count = self.connection.connection_count
+
+            # Serial port is open. Request data from the sensor and get the raw data
+            try:
+                raw_data: np.ndarray = self.frame_acquirer.get_frame(
+                    self.connection.serialcomm, self.app_state.acquisition_mode, self.app_state.wire_format, self.app_state.roi
+                )
+            except (serial.SerialException, OSError):
+                # Unplugged or reset. The connection manager reconnects.
+                self.connection.connection_lost()
+                return None
+        if raw_data.size == 0:
+            # Timed out, or no streamed frame has arrived yet
+            return None
         # TODO: calculations on the raw data, calibrations, etc...
         return raw_data
  
-    def serial_read_uint16(self) -> int:
-        vals: bytes = self.serialcomm.read(2) # read two bytes of binary data
-        value = int.from_bytes(vals, 'little') # convert the bytes to an integer
-        return value
-    
-    def serial_read_int_array(self) -> np.ndarray:
-        rows: int = self.serial_read_uint16() # read the number of rows
-        cols: int = self.serial_read_uint16() # read the number of columns
-        vals: bytes = self.serialcomm.read(rows * cols * 2) # read all data
-        
-        # iterate over the vals and fill the data array
-        data: np.ndarray = np.zeros((rows, cols), dtype=int)
-        for i in range(0, len(vals), 2):
-            row: int = i // (cols * 2)
-            col: int = (i // 2) % cols
-            data[row, col] = int.from_bytes(vals[i:i+2], 'little')
-        return data
-
-    def get_data_from_recorded_data(self) -> np.ndarray:
-        return np.zeros((10, 10))
+    def get_data_from_recorded_data(self) -> np.ndarray | None:
+        # The frame of the recording for the current playback time (a view of the file, copied into the ring buffer),
+        # or None if it was already handed out
+        playback = self.playback
+        if playback is None:
+            time.sleep(0.1) # no recording selected
+            return None
+        next_frame = playback.next_frame()
+        return None if next_frame is None else next_frame[0]
     
     def get_data_simulated(self) -> np.ndarray:
         rows = 16
         cols = 16
-        data = np.zeros((rows, cols))
-
-        # Generate heatmap data based on sine waves and the current time
-        for i in range(16):
-            for j in range(16):
-                data[i][j] = np.clip(
-                    np.sin(2*np.pi*(j+1/2)/rows) * 
-                    np.sin(np.pi*(i+1/2)/cols) * 
-                    np.sin(time.time()), 0, 1
-                    )         
-        return data
+        i = np.arange(rows, dtype=CALIBRATED_DTYPE).reshape(-1, 1)
+        j = np.arange(cols, dtype=CALIBRATED_DTYPE).reshape(1, -1)
+
+        # Generate heatmap data based on sine waves and the current time (in float32)
+        data = np.clip(
+            np.sin(2*np.pi*(j+1/2)/rows) * 
+            np.sin(np.pi*(i+1/2)/cols) * 
+            CALIBRATED_DTYPE(np.sin(time.time())), 0, 1
+            ) * MAX_VAL
+        # Raw readings, on the same scale as the Arduino's (uint16)
+        return data.astype(RAW_DTYPE)
+
+    def update_heatmap_geometry(self) -> bool:
+        # Rebuild the index maps from heatmap samples to canvas pixels if the canvas size, rotation, mirroring,
+        # frame size or interpolation level changed. Returns True if they were rebuilt.
+        return self.render_context.update_geometry(
+            self.data.shape,
+            (self.canvas_heatmap.winfo_width(), self.canvas_heatmap.winfo_height()),
+            self.app_state.rotate_heatmap_image,
+            self.app_state.mirror_heatmap_image,
+            self.app_state.interp_level,
+        )
 
     def draw_heatmap(self, canvas_resized: bool = False):
-        # Heatmap image starts as a copy of the data
-        heatmap_image: np.ndarray = self.data.copy()
-
-        # Rotate and/or mirror the image as needed
-        if self.app_state.rotate_heatmap_image == 90:
-            heatmap_image = np.rot90(heatmap_image)
-        elif self.app_state.rotate_heatmap_image == 180:
-            heatmap_image = np.rot90(heatmap_image, 2)
-        elif self.app_state.rotate_heatmap_image == 270:
-            heatmap_image = np.rot90(heatmap_image, 3)
-        if self.app_state.mirror_heatmap_image:
-            heatmap_image = np.fliplr(heatmap_image)
-
-
+        # The index maps are rebuilt here (only) when the canvas size, a setting or the frame size changed
+        with self.render_context.measure_allocations():
+            # The color scale: readings at or below 'low' get the first color of the colormap, readings at or
+            # above 'high' the last color. It comes from a histogram of recent frames and changes smoothly
+            # (it is updated when a new frame is displayed, not when the same frame is redrawn).
+            low, high = self.color_range
+
+            # While GUI is being built, canvas size may be 0. This prevents an error:
+            self.update_heatmap_geometry()
+            geometry = self.render_context.geometry
+            if 0 in geometry.image_size:
+                return
 
-        MAX_VAL = np.max(heatmap_image)
-        p25 = np.percentile(heatmap_image, 25) # calculate the 25th percentile
-        
-        MIN_VAL = np.min(heatmap_image)
-        if(MAX_VAL <= 0):
-            MAX_VAL = 1023
-        # Interpolate the data (smooth it out)
-        ndimage.zoom(heatmap_image, zoom=4, order=3, mode='nearest')
-        heatmap_image = np.clip(heatmap_image, MIN_VAL, MAX_VAL)
-
-        # Build and apply a colormap to the data (making the data an RGB image)
-        normalized_data = (heatmap_image - p25) / (MAX_VAL - p25)
-        heatmap_image = apply_colormap(normalized_data, "inferno") # causing possible error
-        heatmap_image *= 255 # Convert to 0-255 range (for RGB) rather than 0-1
-
-        # Calculate the size of each heatmap cell based on the size of the canvas
-        rows, cols = heatmap_image.shape[:2]
-        canvas_width: int = self.canvas_heatmap.winfo_width() # pixels
-        canvas_height: int = self.canvas_heatmap.winfo_height() # pixels
-        canvas_aspect_ratio: float = canvas_width / canvas_height
-        if canvas_aspect_ratio > ASPECT_RATIO: 
-            # canvas will be wider than the heatmap
-            cell_height: int = int(canvas_height / rows)
-            cell_width: int = int(cell_height / ASPECT_RATIO)
-        else: 
-            # canvas will be taller than the heatmap
-            cell_width: int = int(canvas_width / cols)
-            cell_height: int = int(cell_width * ASPECT_RATIO)
-
-        # While GUI is being built, canvas size may be 0. This prevents an error:
-        if cell_width == 0 or cell_height == 0:
-            return
-        
-        # Scale the data based on the calculated cell sizes
-        heatmap_image = np.repeat(heatmap_image, cell_width, axis=1)
-        heatmap_image = np.repeat(heatmap_image, cell_height, axis=0)
-        heatmap_image = np.ascontiguousarray(heatmap_image) # Make it a C-contiguous array for faster drawing
-        heatmap_image = heatmap_image.astype(np.uint8)
-
-        # There may be some extra space on the canvas. 
-        # Fill it in by expanding a few of the cell widths/heights by 1 pixel.
-        leftover_height: int = canvas_height - (cell_height * rows)
-        leftover_width: int = canvas_width - (cell_width * cols)
-        if canvas_aspect_ratio > ASPECT_RATIO:
-            pixels_to_add = leftover_height
-        else:
-            pixels_to_add = leftover_width
-        for pixel in range(pixels_to_add):
-            i = pixel * cell_height + int(cell_height/2)
-            j = pixel * cell_width + int(cell_width/2)
-            heatmap_image = np.insert(heatmap_image, i, heatmap_image[i, :], axis=0)
-            heatmap_image = np.insert(heatmap_image, j, heatmap_image[:, j], axis=1)
-
-        # Draw the heatmap on the canvas
-        topmost_pixel = 0 if canvas_aspect_ratio > ASPECT_RATIO else int((leftover_height - leftover_width) / 2)
-        leftmost_pixel = 0 if canvas_aspect_ratio < ASPECT_RATIO else int((leftover_width - leftover_height) / 2)
-        pil_image = Image.fromarray(heatmap_image)       #this is what makes the actual heatmap from the data array
-        if not hasattr(self, 'heatmap_photo') or canvas_resized:
-            self.heatmap_photo = ImageTk.PhotoImage(pil_image)     
-            self.heatmap_image_id = self.canvas_heatmap.create_image(
-                leftmost_pixel, topmost_pixel, anchor="nw", image=self.heatmap_photo
-            )
-        else:
-            self.heatmap_photo.paste(pil_image)
-            self.canvas_heatmap.coords(self.heatmap_image_id, (leftmost_pixel, topmost_pixel)) #error with input arguments
+            # Compare the frame with the one on the screen. Frames that didn't change by more than the
+            # threshold are skipped, unless the heatmap must be redrawn with new settings or colors.
+            if canvas_resized:
+                self.frame_change_detector.reset()
+            interp_level, interp_method = self.app_state.interp_level, self.app_state.interp_method
+            show_values = self.app_state.display_vals_on_heatmap
+            drawn_with = (geometry.rebuilds, interp_level, interp_method, show_values, low, high)
+            changed_box = self.frame_change_detector.changed_box(self.data, self.app_state.redraw_threshold)
+            if changed_box is None and drawn_with == self.heatmap_drawn_with:
+                self.frame_change_detector.skipped_frames += 1
+                return
 
-        self.array_for_recorded_data = heatmap_image
-        
-        # Save the heatmap frame in video record
-        if self.recording:
-            self.create_video_from_frames(file_path, 30, heatmap_image)
+            # Redraw everything if the colors or settings changed or most of the frame changed. Otherwise only
+            # redraw the bounding box of the changed cells (plus the samples interpolated from them).
+            rows, cols = self.data.shape
+            first_row, end_row, first_col, end_col = changed_box if changed_box is not None else (0, rows, 0, cols)
+            photo_size_ok = (hasattr(self, 'heatmap_photo') and not canvas_resized
+                             and (self.heatmap_photo.width(), self.heatmap_photo.height()) == geometry.image_size)
+            redraw_all = (not photo_size_ok or drawn_with != self.heatmap_drawn_with
+                          or (end_row - first_row) * (end_col - first_col) > PARTIAL_REDRAW_MAX_FRACTION * rows * cols)
+
+            leftmost_pixel, topmost_pixel = geometry.offset
+            if redraw_all:
+                # Interpolate, color, rotate, mirror, scale to the canvas and draw the readings on it if they are
+                # shown (see 'heatmap_renderer.py')
+                heatmap_image = self.render_context.render(self.data, low, high, interp_level, interp_method, show_values)
+
+                # Draw the heatmap on the canvas
+                pil_image = Image.fromarray(heatmap_image)       #this is what makes the actual heatmap from the data array
+                if not photo_size_ok:
+                    if hasattr(self, 'heatmap_image_id'):
+                        self.canvas_heatmap.delete(self.heatmap_image_id)
+                    self.heatmap_photo = ImageTk.PhotoImage(pil_image)     
+                    self.heatmap_image_id = self.canvas_heatmap.create_image(
+                        leftmost_pixel, topmost_pixel, anchor="nw", image=self.heatmap_photo
+                    )
+                else:
+                    self.heatmap_photo.paste(pil_image)
+                    self.canvas_heatmap.coords(self.heatmap_image_id, (leftmost_pixel, topmost_pixel)) #error with input arguments
+                self.frame_change_detector.mark_drawn(self.data)
+                self.heatmap_drawn_with = drawn_with
+            else:
+                left, top, right, bottom = self.render_context.render_region(
+                    self.data, low, high, interp_level, interp_method, changed_box, show_values
+                )
+                heatmap_image = self.render_context.image
+
+                # ImageTk.PhotoImage.paste() can only paste the whole image (its 'box' argument was removed in
+                # Pillow 10), so the changed region goes into a small photo image that Tk copies into place
+                if left < right and top < bottom:
+                    patch = ImageTk.PhotoImage(Image.fromarray(heatmap_image[top:bottom, left:right]))
+                    self.tk.call(str(self.heatmap_photo), "copy", str(patch), "-to", left, top)
+                self.frame_change_detector.mark_drawn(self.data, changed_box)
+
+            self.array_for_recorded_data = heatmap_image # (the image that goes into the video)
        
-    def create_video_from_frames(self, folder: str, fps: int, frame_to_add: np.array):
-        global video
-        # create folder to store the video
-        # if not os.path.exists(folder):
-        #     try:
-        #         #os.makedirs(folder)
-        #         print(folder)
-        #     except Exception as e:
-        #             print("error from folder")
-        #names the video
-        video_path = folder + ".mp4"
-        
-        height, width, layers = frame_to_add.shape
-
-        # create video
-        if video is None:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video = cv2.VideoWriter(video_path, fourcc, fps, (width, height), True)
-
-        # convert RGB to BGR for video record
-        frame = cv2.cvtColor(frame_to_add, cv2.COLOR_RGB2BGR)
-
-        # Write frame to the video
-        video.write(frame)
+    def record_video_frame(self, heatmap_image: np.ndarray):
+        # Hand the heatmap image to the writer thread, which encodes it to the video (if one is being recorded).
+        # The image is converted to BGR into the video's own buffer here, so the heatmap can be redrawn right away.
+        recording_writer = self.recording_writer
+        if recording_writer is not None:
+            recording_writer.submit("video", heatmap_image)
 
 
     def save_heatmap_data(self, heatmap_image: np.ndarray, data_filename: str, image_filename: str):
@@ -828,7 +1531,7 @@ class PressureSensorApp(tk.Tk):
         np.save(data_filename, heatmap_image)
     
     # Save the heatmap as an image
-        pil_image = Image.fromarray(heatmap_image.astype(np.uint8))
+        pil_image = Image.fromarray(heatmap_image.astype(PIXEL_DTYPE, copy=False))
         pil_image.save(image_filename)
 
 
@@ -839,46 +1542,12 @@ class PressureSensorApp(tk.Tk):
     # Helper methods 
     ################################################################################################
 
-    def open_serial(self, port: str) -> bool:
-        try:
-            # Attempt to open serial port. May raise a SerialException.
-            self.serialcomm = serial.Serial(port, SERIAL_BAUD_RATE, timeout=4)
-            time.sleep(0.01) # Wait for the serial port to open
-            
-            # Check that the serial port opened successfully
-            if not self.serialcomm.is_open:
-                raise Exception("Serial port did not open.")
-            
-            # Wait up to 3 seconds for a signal from the Arduino that it is ready
-            ready_signal_received = False
-            start_time = time.time()
-            while time.time() - start_time < 3:
-                if self.serialcomm.in_waiting > 0:
-                    if self.serialcomm.read(size=1) == SERIAL_COMM_SIGNAL:
-                        ready_signal_received = True
-                        break
-            if not ready_signal_received:
-                raise Exception(f"Ready signal '{SERIAL_COMM_SIGNAL}' not received within 3 seconds.")
-
-            # Serial port is open and ready
-            return True
-        
-        except (serial.SerialException, Exception) as e:
-            messagebox.showerror(
-                "Serial Port Error",
-                "Error opening serial port: \n\n" \
-                f"{str(e)}"
-            )
-            self.close_serial()            
-            return False
-        
-    def close_serial(self):
-        global video
-        if video is not None:
-            video.release()
-            video = None
-        self.serialcomm.close()
-        
+    def close_recording(self, wait: bool):
+        # Stop recording. The threads stop submitting frames as soon as 'recording_writer' is None, and the writer
+        # thread writes the frames that are still queued and closes the files (wait=True waits for it to finish).
+        recording_writer, self.recording_writer = self.recording_writer, None
+        if recording_writer is not None:
+            recording_writer.close(wait=wait)
 
     def save_app_state(self):
         with open(STATE_FILE_PATH, "w") as file:
@@ -886,6 +1555,7 @@ class PressureSensorApp(tk.Tk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # the video export's worker processes start this file again when it is packaged with pyinstaller
     app = PressureSensorApp()
     app.mainloop()
 
@@ -0,0 +1,380 @@
+"""
+A stand-in for the Arduino running 'pressure_sensor/pressure_sensor.ino', for testing the
+serial code of the PressureSensorApp without the pressure mat.
+
+It creates a pseudo-terminal (pty) that behaves like the Arduino's serial port:
+    - When a program opens the port, it "boots" and sends the ready byte.
+    - Every request byte it receives is answered with one frame (rows, cols, values),
+      paced like the real hardware (scan settling delays and the serial baud rate).
+    - Requests that arrive while a frame is being sent wait until that frame is done,
+      just like in the Arduino's serial receive buffer.
+    - The start/stop streaming commands turn on/off continuous streaming of frames with
+      a sync word, sequence number and checksum.
+    - The wire format commands switch between uint16, packed 10-bit and delta values, and are echoed
+      back. 'supports_packed_format=False' behaves like older firmware that ignores them.
+    - The ROI request is answered with only the requested window of the matrix, scanned in proportionally
+      less time. 'supports_roi=False' behaves like older firmware that ignores it.
+    - 'static_frames=True' only changes a few cells by a few counts per frame (someone standing still),
+      which is where the delta format pays off.
+    - 'byte_loss_rate' randomly drops bytes on their way to the computer, to test resyncing.
+    - The baud rate negotiation switches its baud rate and echoes loopback bursts. It sees the baud rate the
+      program set on the port, and corrupts the bytes it sends while the two don't match, or while its
+      rate is above 'max_baud_rate' (like an Arduino Uno, that can't keep up at 2 Mbaud).
+      'loses_baud_confirmation=True' loses its acknowledgement of CONFIRM_BAUD on the way to the computer.
+
+Only works on Linux/macOS (pty is not available on Windows).
+
+Run this file directly to get a port name that can be opened by the app or any other script:
+    python arduino_stand_in.py
+"""
+
+import os
+import errno
+import select
+import threading
+import time
+import termios
+import tty
+import numpy as np
+
+from frame_decoder import pack_10bit, encode_delta_frame, wire_body_size
+
+READY_SIGNAL = b'\x01' # Sent when the "Arduino" has finished booting
+GET_DATA = 0b1 # Request for a frame (same as GET_DATA in pressure_sensor.ino)
+START_STREAM = 0b10 # Same as START_STREAM in pressure_sensor.ino
+STOP_STREAM = 0b11 # Same as STOP_STREAM in pressure_sensor.ino
+SYNC_WORD = 0x5AA5 # Same as SYNC_WORD in pressure_sensor.ino
+SET_PACKED_FORMAT = 0b100 # Same as SET_PACKED_FORMAT in pressure_sensor.ino
+SET_UINT16_FORMAT = 0b101 # Same as SET_UINT16_FORMAT in pressure_sensor.ino
+SET_DELTA_FORMAT = 0b110 # Same as SET_DELTA_FORMAT in pressure_sensor.ino
+REQUEST_KEY_FRAME = 0b111 # Same as REQUEST_KEY_FRAME in pressure_sensor.ino
+NEGOTIATE_BAUD = 0b1000 # Same as NEGOTIATE_BAUD in pressure_sensor.ino
+LOOPBACK_TEST = 0b1001 # Same as LOOPBACK_TEST in pressure_sensor.ino
+CONFIRM_BAUD = 0b1010 # Same as CONFIRM_BAUD in pressure_sensor.ino
+GET_ROI = 0b1011 # Same as GET_ROI in pressure_sensor.ino
+BAUD_CONFIRM_TIMEOUT = 0.5 # seconds, same as BAUD_CONFIRM_TIMEOUT_MS in pressure_sensor.ino
+
+SETTLE_TIME = 100e-6 # seconds, the 'delayMicroseconds(100)' after each mux/demux switch
+ANALOG_READ_TIME = 112e-6 # seconds, approximate duration of an 'analogRead' on an Arduino Uno
+
+
+class ArduinoStandIn:
+
+    def __init__(self, rows: int = 16, cols: int = 16, baud_rate: int = 115200, boot_time: float = 0.1, 
+                 realistic_timing: bool = True, byte_loss_rate: float = 0.0, supports_packed_format: bool = True, 
+                 static_frames: bool = False, supports_baud_negotiation: bool = True, max_baud_rate: int = 1000000,
+                 supports_roi: bool = True, loses_baud_confirmation: bool = False) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.baud_rate = baud_rate # current baud rate, changed by the baud rate negotiation
+        self.reset_baud_rate = baud_rate # baud rate after a reset
+        self.boot_time = boot_time # seconds between the port being opened and the ready byte
+        self.realistic_timing = realistic_timing # pace frames like the real hardware
+        self.byte_loss_rate = byte_loss_rate # fraction of the sent bytes that are randomly lost
+        self.supports_packed_format = supports_packed_format # False to behave like older firmware
+        self.static_frames = static_frames # True for a nearly static load instead of a moving wave
+        self.supports_baud_negotiation = supports_baud_negotiation # False to behave like older firmware
+        self.max_baud_rate = max_baud_rate # highest baud rate that works without errors
+        self.supports_roi = supports_roi # False to behave like older firmware
+        self.loses_baud_confirmation = loses_baud_confirmation # True to keep a new baud rate without the computer knowing
+
+        self.frames_sent: int = 0
+        self.connected: bool = False
+        self.streaming: bool = False
+        self.packed_format: bool = False
+        self.delta_format: bool = False
+        self.key_frame_interval: int = 30
+        self.frames_since_key_frame: int = 0
+        self.previous_frame: np.ndarray | None = None
+        self.frame_sequence: int = 0
+        self._rng = np.random.default_rng()
+
+        # Create the pseudo-terminal. The "Arduino" side is the master, the app opens the slave.
+        self._master_fd, slave_fd = os.openpty()
+        tty.setraw(slave_fd)
+        self.port: str = os.ttyname(slave_fd)
+        # Close our copy of the slave so we can tell when a program opens/closes the port
+        os.close(slave_fd)
+        os.set_blocking(self._master_fd, False)
+
+        self._rx_buffer = bytearray()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._threadloop, daemon=True)
+
+    def start(self) -> "ArduinoStandIn":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master_fd)
+
+    ################################################################################################
+    # The "firmware"
+    ################################################################################################
+
+    def setup(self):
+        # Equivalent of 'setup()' in the sketch
+        self._rx_buffer.clear()
+        self.streaming = False
+        self.packed_format = False
+        self.delta_format = False
+        self.baud_rate = self.reset_baud_rate
+        self.write(READY_SIGNAL)
+
+    def loop(self):
+        # Equivalent of 'loop()' in the sketch: handle a command, then stream a frame if streaming
+        byte = self.read_byte(timeout=0 if self.streaming else 0.05)
+        if byte == GET_DATA:
+            self.send_uint16s([self.rows, self.cols])
+            self.collect_and_send_data()
+        elif byte == START_STREAM:
+            self.streaming = True
+            self.frames_since_key_frame = 0
+        elif byte == STOP_STREAM:
+            self.streaming = False
+        elif byte in (SET_PACKED_FORMAT, SET_UINT16_FORMAT) and self.supports_packed_format:
+            self.packed_format = byte == SET_PACKED_FORMAT
+            self.delta_format = False
+            self.write(bytes([byte]))
+        elif byte == REQUEST_KEY_FRAME:
+            self.frames_since_key_frame = 0
+        elif byte == SET_DELTA_FORMAT and self.supports_packed_format:
+            interval = None
+            while interval is None and not self._stop.is_set():
+                interval = self.read_byte()
+            self.key_frame_interval = max(interval or 1, 1)
+            self.frames_since_key_frame = 0
+            self.packed_format = False
+            self.delta_format = True
+            self.write(bytes([byte]))
+        elif byte == NEGOTIATE_BAUD and self.supports_baud_negotiation:
+            self.negotiate_baud_rate()
+        elif byte == GET_ROI and self.supports_roi:
+            window = self.read_bytes_before(4, time.monotonic() + 1)
+            if window is not None:
+                first_row, first_col, rows, cols = (value & 0x7F for value in window)
+                first_row = min(first_row, self.rows - 1)
+                first_col = min(first_col, self.cols - 1)
+                rows = min(max(rows, 1), self.rows - first_row)
+                cols = min(max(cols, 1), self.cols - first_col)
+                self.send_uint16s([self.rows, self.cols, first_row, first_col, rows, cols])
+                self.collect_and_send_data(first_row, first_col, rows, cols)
+        elif byte == LOOPBACK_TEST and self.supports_baud_negotiation:
+            self.echo_loopback_test(time.monotonic() + BAUD_CONFIRM_TIMEOUT)
+
+        if self.streaming:
+            self.send_stream_frame()
+
+    def negotiate_baud_rate(self):
+        # Switch to the proposed rate, echo test bursts, and keep the rate only if it's confirmed in time
+        deadline = time.monotonic() + BAUD_CONFIRM_TIMEOUT
+        rate_bytes = self.read_bytes_before(4, deadline)
+        if rate_bytes is None:
+            return
+        self.write(bytes([NEGOTIATE_BAUD])) # acknowledge at the old rate
+        old_baud_rate = self.baud_rate
+        self.baud_rate = int.from_bytes(rate_bytes, "little")
+
+        deadline = time.monotonic() + BAUD_CONFIRM_TIMEOUT
+        while time.monotonic() < deadline and not self._stop.is_set():
+            command = self.read_byte(timeout=min(0.05, max(0.0, deadline - time.monotonic())))
+            if command == LOOPBACK_TEST:
+                if not self.echo_loopback_test(deadline):
+                    break
+            elif command == CONFIRM_BAUD:
+                if not self.loses_baud_confirmation:
+                    self.write(bytes([CONFIRM_BAUD]))
+                return
+        self.baud_rate = old_baud_rate
+
+    def echo_loopback_test(self, deadline: float) -> bool:
+        length_bytes = self.read_bytes_before(2, deadline)
+        if length_bytes is None:
+            return False
+        burst = self.read_bytes_before(int.from_bytes(length_bytes, "little"), deadline)
+        if burst is None:
+            return False
+        if self.realistic_timing:
+            time.sleep(self.transfer_time(len(burst)))
+        self.write(burst)
+        return True
+
+    def read_bytes_before(self, num_bytes: int, deadline: float) -> bytes | None:
+        # Wait for 'num_bytes' bytes until 'deadline' (time.monotonic). Returns None on timeout.
+        while len(self._rx_buffer) < num_bytes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                return None
+            self._receive(min(0.05, remaining))
+        data = bytes(self._rx_buffer[:num_bytes])
+        del self._rx_buffer[:num_bytes]
+        return data
+
+    def send_stream_frame(self):
+        self.send_uint16s([SYNC_WORD, self.frame_sequence, self.rows, self.cols])
+        if self.delta_format:
+            frame, payload_length = self.collect_and_send_delta_frame()
+        else:
+            frame, payload_length = self.collect_and_send_data(), 0
+        checksum = (self.frame_sequence + self.rows + self.cols + payload_length + int(frame.sum())) & 0xFFFF
+        self.send_uint16s([checksum])
+        self.frame_sequence = (self.frame_sequence + 1) & 0xFFFF
+
+    def collect_and_send_data(self, first_row: int = 0, first_col: int = 0, rows: int | None = None, cols: int | None = None) -> np.ndarray:
+        # Scan and send the window of 'rows' x 'cols' cells starting at (first_row, first_col). Defaults to the whole matrix.
+        rows = self.rows if rows is None else rows
+        cols = self.cols if cols is None else cols
+        frame = self.frame_values()[first_row:first_row + rows, first_col:first_col + cols]
+        wire_format = "packed10" if self.packed_format else "uint16"
+        row_bytes = wire_body_size(frame.size, wire_format) / rows
+        row_time = SETTLE_TIME + cols * (SETTLE_TIME + ANALOG_READ_TIME)
+        if self.realistic_timing:
+            # Scanning and sending overlap on the Arduino, so a row takes whichever is slower
+            time.sleep(max(row_time, self.transfer_time(row_bytes)) * rows)
+        if self.packed_format:
+            self.write(pack_10bit(frame))
+        else:
+            self.send_uint16s(frame)
+        self.frames_sent += 1
+        return frame
+
+    def collect_and_send_delta_frame(self) -> tuple[np.ndarray, int]:
+        frame = self.frame_values()
+        key_frame = self.frames_since_key_frame == 0
+        self.frames_since_key_frame = (self.frames_since_key_frame + 1) % self.key_frame_interval
+        payload = encode_delta_frame(frame, None if key_frame else self.previous_frame)
+        self.previous_frame = frame
+        if self.realistic_timing:
+            # The whole frame is scanned before it is sent
+            scan_time = self.rows * (SETTLE_TIME + self.cols * (SETTLE_TIME + ANALOG_READ_TIME))
+            time.sleep(scan_time + self.transfer_time(2 + len(payload)))
+        self.send_uint16s([len(payload)])
+        self.write(payload)
+        self.frames_sent += 1
+        return frame, len(payload)
+
+    def send_uint16s(self, values):
+        self.write(np.asarray(values, dtype="<u2").tobytes())
+
+    def frame_values(self) -> np.ndarray:
+        if self.static_frames:
+            # Someone standing still: a fixed load plus a little noise on a few cells
+            base = self._wave(1.0)
+            noise = self._rng.integers(-3, 4, size=(self.rows, self.cols), dtype=np.int16) * (self._rng.random((self.rows, self.cols)) < 0.1)
+            return np.clip(base.astype(np.int16) + noise, 0, 1023).astype(np.uint16)
+        return self._wave(np.sin(time.time()))
+
+    def _wave(self, amplitude: float) -> np.ndarray:
+        # Simulated readings (0-1023) that change over time
+        i = np.arange(self.rows).reshape(-1, 1)
+        j = np.arange(self.cols).reshape(1, -1)
+        wave = np.sin(2*np.pi*(j+1/2)/self.cols) * np.sin(np.pi*(i+1/2)/self.rows) * amplitude
+        return (np.clip(wave, 0, 1) * 1023).astype(np.uint16)
+
+    def transfer_time(self, num_bytes: int) -> float:
+        # 10 bits per byte on the wire (start bit + 8 data bits + stop bit)
+        return num_bytes * 10 / self.baud_rate
+
+    ################################################################################################
+    # Serial port emulation
+    ################################################################################################
+
+    def read_byte(self, timeout: float = 0.05) -> int | None:
+        # Like 'Serial.read()' but waits up to 'timeout' seconds for a byte
+        if not self._rx_buffer:
+            self._receive(timeout)
+        if not self._rx_buffer:
+            return None
+        return self._rx_buffer.pop(0)
+
+    def write(self, data: bytes):
+        if self.byte_loss_rate > 0:
+            lost = self._rng.random(len(data)) < self.byte_loss_rate
+            data = np.frombuffer(data, dtype=np.uint8)[~lost].tobytes()
+        if not self._link_works():
+            # Bytes sent at the wrong baud rate arrive as garbage
+            data = self._rng.integers(0, 256, size=len(data), dtype=np.uint8).tobytes()
+        view = memoryview(data)
+        while view and not self._stop.is_set():
+            select.select([], [self._master_fd], [], 0.05)
+            try:
+                n = os.write(self._master_fd, view)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                if e.errno == errno.EIO: # port was closed
+                    raise _Disconnected()
+                raise
+            view = view[n:]
+
+    def _receive(self, timeout: float):
+        select.select([self._master_fd], [], [], timeout)
+        try:
+            self._rx_buffer += os.read(self._master_fd, 4096)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            if e.errno == errno.EIO: # port was closed
+                raise _Disconnected()
+            raise
+
+    def _link_works(self) -> bool:
+        if self.baud_rate > self.max_baud_rate:
+            return False
+        host_baud_rate = _TERMIOS_BAUD_RATES.get(termios.tcgetattr(self._master_fd)[5])
+        # Rates termios has no constant for can't be checked, assume they match
+        return host_baud_rate is None or host_baud_rate == self.baud_rate
+
+    def _port_is_open(self) -> bool:
+        # Reading the master raises EIO while no program has the slave open
+        try:
+            self._rx_buffer += os.read(self._master_fd, 4096)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            if e.errno == errno.EIO:
+                return False
+            raise
+        return True
+
+    def _threadloop(self):
+        while not self._stop.is_set():
+            if not self.connected:
+                if not self._port_is_open():
+                    time.sleep(0.01)
+                    continue
+                # The Arduino resets when the port is opened. Boot, then send the ready byte.
+                time.sleep(self.boot_time)
+                self.connected = True
+                try:
+                    self.setup()
+                except _Disconnected:
+                    self.connected = False
+                continue
+
+            try:
+                self.loop()
+            except _Disconnected:
+                self.connected = False
+
+
+# Baud rate constants of termios (the speed the program set on the port) to bits/sec
+_TERMIOS_BAUD_RATES = {getattr(termios, f"B{rate}"): rate
+                       for rate in (9600, 19200, 38400, 57600, 115200, 230400, 460800, 500000, 921600, 1000000, 2000000)
+                       if hasattr(termios, f"B{rate}")}
+
+
+class _Disconnected(Exception):
+    pass
+
+
+if __name__ == "__main__":
+    stand_in = ArduinoStandIn().start()
+    print(f"Arduino stand-in listening on {stand_in.port} (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stand_in.stop()
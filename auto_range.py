@@ -0,0 +1,112 @@
+"""
+Chooses the range of readings the colormap is stretched over (the color scale), from a histogram.
+
+Readings are 10-bit (0 to ADC_LEVELS-1), so a histogram with one bin per possible reading is exact.
+Adding a frame to it is one 'np.bincount' (linear in the number of cells, no sorting), and any
+quantile is read from the cumulative sum of the 1024 bins, so the cost of a frame doesn't grow
+with sorting thousands of cells.
+
+The histogram covers:
+    - "rolling": the last 'rolling_window' frames. Each frame's counts are kept in a ring, and
+      subtracted again when the frame leaves the window.
+    - "session": every frame since the session started (or 'reset()' was called).
+    - "fixed": nothing, the range is 'fixed_range'.
+
+The low end of the range is the LOW_QUANTILE (readings at or below it get the first color, like
+the 25th percentile the heatmap used before), and the high end is the maximum. The range then
+moves smoothly towards the new target, so the colors don't jump from frame to frame, and is
+rounded to whole counts, so the colormap lookup table is only rebuilt when the range really moves.
+"""
+
+from typing import Literal
+import numpy as np
+
+from colormaps import ADC_LEVELS
+
+
+RangeMode = Literal["rolling", "session", "fixed"]
+
+LOW_QUANTILE = 0.25 # readings at or below this quantile get the first color
+HIGH_QUANTILE = 1.0 # readings at or above this quantile get the last color (1.0: the maximum)
+DEFAULT_ROLLING_WINDOW = 60 # frames (about 1 second at full speed)
+DEFAULT_SMOOTHING = 0.2 # fraction of the way the range moves towards its target each frame (1: no smoothing)
+
+
+class AutoRange:
+
+    def __init__(self, mode: RangeMode = "rolling", rolling_window: int = DEFAULT_ROLLING_WINDOW,
+                 smoothing: float = DEFAULT_SMOOTHING, fixed_range: tuple[int, int] = (0, ADC_LEVELS - 1),
+                 levels: int = ADC_LEVELS) -> None:
+        self.mode: RangeMode = mode
+        self.smoothing = smoothing
+        self.fixed_range = fixed_range # (low, high) in "fixed" mode
+        self.levels = levels
+
+        self.histogram = np.zeros(levels, dtype=np.int64) # counts of each reading in the window/session
+        self.frames: int = 0 # frames in the histogram
+        self._frame_histograms = np.zeros((max(rolling_window, 1), levels), dtype=np.int32) # ring, for "rolling"
+        self._next_slot: int = 0
+        self._smoothed: tuple[float, float] | None = None # (low, high) before rounding
+
+    def reset(self):
+        # Forget every frame (e.g. a new session, or a different mat)
+        self.histogram[:] = 0
+        self._frame_histograms[:] = 0
+        self.frames = 0
+        self._next_slot = 0
+        self._smoothed = None
+
+    def update(self, frame: np.ndarray) -> tuple[int, int]:
+        # Add a frame of raw readings, and return the (low, high) range to color it with
+        if self.mode == "fixed":
+            low, high = self.fixed_range
+            return int(low), max(int(high), int(low) + 1)
+
+        frame_histogram = np.bincount(frame.ravel(), minlength=self.levels)[:self.levels]
+        if self.mode == "rolling":
+            slot = self._frame_histograms[self._next_slot]
+            self.histogram -= slot
+            slot[:] = frame_histogram
+            self._next_slot = (self._next_slot + 1) % len(self._frame_histograms)
+            self.frames = min(self.frames + 1, len(self._frame_histograms))
+        else:
+            self.frames += 1
+        self.histogram += frame_histogram
+
+        target_low, target_high = self.quantiles(LOW_QUANTILE, HIGH_QUANTILE)
+        if target_high <= 0:
+            # Nothing on the mat: the whole scale, so the noise stays dark
+            target_high = self.levels - 1
+        if self._smoothed is None:
+            self._smoothed = (float(target_low), float(target_high))
+        else:
+            low, high = self._smoothed
+            self._smoothed = (low + self.smoothing * (target_low - low), high + self.smoothing * (target_high - high))
+
+        low, high = round(self._smoothed[0]), round(self._smoothed[1])
+        return low, max(high, low + 1)
+
+    def quantiles(self, *quantiles: float) -> tuple[int, ...]:
+        # Readings at the given quantiles (0 to 1) of the histogram
+        cumulative = np.cumsum(self.histogram)
+        total = cumulative[-1]
+        if total == 0:
+            return tuple(0 for _ in quantiles)
+        # The first reading whose cumulative count reaches the quantile (at least 1 count, so 0 isn't empty bins)
+        targets = np.maximum(np.asarray(quantiles) * total, 1)
+        return tuple(int(index) for index in np.searchsorted(cumulative, targets))
+
+
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    auto_range = AutoRange("rolling")
+    for rows, cols in [(16, 16), (64, 64), (128, 128)]:
+        frame = rng.integers(0, ADC_LEVELS, size=(rows, cols), dtype=np.uint16)
+        number = max(20, 100000 // (rows * cols))
+        percentile_time = min(timeit.repeat(lambda: (np.max(frame), np.percentile(frame, 25)), number=number, repeat=3)) / number
+        histogram_time = min(timeit.repeat(lambda: auto_range.update(frame), number=number, repeat=3)) / number
+        print(f"{rows:4d}x{cols:<4d} np.max + np.percentile {percentile_time * 1e6:7.1f} us   "
+              f"histogram {histogram_time * 1e6:7.1f} us")
+
@@ -0,0 +1,157 @@
+"""
+Starts and stops recordings by themselves when something is put on the mat, without missing the start.
+
+    - PreTriggerBuffer keeps the last few seconds of raw frames in preallocated arrays (a ring, like
+      'frame_ring_buffer.py', but only ever used by the data thread). When a recording starts, these
+      frames are written first, so the recording begins a little before the load that started it.
+    - LoadTrigger decides when to start and stop from the load on the mat: the highest reading ("peak")
+      or the mean reading ("total" load, divided by the number of cells so it is on the same scale).
+      The load is averaged over the last 'smoothing_frames' frames with a running sum (add the new
+      frame's value, subtract the one leaving the window), so one noisy frame doesn't start a recording.
+      A recording starts when the averaged load reaches 'threshold', and stops once it has stayed below
+      RELEASE_FRACTION * threshold for 'quiet_seconds' (only the time of the last loaded frame is kept).
+Each frame is looked at once (its maximum or sum). Nothing already in the window or in the buffer is
+scanned again, so the cost per frame doesn't depend on how long the windows are.
+
+Run this file directly to time the trigger and the pre-trigger buffer:
+    python auto_trigger.py
+"""
+
+from typing import Iterator, Literal
+import numpy as np
+
+from data_types import RAW_DTYPE
+
+
+TriggerMetric = Literal["peak", "total"]
+TRIGGER_METRICS: tuple[TriggerMetric, ...] = ("peak", "total")
+
+DEFAULT_PRE_TRIGGER_SECONDS = 2.0 # seconds of frames kept from before a recording starts
+DEFAULT_QUIET_SECONDS = 3.0 # seconds without load before a recording stops
+DEFAULT_THRESHOLD = 200 # raw counts
+DEFAULT_SMOOTHING_FRAMES = 4 # frames the load is averaged over
+RELEASE_FRACTION = 0.8 # the load must fall below this fraction of the threshold to count as quiet
+MAX_FRAMES_PER_SECOND = 240 # the pre-trigger buffer has room for this frame rate (a 16x16 frame is 512 bytes)
+
+
+class PreTriggerBuffer:
+
+    def __init__(self, seconds: float = DEFAULT_PRE_TRIGGER_SECONDS, rows: int = 16, cols: int = 16,
+                 max_frames_per_second: int = MAX_FRAMES_PER_SECOND) -> None:
+        self.seconds = seconds
+        self.max_frames_per_second = max_frames_per_second
+        self.count: int = 0 # frames in the buffer
+        self._allocate(rows, cols)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+
+    def set_seconds(self, seconds: float):
+        # Keep 'seconds' of frames. If the buffer has to grow, the frames in it are moved to the new one.
+        self.seconds = seconds
+        if self._capacity_for(seconds) > self.capacity:
+            slots = self._slots()
+            frames, timestamps, sequences = self.frames[slots], self.timestamps[slots], self.sequences[slots]
+            self._allocate(*self.frames.shape[1:])
+            self.count = self._next = len(slots)
+            self.frames[:self.count], self.timestamps[:self.count], self.sequences[:self.count] = frames, timestamps, sequences
+
+    def push(self, frame: np.ndarray, timestamp: float, sequence: int):
+        # Copy a frame into the buffer, over the oldest one if it is full. A frame of another size empties it.
+        if frame.shape != self.frames.shape[1:]:
+            self._allocate(*frame.shape)
+        np.copyto(self.frames[self._next], frame, casting="unsafe")
+        self.timestamps[self._next] = timestamp
+        self.sequences[self._next] = sequence
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def drain(self, until: float) -> Iterator[tuple[np.ndarray, float, int]]:
+        # The frames (oldest first) from the last 'seconds' before 'until', as (frame, timestamp, sequence).
+        # The frames are views of the buffer: copy them before the next 'push'. The buffer is emptied.
+        slots = self._slots()
+        self.count = 0
+        for slot in slots:
+            if self.timestamps[slot] >= until - self.seconds:
+                yield self.frames[slot], float(self.timestamps[slot]), int(self.sequences[slot])
+
+    def clear(self):
+        self.count = 0
+
+    def _slots(self) -> np.ndarray:
+        # Slots of the frames in the buffer, oldest first
+        first = (self._next - self.count) % self.capacity
+        return (first + np.arange(self.count)) % self.capacity
+
+    def _capacity_for(self, seconds: float) -> int:
+        return max(1, int(np.ceil(seconds * self.max_frames_per_second)))
+
+    def _allocate(self, rows: int, cols: int):
+        capacity = self._capacity_for(self.seconds)
+        self.frames = np.zeros((capacity, rows, cols), dtype=RAW_DTYPE)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.sequences = np.zeros(capacity, dtype=np.uint64)
+        self.count = 0
+        self._next = 0 # slot the next frame goes in
+
+
+class LoadTrigger:
+
+    def __init__(self, metric: TriggerMetric = "peak", threshold: float = DEFAULT_THRESHOLD,
+                 quiet_seconds: float = DEFAULT_QUIET_SECONDS, smoothing_frames: int = DEFAULT_SMOOTHING_FRAMES) -> None:
+        self.metric: TriggerMetric = metric
+        self.threshold = threshold
+        self.quiet_seconds = quiet_seconds
+        self.active: bool = False # between "start" and "stop"
+        self.load: float = 0.0 # averaged load of the last frames
+        self._values = np.zeros(max(1, smoothing_frames), dtype=np.float64) # ring of the last frames' loads
+        self._sum: float = 0.0 # running sum of '_values'
+        self._count: int = 0 # values in the ring
+        self._next: int = 0
+        self._last_loaded: float = 0.0 # timestamp of the last frame at or above the release level
+
+    def reset(self):
+        self.active = False
+        self.load = 0.0
+        self._values[:] = 0
+        self._sum = 0.0
+        self._count = 0
+        self._next = 0
+
+    def update(self, frame: np.ndarray, timestamp: float) -> Literal["start", "stop"] | None:
+        # Add a frame. Returns "start" when the load reaches the threshold, "stop" after the quiet period.
+        value = float(frame.max()) if self.metric == "peak" else float(frame.sum(dtype=np.uint64)) / max(1, frame.size)
+        self._sum += value - self._values[self._next]
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        if self._next == 0:
+            self._sum = float(self._values.sum()) # once per lap, so rounding errors don't add up
+        self._count = min(self._count + 1, len(self._values))
+        self.load = self._sum / self._count
+
+        if not self.active:
+            if self.load >= self.threshold:
+                self.active = True
+                self._last_loaded = timestamp
+                return "start"
+        elif self.load >= RELEASE_FRACTION * self.threshold:
+            self._last_loaded = timestamp
+        elif timestamp - self._last_loaded >= self.quiet_seconds:
+            self.active = False
+            return "stop"
+        return None
+
+
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    buffer = PreTriggerBuffer(seconds=2.0)
+    frame = rng.integers(0, 1024, size=(16, 16)).astype(RAW_DTYPE)
+    for metric in TRIGGER_METRICS:
+        trigger = LoadTrigger(metric, threshold=2000)
+        seconds = timeit.timeit(lambda: trigger.update(frame, 0.0), number=10000) / 10000
+        print(f"{metric:5s} trigger: {seconds * 1e6:.1f} us/frame")
+    seconds = timeit.timeit(lambda: buffer.push(frame, 0.0, 0), number=10000) / 10000
+    print(f"pre-trigger buffer: {seconds * 1e6:.1f} us/frame")
@@ -0,0 +1,121 @@
+"""
+Negotiates a faster serial baud rate with the Arduino, and measures the throughput of the link.
+
+The serial link is the main limit on the frame rate, so after the Arduino's ready byte the
+computer can propose higher baud rates, from slowest to fastest. For each proposed rate:
+    1. The computer sends NEGOTIATE_BAUD and the rate (uint32, little-endian).
+    2. The Arduino acknowledges (at the old rate), then both sides switch to the new rate.
+    3. The computer sends a LOOPBACK_TEST burst, which the Arduino echoes back byte for byte.
+    4. If the echo is error-free, the computer sends CONFIRM_BAUD and the Arduino acknowledges it.
+       Otherwise the computer switches back to the old rate, and the Arduino does too when it hasn't
+       been confirmed within BAUD_CONFIRM_TIMEOUT. No faster rates are tried after a failure.
+    5. After a failure, a loopback probe checks that the Arduino really is back at the old rate. If the
+       Arduino's acknowledgement of CONFIRM_BAUD was lost, it kept the new rate, so the new rate is tried
+       again. If it answers at neither rate, 'BaudRateLostError' is raised and the Arduino must be reset.
+
+A short loopback probe at the starting rate comes first. Firmware that doesn't echo it doesn't support
+negotiation, and the starting rate is kept. The probe only contains bytes that aren't commands, so older
+firmware ignores it.
+"""
+
+from dataclasses import dataclass
+import struct
+import time
+
+
+NEGOTIATE_BAUD_SIGNAL = b'\x08' # NEGOTIATE_BAUD in pressure_sensor.ino
+LOOPBACK_TEST_SIGNAL = b'\x09' # LOOPBACK_TEST in pressure_sensor.ino
+CONFIRM_BAUD_SIGNAL = b'\x0A' # CONFIRM_BAUD in pressure_sensor.ino
+
+PROPOSED_BAUD_RATES = (500000, 1000000, 2000000) # bits/sec, tried from slowest to fastest
+BAUD_CONFIRM_TIMEOUT = 0.5 # seconds. The Arduino goes back to the old rate if not confirmed by then (BAUD_CONFIRM_TIMEOUT_MS).
+BAUD_SWITCH_DELAY = 0.01 # seconds. Time for the Arduino to switch rates after acknowledging.
+LOOPBACK_TEST_PATTERN = bytes(range(256)) * 2 # every byte value, so any bit error shows up
+SUPPORT_PROBE_PATTERN = bytes(range(0x10, 0x30)) # no command bytes, in the pattern or its length
+
+
+class BaudRateLostError(Exception):
+    # After a failed negotiation the Arduino answers at neither the old nor the new rate
+    pass
+
+
+@dataclass
+class BaudRateResult:
+    baud_rate: int # bits/sec the link is running at
+    bytes_per_second: float | None # measured by the loopback test, None if the Arduino doesn't support it
+
+
+def negotiate_baud_rate(serialcomm, proposed_baud_rates: tuple[int, ...] = PROPOSED_BAUD_RATES) -> BaudRateResult:
+    # Must be called right after the ready byte, when nothing else is on its way from the Arduino
+    serial_timeout = serialcomm.timeout
+    try:
+        if loopback_test(serialcomm, SUPPORT_PROBE_PATTERN) is None:
+            return BaudRateResult(serialcomm.baudrate, None)
+
+        bytes_per_second = loopback_test(serialcomm)
+
+        for baud_rate in sorted(proposed_baud_rates):
+            if baud_rate <= serialcomm.baudrate:
+                continue
+            new_bytes_per_second = try_baud_rate(serialcomm, baud_rate)
+            if new_bytes_per_second is None:
+                break
+            bytes_per_second = new_bytes_per_second
+        return BaudRateResult(serialcomm.baudrate, bytes_per_second)
+    finally:
+        serialcomm.timeout = serial_timeout
+
+
+def try_baud_rate(serialcomm, baud_rate: int) -> float | None:
+    # Switch both sides to 'baud_rate' and test it. Returns the measured bytes/sec (both sides are then
+    # at the new rate), or None if it failed (both sides are then back at the old rate).
+    # Raises 'BaudRateLostError' if the Arduino can't be found at either rate afterwards.
+    old_baud_rate = serialcomm.baudrate
+    serialcomm.timeout = BAUD_CONFIRM_TIMEOUT
+    serialcomm.write(NEGOTIATE_BAUD_SIGNAL + struct.pack("<I", baud_rate))
+    if serialcomm.read(1) != NEGOTIATE_BAUD_SIGNAL:
+        return None
+
+    switched_at = time.monotonic()
+    serialcomm.baudrate = baud_rate
+    time.sleep(BAUD_SWITCH_DELAY)
+    serialcomm.reset_input_buffer()
+
+    bytes_per_second = loopback_test(serialcomm)
+    if bytes_per_second is not None:
+        serialcomm.write(CONFIRM_BAUD_SIGNAL)
+        if serialcomm.read(1) == CONFIRM_BAUD_SIGNAL:
+            return bytes_per_second
+
+    # Failed. Go back to the old rate once the Arduino has given up on the new one.
+    serialcomm.baudrate = old_baud_rate
+    time.sleep(max(0.0, BAUD_CONFIRM_TIMEOUT - (time.monotonic() - switched_at)) + 2*BAUD_SWITCH_DELAY)
+    serialcomm.reset_input_buffer()
+    if loopback_test(serialcomm, SUPPORT_PROBE_PATTERN) is not None:
+        return None
+
+    # No answer at the old rate. The Arduino got CONFIRM_BAUD but its acknowledgement was lost,
+    # so it kept the new rate: go back to it.
+    serialcomm.baudrate = baud_rate
+    time.sleep(BAUD_SWITCH_DELAY)
+    serialcomm.reset_input_buffer()
+    bytes_per_second = loopback_test(serialcomm)
+    if bytes_per_second is None:
+        serialcomm.baudrate = old_baud_rate
+        raise BaudRateLostError(f"The Arduino answers at neither {old_baud_rate} nor {baud_rate} baud")
+    return bytes_per_second
+
+
+def loopback_test(serialcomm, pattern: bytes = LOOPBACK_TEST_PATTERN) -> float | None:
+    # Send the test pattern and time its echo. Returns the bytes/sec, or None if the echo had errors.
+    num_bytes = len(pattern)
+    expected_time = 2 * num_bytes * 10 / serialcomm.baudrate # 10 bits per byte on the wire, there and back
+    serialcomm.timeout = max(BAUD_CONFIRM_TIMEOUT / 2, 3 * expected_time)
+
+    started = time.perf_counter()
+    serialcomm.write(LOOPBACK_TEST_SIGNAL + struct.pack("<H", num_bytes) + pattern)
+    echo = serialcomm.read(num_bytes)
+    elapsed = time.perf_counter() - started
+    if echo != pattern:
+        return None
+    return num_bytes / elapsed
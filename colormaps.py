@@ -1,1323 +1,140 @@
+"""
+Colormaps for the heatmap, loaded on demand.
+
+The built-in tables (256 RGB colors each, float32 from 0 to 1) are stored in 'colormaps.npz' next to
+this file, instead of as Python list literals. Importing this module doesn't read them: each table
+is read the first time its colormap is used, along with a uint8 version (0 to 255) for drawing.
+
+Other colormaps (e.g. for clinical use) can be added with 'register_colormap', and are then
+available to 'apply_colormap', 'ColormapLUT' and everything else by name.
+"""
+
+import os
+import sys
 import numpy as np
 from typing import Literal
 
 
-VIRIDIS = np.array([
-    [0.26700, 0.00487, 0.32942],
-    [0.26851, 0.00961, 0.33543],
-    [0.26994, 0.01463, 0.34138],
-    [0.27131, 0.01994, 0.34727],
-    [0.27259, 0.02556, 0.35309],
-    [0.27381, 0.03150, 0.35885],
-    [0.27495, 0.03775, 0.36454],
-    [0.27602, 0.04417, 0.37016],
-    [0.27702, 0.05034, 0.37572],
-    [0.27794, 0.05632, 0.38119],
-    [0.27879, 0.06214, 0.38659],
-    [0.27957, 0.06784, 0.39192],
-    [0.28027, 0.07342, 0.39716],
-    [0.28089, 0.07891, 0.40233],
-    [0.28145, 0.08432, 0.40741],
-    [0.28192, 0.08967, 0.41241],
-    [0.28233, 0.09495, 0.41733],
-    [0.28266, 0.10020, 0.42216],
-    [0.28291, 0.10539, 0.42690],
-    [0.28309, 0.11055, 0.43155],
-    [0.28320, 0.11568, 0.43611],
-    [0.28323, 0.12078, 0.44058],
-    [0.28319, 0.12585, 0.44496],
-    [0.28307, 0.13090, 0.44924],
-    [0.28288, 0.13592, 0.45343],
-    [0.28262, 0.14093, 0.45752],
-    [0.28229, 0.14591, 0.46151],
-    [0.28189, 0.15088, 0.46541],
-    [0.28141, 0.15583, 0.46920],
-    [0.28087, 0.16077, 0.47290],
-    [0.28025, 0.16569, 0.47650],
-    [0.27957, 0.17060, 0.48000],
-    [0.27883, 0.17549, 0.48340],
-    [0.27801, 0.18037, 0.48670],
-    [0.27713, 0.18523, 0.48990],
-    [0.27619, 0.19007, 0.49300],
-    [0.27519, 0.19490, 0.49600],
-    [0.27413, 0.19972, 0.49891],
-    [0.27301, 0.20452, 0.50172],
-    [0.27183, 0.20930, 0.50443],
-    [0.27059, 0.21407, 0.50705],
-    [0.26931, 0.21882, 0.50958],
-    [0.26797, 0.22355, 0.51201],
-    [0.26658, 0.22826, 0.51435],
-    [0.26515, 0.23296, 0.51660],
-    [0.26366, 0.23763, 0.51876],
-    [0.26214, 0.24229, 0.52084],
-    [0.26057, 0.24692, 0.52283],
-    [0.25897, 0.25154, 0.52474],
-    [0.25732, 0.25613, 0.52656],
-    [0.25565, 0.26070, 0.52831],
-    [0.25394, 0.26525, 0.52998],
-    [0.25219, 0.26978, 0.53158],
-    [0.25043, 0.27429, 0.53310],
-    [0.24863, 0.27877, 0.53456],
-    [0.24681, 0.28324, 0.53594],
-    [0.24497, 0.28768, 0.53726],
-    [0.24311, 0.29209, 0.53852],
-    [0.24124, 0.29648, 0.53971],
-    [0.23935, 0.30085, 0.54084],
-    [0.23744, 0.30520, 0.54192],
-    [0.23553, 0.30953, 0.54294],
-    [0.23360, 0.31383, 0.54391],
-    [0.23167, 0.31811, 0.54483],
-    [0.22974, 0.32236, 0.54571],
-    [0.22780, 0.32659, 0.54653],
-    [0.22586, 0.33081, 0.54731],
-    [0.22393, 0.33499, 0.54805],
-    [0.22199, 0.33916, 0.54875],
-    [0.22006, 0.34331, 0.54941],
-    [0.21813, 0.34743, 0.55004],
-    [0.21621, 0.35153, 0.55063],
-    [0.21430, 0.35562, 0.55118],
-    [0.21240, 0.35968, 0.55171],
-    [0.21050, 0.36373, 0.55221],
-    [0.20862, 0.36775, 0.55268],
-    [0.20676, 0.37176, 0.55312],
-    [0.20490, 0.37575, 0.55353],
-    [0.20306, 0.37972, 0.55393],
-    [0.20124, 0.38367, 0.55429],
-    [0.19943, 0.38761, 0.55464],
-    [0.19764, 0.39153, 0.55497],
-    [0.19586, 0.39543, 0.55528],
-    [0.19410, 0.39932, 0.55556],
-    [0.19236, 0.40320, 0.55584],
-    [0.19063, 0.40706, 0.55609],
-    [0.18892, 0.41091, 0.55633],
-    [0.18723, 0.41475, 0.55655],
-    [0.18556, 0.41857, 0.55675],
-    [0.18390, 0.42238, 0.55694],
-    [0.18226, 0.42618, 0.55712],
-    [0.18063, 0.42997, 0.55728],
-    [0.17902, 0.43376, 0.55743],
-    [0.17742, 0.43753, 0.55756],
-    [0.17584, 0.44129, 0.55768],
-    [0.17427, 0.44504, 0.55779],
-    [0.17272, 0.44879, 0.55788],
-    [0.17118, 0.45253, 0.55797],
-    [0.16965, 0.45626, 0.55803],
-    [0.16813, 0.45999, 0.55808],
-    [0.16662, 0.46371, 0.55812],
-    [0.16512, 0.46742, 0.55814],
-    [0.16362, 0.47113, 0.55815],
-    [0.16214, 0.47484, 0.55814],
-    [0.16067, 0.47854, 0.55812],
-    [0.15919, 0.48224, 0.55807],
-    [0.15773, 0.48593, 0.55801],
-    [0.15627, 0.48962, 0.55794],
-    [0.15482, 0.49331, 0.55784],
-    [0.15336, 0.49700, 0.55772],
-    [0.15192, 0.50069, 0.55759],
-    [0.15048, 0.50437, 0.55743],
-    [0.14904, 0.50805, 0.55725],
-    [0.14761, 0.51173, 0.55705],
-    [0.14618, 0.51541, 0.55682],
-    [0.14476, 0.51909, 0.55657],
-    [0.14334, 0.52277, 0.55629],
-    [0.14194, 0.52645, 0.55599],
-    [0.14054, 0.53013, 0.55566],
-    [0.13915, 0.53381, 0.55530],
-    [0.13777, 0.53749, 0.55491],
-    [0.13641, 0.54117, 0.55448],
-    [0.13507, 0.54485, 0.55403],
-    [0.13374, 0.54853, 0.55354],
-    [0.13244, 0.55222, 0.55302],
-    [0.13117, 0.55590, 0.55246],
-    [0.12993, 0.55958, 0.55186],
-    [0.12873, 0.56327, 0.55123],
-    [0.12757, 0.56695, 0.55056],
-    [0.12645, 0.57063, 0.54984],
-    [0.12539, 0.57432, 0.54909],
-    [0.12440, 0.57800, 0.54829],
-    [0.12346, 0.58169, 0.54744],
-    [0.12261, 0.58537, 0.54656],
-    [0.12183, 0.58905, 0.54562],
-    [0.12115, 0.59274, 0.54464],
-    [0.12057, 0.59642, 0.54361],
-    [0.12009, 0.60010, 0.54253],
-    [0.11974, 0.60379, 0.54140],
-    [0.11951, 0.60746, 0.54022],
-    [0.11942, 0.61114, 0.53898],
-    [0.11948, 0.61482, 0.53769],
-    [0.11970, 0.61849, 0.53635],
-    [0.12008, 0.62216, 0.53495],
-    [0.12064, 0.62583, 0.53349],
-    [0.12138, 0.62949, 0.53197],
-    [0.12231, 0.63315, 0.53040],
-    [0.12344, 0.63681, 0.52876],
-    [0.12478, 0.64046, 0.52707],
-    [0.12633, 0.64411, 0.52531],
-    [0.12809, 0.64775, 0.52349],
-    [0.13007, 0.65138, 0.52161],
-    [0.13227, 0.65501, 0.51966],
-    [0.13469, 0.65864, 0.51765],
-    [0.13734, 0.66225, 0.51557],
-    [0.14021, 0.66586, 0.51343],
-    [0.14330, 0.66946, 0.51121],
-    [0.14662, 0.67305, 0.50894],
-    [0.15015, 0.67663, 0.50659],
-    [0.15389, 0.68020, 0.50417],
-    [0.15785, 0.68376, 0.50169],
-    [0.16202, 0.68732, 0.49913],
-    [0.16638, 0.69086, 0.49650],
-    [0.17095, 0.69438, 0.49380],
-    [0.17571, 0.69790, 0.49103],
-    [0.18065, 0.70140, 0.48819],
-    [0.18578, 0.70489, 0.48527],
-    [0.19109, 0.70837, 0.48228],
-    [0.19657, 0.71183, 0.47922],
-    [0.20222, 0.71527, 0.47608],
-    [0.20803, 0.71870, 0.47287],
-    [0.21400, 0.72211, 0.46959],
-    [0.22012, 0.72551, 0.46623],
-    [0.22640, 0.72889, 0.46279],
-    [0.23281, 0.73225, 0.45928],
-    [0.23937, 0.73559, 0.45569],
-    [0.24607, 0.73891, 0.45202],
-    [0.25290, 0.74221, 0.44828],
-    [0.25986, 0.74549, 0.44447],
-    [0.26694, 0.74875, 0.44057],
-    [0.27415, 0.75199, 0.43660],
-    [0.28148, 0.75520, 0.43255],
-    [0.28892, 0.75839, 0.42843],
-    [0.29648, 0.76156, 0.42422],
-    [0.30415, 0.76470, 0.41994],
-    [0.31193, 0.76782, 0.41559],
-    [0.31981, 0.77091, 0.41115],
-    [0.32780, 0.77398, 0.40664],
-    [0.33588, 0.77702, 0.40205],
-    [0.34407, 0.78003, 0.39738],
-    [0.35236, 0.78301, 0.39264],
-    [0.36074, 0.78596, 0.38781],
-    [0.36921, 0.78889, 0.38291],
-    [0.37778, 0.79178, 0.37794],
-    [0.38643, 0.79464, 0.37289],
-    [0.39517, 0.79748, 0.36776],
-    [0.40400, 0.80027, 0.36255],
-    [0.41291, 0.80304, 0.35727],
-    [0.42191, 0.80577, 0.35191],
-    [0.43098, 0.80847, 0.34648],
-    [0.44014, 0.81114, 0.34097],
-    [0.44937, 0.81377, 0.33538],
-    [0.45867, 0.81636, 0.32973],
-    [0.46805, 0.81892, 0.32400],
-    [0.47750, 0.82144, 0.31820],
-    [0.48703, 0.82393, 0.31232],
-    [0.49661, 0.82638, 0.30638],
-    [0.50627, 0.82879, 0.30036],
-    [0.51599, 0.83116, 0.29428],
-    [0.52578, 0.83349, 0.28813],
-    [0.53562, 0.83579, 0.28191],
-    [0.54552, 0.83804, 0.27563],
-    [0.55548, 0.84025, 0.26928],
-    [0.56550, 0.84243, 0.26288],
-    [0.57556, 0.84457, 0.25642],
-    [0.58568, 0.84666, 0.24990],
-    [0.59584, 0.84872, 0.24333],
-    [0.60604, 0.85073, 0.23671],
-    [0.61629, 0.85271, 0.23005],
-    [0.62658, 0.85464, 0.22335],
-    [0.63690, 0.85654, 0.21662],
-    [0.64726, 0.85840, 0.20986],
-    [0.65764, 0.86022, 0.20308],
-    [0.66805, 0.86200, 0.19629],
-    [0.67849, 0.86374, 0.18950],
-    [0.68894, 0.86545, 0.18272],
-    [0.69942, 0.86712, 0.17597],
-    [0.70990, 0.86875, 0.16926],
-    [0.72039, 0.87035, 0.16260],
-    [0.73089, 0.87192, 0.15603],
-    [0.74139, 0.87345, 0.14956],
-    [0.75188, 0.87495, 0.14323],
-    [0.76237, 0.87642, 0.13706],
-    [0.77285, 0.87787, 0.13111],
-    [0.78331, 0.87928, 0.12540],
-    [0.79376, 0.88068, 0.12001],
-    [0.80418, 0.88205, 0.11496],
-    [0.81458, 0.88339, 0.11035],
-    [0.82494, 0.88472, 0.10622],
-    [0.83527, 0.88603, 0.10265],
-    [0.84556, 0.88732, 0.09970],
-    [0.85581, 0.88860, 0.09745],
-    [0.86601, 0.88987, 0.09595],
-    [0.87617, 0.89112, 0.09525],
-    [0.88627, 0.89237, 0.09537],
-    [0.89632, 0.89362, 0.09634],
-    [0.90631, 0.89485, 0.09813],
-    [0.91624, 0.89609, 0.10072],
-    [0.92611, 0.89733, 0.10407],
-    [0.93590, 0.89857, 0.10813],
-    [0.94564, 0.89982, 0.11284],
-    [0.95530, 0.90107, 0.11813],
-    [0.96489, 0.90232, 0.12394],
-    [0.97442, 0.90359, 0.13021],
-    [0.98387, 0.90487, 0.13690],
-    [0.99325, 0.90616, 0.14394],
-])
+# Location of the built-in colormap tables (packaged with the executable, like the icon)
+COLORMAPS_FILE_NAME = "colormaps.npz"
+COLORMAPS_PATH = os.path.join(getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__))), COLORMAPS_FILE_NAME)
+
+ColormapName = Literal['viridis', 'plasma', 'inferno', 'magma', 'cividis'] # built in. Registered colormaps can have any name.
+
+ADC_LEVELS = 1024 # number of possible raw readings from the Arduino's 10-bit ADC
+
+
+# Registry of colormaps: name -> float32 table (None until it is loaded from COLORMAPS_PATH)
+_colormaps: dict[str, np.ndarray | None] = {name: None for name in ('viridis', 'plasma', 'inferno', 'magma', 'cividis')}
+_colormaps_uint8: dict[str, np.ndarray] = {}
 
-PLASMA = np.array([
-    [0.05038, 0.02980, 0.52797],
-    [0.06354, 0.02843, 0.53312],
-    [0.07535, 0.02721, 0.53801],
-    [0.08622, 0.02612, 0.54266],
-    [0.09638, 0.02516, 0.54710],
-    [0.10598, 0.02431, 0.55137],
-    [0.11512, 0.02356, 0.55547],
-    [0.12390, 0.02288, 0.55942],
-    [0.13238, 0.02226, 0.56325],
-    [0.14060, 0.02169, 0.56696],
-    [0.14861, 0.02115, 0.57056],
-    [0.15642, 0.02065, 0.57407],
-    [0.16407, 0.02017, 0.57748],
-    [0.17157, 0.01971, 0.58081],
-    [0.17895, 0.01925, 0.58405],
-    [0.18621, 0.01880, 0.58723],
-    [0.19337, 0.01835, 0.59033],
-    [0.20045, 0.01790, 0.59336],
-    [0.20744, 0.01744, 0.59633],
-    [0.21435, 0.01697, 0.59924],
-    [0.22120, 0.01650, 0.60208],
-    [0.22798, 0.01601, 0.60487],
-    [0.23472, 0.01550, 0.60759],
-    [0.24140, 0.01498, 0.61026],
-    [0.24803, 0.01444, 0.61287],
-    [0.25463, 0.01388, 0.61542],
-    [0.26118, 0.01331, 0.61791],
-    [0.26770, 0.01272, 0.62035],
-    [0.27419, 0.01211, 0.62272],
-    [0.28065, 0.01149, 0.62504],
-    [0.28708, 0.01086, 0.62730],
-    [0.29348, 0.01021, 0.62949],
-    [0.29985, 0.00956, 0.63162],
-    [0.30621, 0.00890, 0.63369],
-    [0.31254, 0.00824, 0.63570],
-    [0.31886, 0.00758, 0.63764],
-    [0.32515, 0.00692, 0.63951],
-    [0.33143, 0.00626, 0.64132],
-    [0.33768, 0.00562, 0.64305],
-    [0.34392, 0.00499, 0.64471],
-    [0.35015, 0.00438, 0.64630],
-    [0.35636, 0.00380, 0.64781],
-    [0.36255, 0.00324, 0.64924],
-    [0.36873, 0.00272, 0.65060],
-    [0.37490, 0.00225, 0.65188],
-    [0.38105, 0.00181, 0.65307],
-    [0.38718, 0.00143, 0.65418],
-    [0.39330, 0.00111, 0.65520],
-    [0.39941, 0.00086, 0.65613],
-    [0.40550, 0.00068, 0.65698],
-    [0.41158, 0.00058, 0.65773],
-    [0.41764, 0.00056, 0.65839],
-    [0.42369, 0.00065, 0.65896],
-    [0.42972, 0.00083, 0.65943],
-    [0.43573, 0.00113, 0.65980],
-    [0.44173, 0.00154, 0.66007],
-    [0.44771, 0.00208, 0.66024],
-    [0.45368, 0.00276, 0.66031],
-    [0.45962, 0.00357, 0.66028],
-    [0.46555, 0.00455, 0.66014],
-    [0.47146, 0.00568, 0.65990],
-    [0.47734, 0.00698, 0.65955],
-    [0.48321, 0.00846, 0.65909],
-    [0.48906, 0.01013, 0.65853],
-    [0.49488, 0.01199, 0.65787],
-    [0.50068, 0.01405, 0.65709],
-    [0.50645, 0.01633, 0.65620],
-    [0.51221, 0.01883, 0.65521],
-    [0.51793, 0.02156, 0.65411],
-    [0.52363, 0.02453, 0.65290],
-    [0.52931, 0.02775, 0.65159],
-    [0.53495, 0.03122, 0.65016],
-    [0.54057, 0.03495, 0.64864],
-    [0.54616, 0.03895, 0.64701],
-    [0.55171, 0.04314, 0.64528],
-    [0.55724, 0.04733, 0.64344],
-    [0.56274, 0.05155, 0.64151],
-    [0.56820, 0.05578, 0.63948],
-    [0.57363, 0.06003, 0.63735],
-    [0.57903, 0.06430, 0.63513],
-    [0.58439, 0.06858, 0.63281],
-    [0.58972, 0.07288, 0.63041],
-    [0.59501, 0.07719, 0.62792],
-    [0.60027, 0.08152, 0.62534],
-    [0.60549, 0.08585, 0.62269],
-    [0.61067, 0.09020, 0.61995],
-    [0.61581, 0.09456, 0.61714],
-    [0.62092, 0.09893, 0.61426],
-    [0.62599, 0.10331, 0.61130],
-    [0.63102, 0.10770, 0.60829],
-    [0.63601, 0.11209, 0.60520],
-    [0.64096, 0.11649, 0.60206],
-    [0.64587, 0.12090, 0.59887],
-    [0.65075, 0.12531, 0.59562],
-    [0.65558, 0.12973, 0.59232],
-    [0.66037, 0.13414, 0.58897],
-    [0.66513, 0.13857, 0.58558],
-    [0.66985, 0.14299, 0.58215],
-    [0.67452, 0.14742, 0.57869],
-    [0.67916, 0.15185, 0.57519],
-    [0.68376, 0.15628, 0.57166],
-    [0.68832, 0.16071, 0.56810],
-    [0.69284, 0.16514, 0.56452],
-    [0.69732, 0.16957, 0.56092],
-    [0.70177, 0.17400, 0.55730],
-    [0.70618, 0.17844, 0.55366],
-    [0.71055, 0.18287, 0.55000],
-    [0.71488, 0.18730, 0.54634],
-    [0.71918, 0.19173, 0.54266],
-    [0.72344, 0.19616, 0.53898],
-    [0.72767, 0.20059, 0.53529],
-    [0.73186, 0.20501, 0.53160],
-    [0.73602, 0.20944, 0.52791],
-    [0.74014, 0.21386, 0.52422],
-    [0.74423, 0.21829, 0.52052],
-    [0.74829, 0.22271, 0.51683],
-    [0.75231, 0.22713, 0.51315],
-    [0.75630, 0.23156, 0.50947],
-    [0.76026, 0.23598, 0.50579],
-    [0.76419, 0.24040, 0.50213],
-    [0.76809, 0.24482, 0.49846],
-    [0.77196, 0.24924, 0.49481],
-    [0.77580, 0.25366, 0.49117],
-    [0.77960, 0.25808, 0.48754],
-    [0.78338, 0.26250, 0.48392],
-    [0.78713, 0.26692, 0.48031],
-    [0.79085, 0.27135, 0.47671],
-    [0.79455, 0.27577, 0.47312],
-    [0.79822, 0.28020, 0.46954],
-    [0.80185, 0.28463, 0.46597],
-    [0.80547, 0.28906, 0.46242],
-    [0.80905, 0.29349, 0.45887],
-    [0.81261, 0.29793, 0.45534],
-    [0.81614, 0.30237, 0.45182],
-    [0.81965, 0.30681, 0.44831],
-    [0.82313, 0.31126, 0.44481],
-    [0.82659, 0.31571, 0.44132],
-    [0.83002, 0.32017, 0.43784],
-    [0.83342, 0.32464, 0.43437],
-    [0.83680, 0.32910, 0.43090],
-    [0.84015, 0.33358, 0.42745],
-    [0.84348, 0.33806, 0.42401],
-    [0.84679, 0.34255, 0.42058],
-    [0.85007, 0.34705, 0.41715],
-    [0.85332, 0.35155, 0.41373],
-    [0.85655, 0.35607, 0.41032],
-    [0.85975, 0.36059, 0.40692],
-    [0.86293, 0.36512, 0.40352],
-    [0.86608, 0.36966, 0.40013],
-    [0.86920, 0.37421, 0.39674],
-    [0.87230, 0.37877, 0.39336],
-    [0.87538, 0.38335, 0.38998],
-    [0.87842, 0.38793, 0.38660],
-    [0.88144, 0.39253, 0.38323],
-    [0.88444, 0.39714, 0.37986],
-    [0.88740, 0.40176, 0.37649],
-    [0.89034, 0.40640, 0.37313],
-    [0.89325, 0.41105, 0.36977],
-    [0.89613, 0.41571, 0.36641],
-    [0.89898, 0.42039, 0.36305],
-    [0.90181, 0.42509, 0.35969],
-    [0.90460, 0.42980, 0.35633],
-    [0.90736, 0.43452, 0.35297],
-    [0.91010, 0.43927, 0.34961],
-    [0.91280, 0.44403, 0.34625],
-    [0.91547, 0.44881, 0.34289],
-    [0.91811, 0.45360, 0.33953],
-    [0.92071, 0.45842, 0.33617],
-    [0.92329, 0.46325, 0.33280],
-    [0.92583, 0.46810, 0.32943],
-    [0.92833, 0.47297, 0.32607],
-    [0.93080, 0.47787, 0.32270],
-    [0.93323, 0.48278, 0.31933],
-    [0.93563, 0.48771, 0.31595],
-    [0.93799, 0.49267, 0.31257],
-    [0.94031, 0.49764, 0.30920],
-    [0.94260, 0.50264, 0.30582],
-    [0.94484, 0.50766, 0.30243],
-    [0.94705, 0.51270, 0.29905],
-    [0.94922, 0.51776, 0.29566],
-    [0.95134, 0.52285, 0.29228],
-    [0.95343, 0.52796, 0.28888],
-    [0.95547, 0.53309, 0.28549],
-    [0.95747, 0.53825, 0.28210],
-    [0.95942, 0.54343, 0.27870],
-    [0.96134, 0.54864, 0.27531],
-    [0.96320, 0.55387, 0.27191],
-    [0.96502, 0.55912, 0.26851],
-    [0.96680, 0.56440, 0.26512],
-    [0.96853, 0.56970, 0.26172],
-    [0.97020, 0.57503, 0.25833],
-    [0.97184, 0.58038, 0.25493],
-    [0.97342, 0.58576, 0.25154],
-    [0.97495, 0.59117, 0.24815],
-    [0.97643, 0.59659, 0.24477],
-    [0.97786, 0.60205, 0.24139],
-    [0.97923, 0.60753, 0.23801],
-    [0.98056, 0.61304, 0.23465],
-    [0.98183, 0.61857, 0.23129],
-    [0.98304, 0.62413, 0.22794],
-    [0.98420, 0.62972, 0.22459],
-    [0.98530, 0.63533, 0.22126],
-    [0.98635, 0.64097, 0.21795],
-    [0.98733, 0.64663, 0.21465],
-    [0.98826, 0.65233, 0.21136],
-    [0.98913, 0.65804, 0.20810],
-    [0.98994, 0.66379, 0.20486],
-    [0.99068, 0.66956, 0.20164],
-    [0.99137, 0.67536, 0.19845],
-    [0.99199, 0.68118, 0.19529],
-    [0.99254, 0.68703, 0.19217],
-    [0.99303, 0.69291, 0.18908],
-    [0.99346, 0.69881, 0.18604],
-    [0.99381, 0.70474, 0.18304],
-    [0.99410, 0.71070, 0.18010],
-    [0.99432, 0.71668, 0.17721],
-    [0.99447, 0.72269, 0.17438],
-    [0.99455, 0.72873, 0.17162],
-    [0.99456, 0.73479, 0.16894],
-    [0.99450, 0.74088, 0.16634],
-    [0.99435, 0.74699, 0.16382],
-    [0.99414, 0.75314, 0.16140],
-    [0.99385, 0.75930, 0.15909],
-    [0.99348, 0.76550, 0.15689],
-    [0.99303, 0.77172, 0.15481],
-    [0.99250, 0.77797, 0.15285],
-    [0.99190, 0.78424, 0.15104],
-    [0.99121, 0.79054, 0.14938],
-    [0.99044, 0.79686, 0.14787],
-    [0.98959, 0.80320, 0.14653],
-    [0.98865, 0.80958, 0.14536],
-    [0.98762, 0.81598, 0.14436],
-    [0.98651, 0.82240, 0.14356],
-    [0.98531, 0.82885, 0.14294],
-    [0.98403, 0.83532, 0.14253],
-    [0.98265, 0.84181, 0.14230],
-    [0.98119, 0.84833, 0.14228],
-    [0.97964, 0.85487, 0.14245],
-    [0.97799, 0.86143, 0.14281],
-    [0.97627, 0.86802, 0.14335],
-    [0.97444, 0.87462, 0.14406],
-    [0.97253, 0.88125, 0.14492],
-    [0.97053, 0.88790, 0.14592],
-    [0.96844, 0.89456, 0.14701],
-    [0.96627, 0.90125, 0.14818],
-    [0.96402, 0.90795, 0.14937],
-    [0.96168, 0.91467, 0.15052],
-    [0.95928, 0.92141, 0.15157],
-    [0.95681, 0.92815, 0.15241],
-    [0.95429, 0.93491, 0.15292],
-    [0.95173, 0.94167, 0.15293],
-    [0.94915, 0.94844, 0.15218],
-    [0.94660, 0.95519, 0.15033],
-    [0.94415, 0.96192, 0.14686],
-    [0.94190, 0.96859, 0.14096],
-    [0.94002, 0.97516, 0.13133],
-])
 
-INFERNO = np.array([
-    [0.00146, 0.00047, 0.01387],
-    [0.00227, 0.00127, 0.01857],
-    [0.00330, 0.00225, 0.02424],
-    [0.00455, 0.00339, 0.03091],
-    [0.00601, 0.00469, 0.03856],
-    [0.00768, 0.00614, 0.04684],
-    [0.00956, 0.00771, 0.05514],
-    [0.01166, 0.00942, 0.06346],
-    [0.01400, 0.01123, 0.07186],
-    [0.01656, 0.01314, 0.08028],
-    [0.01937, 0.01513, 0.08877],
-    [0.02245, 0.01720, 0.09733],
-    [0.02579, 0.01933, 0.10593],
-    [0.02943, 0.02150, 0.11462],
-    [0.03338, 0.02370, 0.12340],
-    [0.03767, 0.02592, 0.13223],
-    [0.04225, 0.02814, 0.14114],
-    [0.04691, 0.03032, 0.15016],
-    [0.05164, 0.03247, 0.15925],
-    [0.05645, 0.03457, 0.16841],
-    [0.06134, 0.03659, 0.17764],
-    [0.06633, 0.03850, 0.18696],
-    [0.07143, 0.04029, 0.19635],
-    [0.07664, 0.04190, 0.20580],
-    [0.08196, 0.04333, 0.21529],
-    [0.08741, 0.04456, 0.22481],
-    [0.09299, 0.04558, 0.23436],
-    [0.09870, 0.04640, 0.24390],
-    [0.10455, 0.04701, 0.25343],
-    [0.11054, 0.04740, 0.26291],
-    [0.11666, 0.04757, 0.27232],
-    [0.12291, 0.04754, 0.28162],
-    [0.12929, 0.04729, 0.29079],
-    [0.13578, 0.04686, 0.29978],
-    [0.14238, 0.04624, 0.30855],
-    [0.14907, 0.04547, 0.31709],
-    [0.15585, 0.04456, 0.32534],
-    [0.16269, 0.04355, 0.33328],
-    [0.16958, 0.04249, 0.34087],
-    [0.17649, 0.04140, 0.34811],
-    [0.18343, 0.04033, 0.35497],
-    [0.19037, 0.03931, 0.36145],
-    [0.19730, 0.03840, 0.36754],
-    [0.20421, 0.03763, 0.37324],
-    [0.21110, 0.03703, 0.37856],
-    [0.21795, 0.03662, 0.38352],
-    [0.22476, 0.03640, 0.38813],
-    [0.23154, 0.03640, 0.39240],
-    [0.23827, 0.03662, 0.39635],
-    [0.24497, 0.03705, 0.40001],
-    [0.25162, 0.03771, 0.40338],
-    [0.25823, 0.03857, 0.40648],
-    [0.26481, 0.03965, 0.40935],
-    [0.27135, 0.04092, 0.41198],
-    [0.27785, 0.04235, 0.41439],
-    [0.28432, 0.04393, 0.41661],
-    [0.29076, 0.04564, 0.41864],
-    [0.29718, 0.04747, 0.42049],
-    [0.30357, 0.04940, 0.42218],
-    [0.30994, 0.05141, 0.42372],
-    [0.31628, 0.05349, 0.42512],
-    [0.32261, 0.05563, 0.42638],
-    [0.32892, 0.05783, 0.42751],
-    [0.33522, 0.06006, 0.42852],
-    [0.34150, 0.06232, 0.42943],
-    [0.34777, 0.06462, 0.43022],
-    [0.35403, 0.06692, 0.43091],
-    [0.36028, 0.06925, 0.43150],
-    [0.36653, 0.07158, 0.43199],
-    [0.37277, 0.07391, 0.43240],
-    [0.37900, 0.07625, 0.43272],
-    [0.38523, 0.07859, 0.43295],
-    [0.39145, 0.08093, 0.43311],
-    [0.39767, 0.08326, 0.43318],
-    [0.40389, 0.08558, 0.43318],
-    [0.41011, 0.08790, 0.43310],
-    [0.41633, 0.09020, 0.43294],
-    [0.42255, 0.09250, 0.43271],
-    [0.42877, 0.09479, 0.43241],
-    [0.43499, 0.09707, 0.43204],
-    [0.44121, 0.09934, 0.43159],
-    [0.44743, 0.10160, 0.43108],
-    [0.45365, 0.10385, 0.43050],
-    [0.45987, 0.10609, 0.42985],
-    [0.46610, 0.10832, 0.42912],
-    [0.47233, 0.11055, 0.42833],
-    [0.47856, 0.11276, 0.42747],
-    [0.48479, 0.11497, 0.42655],
-    [0.49102, 0.11718, 0.42555],
-    [0.49726, 0.11938, 0.42449],
-    [0.50349, 0.12158, 0.42336],
-    [0.50973, 0.12377, 0.42216],
-    [0.51597, 0.12596, 0.42089],
-    [0.52221, 0.12815, 0.41955],
-    [0.52844, 0.13034, 0.41814],
-    [0.53468, 0.13253, 0.41667],
-    [0.54092, 0.13473, 0.41512],
-    [0.54716, 0.13693, 0.41351],
-    [0.55339, 0.13913, 0.41183],
-    [0.55962, 0.14135, 0.41008],
-    [0.56585, 0.14357, 0.40826],
-    [0.57208, 0.14580, 0.40637],
-    [0.57830, 0.14804, 0.40441],
-    [0.58452, 0.15029, 0.40238],
-    [0.59073, 0.15256, 0.40029],
-    [0.59694, 0.15485, 0.39813],
-    [0.60314, 0.15715, 0.39589],
-    [0.60933, 0.15947, 0.39359],
-    [0.61551, 0.16182, 0.39122],
-    [0.62169, 0.16418, 0.38878],
-    [0.62785, 0.16658, 0.38628],
-    [0.63400, 0.16899, 0.38370],
-    [0.64014, 0.17144, 0.38106],
-    [0.64626, 0.17391, 0.37836],
-    [0.65237, 0.17642, 0.37559],
-    [0.65846, 0.17896, 0.37275],
-    [0.66454, 0.18154, 0.36985],
-    [0.67060, 0.18415, 0.36688],
-    [0.67664, 0.18681, 0.36385],
-    [0.68266, 0.18950, 0.36076],
-    [0.68865, 0.19224, 0.35760],
-    [0.69463, 0.19502, 0.35439],
-    [0.70058, 0.19785, 0.35111],
-    [0.70650, 0.20073, 0.34778],
-    [0.71240, 0.20366, 0.34438],
-    [0.71826, 0.20664, 0.34093],
-    [0.72410, 0.20967, 0.33742],
-    [0.72991, 0.21276, 0.33386],
-    [0.73568, 0.21591, 0.33025],
-    [0.74142, 0.21911, 0.32658],
-    [0.74713, 0.22238, 0.32286],
-    [0.75279, 0.22571, 0.31909],
-    [0.75842, 0.22910, 0.31527],
-    [0.76401, 0.23255, 0.31140],
-    [0.76956, 0.23608, 0.30749],
-    [0.77506, 0.23967, 0.30353],
-    [0.78052, 0.24333, 0.29952],
-    [0.78593, 0.24706, 0.29548],
-    [0.79129, 0.25086, 0.29139],
-    [0.79661, 0.25473, 0.28726],
-    [0.80187, 0.25867, 0.28310],
-    [0.80708, 0.26269, 0.27890],
-    [0.81224, 0.26679, 0.27466],
-    [0.81734, 0.27095, 0.27039],
-    [0.82239, 0.27520, 0.26609],
-    [0.82737, 0.27952, 0.26175],
-    [0.83230, 0.28391, 0.25738],
-    [0.83717, 0.28839, 0.25299],
-    [0.84197, 0.29293, 0.24856],
-    [0.84671, 0.29756, 0.24411],
-    [0.85138, 0.30226, 0.23964],
-    [0.85599, 0.30704, 0.23513],
-    [0.86053, 0.31189, 0.23061],
-    [0.86501, 0.31682, 0.22606],
-    [0.86941, 0.32183, 0.22148],
-    [0.87374, 0.32691, 0.21689],
-    [0.87800, 0.33206, 0.21227],
-    [0.88219, 0.33729, 0.20763],
-    [0.88630, 0.34259, 0.20297],
-    [0.89034, 0.34796, 0.19829],
-    [0.89431, 0.35340, 0.19358],
-    [0.89819, 0.35891, 0.18886],
-    [0.90200, 0.36449, 0.18412],
-    [0.90573, 0.37014, 0.17935],
-    [0.90939, 0.37586, 0.17456],
-    [0.91297, 0.38164, 0.16975],
-    [0.91646, 0.38748, 0.16492],
-    [0.91988, 0.39339, 0.16007],
-    [0.92322, 0.39936, 0.15519],
-    [0.92647, 0.40539, 0.15029],
-    [0.92964, 0.41148, 0.14537],
-    [0.93274, 0.41763, 0.14042],
-    [0.93575, 0.42383, 0.13544],
-    [0.93868, 0.43009, 0.13044],
-    [0.94152, 0.43640, 0.12541],
-    [0.94429, 0.44277, 0.12035],
-    [0.94696, 0.44919, 0.11527],
-    [0.94956, 0.45566, 0.11016],
-    [0.95208, 0.46218, 0.10503],
-    [0.95451, 0.46874, 0.09987],
-    [0.95685, 0.47536, 0.09470],
-    [0.95911, 0.48201, 0.08950],
-    [0.96129, 0.48872, 0.08429],
-    [0.96339, 0.49546, 0.07907],
-    [0.96540, 0.50225, 0.07386],
-    [0.96732, 0.50908, 0.06866],
-    [0.96916, 0.51595, 0.06349],
-    [0.97092, 0.52285, 0.05837],
-    [0.97259, 0.52980, 0.05332],
-    [0.97418, 0.53678, 0.04839],
-    [0.97568, 0.54380, 0.04362],
-    [0.97709, 0.55085, 0.03905],
-    [0.97842, 0.55794, 0.03493],
-    [0.97967, 0.56506, 0.03141],
-    [0.98082, 0.57221, 0.02851],
-    [0.98189, 0.57939, 0.02625],
-    [0.98288, 0.58661, 0.02466],
-    [0.98378, 0.59385, 0.02377],
-    [0.98459, 0.60112, 0.02361],
-    [0.98532, 0.60842, 0.02420],
-    [0.98595, 0.61575, 0.02559],
-    [0.98650, 0.62311, 0.02781],
-    [0.98696, 0.63048, 0.03091],
-    [0.98734, 0.63789, 0.03492],
-    [0.98762, 0.64532, 0.03989],
-    [0.98782, 0.65277, 0.04558],
-    [0.98793, 0.66025, 0.05175],
-    [0.98794, 0.66775, 0.05833],
-    [0.98787, 0.67527, 0.06526],
-    [0.98771, 0.68281, 0.07249],
-    [0.98746, 0.69037, 0.07999],
-    [0.98712, 0.69794, 0.08773],
-    [0.98669, 0.70554, 0.09569],
-    [0.98618, 0.71315, 0.10386],
-    [0.98557, 0.72078, 0.11223],
-    [0.98486, 0.72843, 0.12079],
-    [0.98408, 0.73609, 0.12953],
-    [0.98320, 0.74376, 0.13845],
-    [0.98223, 0.75144, 0.14757],
-    [0.98117, 0.75914, 0.15686],
-    [0.98003, 0.76684, 0.16635],
-    [0.97881, 0.77455, 0.17604],
-    [0.97750, 0.78226, 0.18592],
-    [0.97611, 0.78997, 0.19602],
-    [0.97464, 0.79769, 0.20633],
-    [0.97309, 0.80541, 0.21688],
-    [0.97147, 0.81312, 0.22766],
-    [0.96978, 0.82083, 0.23869],
-    [0.96804, 0.82852, 0.24997],
-    [0.96624, 0.83619, 0.26153],
-    [0.96439, 0.84385, 0.27339],
-    [0.96252, 0.85148, 0.28555],
-    [0.96063, 0.85907, 0.29801],
-    [0.95872, 0.86662, 0.31082],
-    [0.95683, 0.87413, 0.32397],
-    [0.95500, 0.88157, 0.33748],
-    [0.95322, 0.88894, 0.35137],
-    [0.95155, 0.89623, 0.36563],
-    [0.95002, 0.90341, 0.38027],
-    [0.94868, 0.91047, 0.39529],
-    [0.94759, 0.91740, 0.41067],
-    [0.94681, 0.92417, 0.42637],
-    [0.94639, 0.93076, 0.44237],
-    [0.94640, 0.93716, 0.45859],
-    [0.94690, 0.94335, 0.47497],
-    [0.94794, 0.94932, 0.49143],
-    [0.94954, 0.95506, 0.50786],
-    [0.95174, 0.96059, 0.52420],
-    [0.95453, 0.96590, 0.54036],
-    [0.95790, 0.97100, 0.55627],
-    [0.96181, 0.97592, 0.57193],
-    [0.96625, 0.98068, 0.58721],
-    [0.97116, 0.98528, 0.60215],
-    [0.97651, 0.98975, 0.61676],
-    [0.98226, 0.99411, 0.63102],
-    [0.98836, 0.99836, 0.64492],
-])
+def register_colormap(name: str, colors: np.ndarray):
+    # Add (or replace) a colormap. 'colors' is N x 3 RGB, from 0 to 1 (float) or 0 to 255 (uint8),
+    # from the color of the lowest readings to the color of the highest.
+    colors = np.asarray(colors)
+    if colors.ndim != 2 or colors.shape[1] != 3 or len(colors) < 2:
+        raise ValueError(f'Colormap {name} must be N x 3 RGB colors, not {colors.shape}')
+    if colors.dtype == np.uint8:
+        colors = colors / 255
+    _colormaps[name] = np.clip(colors, 0, 1).astype(np.float32)
+    _colormaps_uint8.pop(name, None)
 
-MAGMA = np.array([
-    [0.00146, 0.00047, 0.01387],
-    [0.00226, 0.00129, 0.01833],
-    [0.00328, 0.00231, 0.02371],
-    [0.00451, 0.00349, 0.02996],
-    [0.00595, 0.00484, 0.03713],
-    [0.00759, 0.00636, 0.04497],
-    [0.00943, 0.00802, 0.05284],
-    [0.01146, 0.00983, 0.06075],
-    [0.01371, 0.01177, 0.06867],
-    [0.01616, 0.01384, 0.07660],
-    [0.01881, 0.01603, 0.08458],
-    [0.02169, 0.01832, 0.09261],
-    [0.02479, 0.02072, 0.10068],
-    [0.02812, 0.02320, 0.10879],
-    [0.03170, 0.02576, 0.11696],
-    [0.03552, 0.02840, 0.12521],
-    [0.03961, 0.03109, 0.13351],
-    [0.04383, 0.03383, 0.14189],
-    [0.04806, 0.03661, 0.15033],
-    [0.05232, 0.03941, 0.15884],
-    [0.05661, 0.04216, 0.16745],
-    [0.06095, 0.04479, 0.17613],
-    [0.06533, 0.04732, 0.18489],
-    [0.06976, 0.04973, 0.19373],
-    [0.07426, 0.05202, 0.20266],
-    [0.07881, 0.05418, 0.21167],
-    [0.08345, 0.05622, 0.22076],
-    [0.08815, 0.05813, 0.22992],
-    [0.09295, 0.05990, 0.23916],
-    [0.09783, 0.06153, 0.24848],
-    [0.10282, 0.06301, 0.25785],
-    [0.10790, 0.06434, 0.26729],
-    [0.11309, 0.06549, 0.27678],
-    [0.11840, 0.06648, 0.28632],
-    [0.12383, 0.06729, 0.29588],
-    [0.12938, 0.06793, 0.30544],
-    [0.13505, 0.06839, 0.31500],
-    [0.14086, 0.06865, 0.32454],
-    [0.14678, 0.06874, 0.33401],
-    [0.15284, 0.06864, 0.34340],
-    [0.15902, 0.06835, 0.35269],
-    [0.16531, 0.06791, 0.36182],
-    [0.17171, 0.06731, 0.37077],
-    [0.17821, 0.06658, 0.37950],
-    [0.18480, 0.06573, 0.38797],
-    [0.19146, 0.06482, 0.39615],
-    [0.19818, 0.06386, 0.40401],
-    [0.20494, 0.06291, 0.41151],
-    [0.21172, 0.06199, 0.41865],
-    [0.21851, 0.06116, 0.42539],
-    [0.22530, 0.06044, 0.43174],
-    [0.23208, 0.05989, 0.43770],
-    [0.23883, 0.05952, 0.44326],
-    [0.24554, 0.05935, 0.44844],
-    [0.25222, 0.05942, 0.45325],
-    [0.25886, 0.05971, 0.45771],
-    [0.26545, 0.06024, 0.46184],
-    [0.27199, 0.06099, 0.46566],
-    [0.27849, 0.06198, 0.46919],
-    [0.28495, 0.06317, 0.47245],
-    [0.29137, 0.06455, 0.47546],
-    [0.29774, 0.06612, 0.47824],
-    [0.30408, 0.06784, 0.48081],
-    [0.31038, 0.06970, 0.48319],
-    [0.31665, 0.07169, 0.48538],
-    [0.32290, 0.07378, 0.48741],
-    [0.32911, 0.07597, 0.48929],
-    [0.33531, 0.07824, 0.49102],
-    [0.34148, 0.08056, 0.49263],
-    [0.34764, 0.08295, 0.49412],
-    [0.35377, 0.08537, 0.49550],
-    [0.35990, 0.08783, 0.49678],
-    [0.36601, 0.09031, 0.49796],
-    [0.37212, 0.09282, 0.49905],
-    [0.37821, 0.09533, 0.50007],
-    [0.38430, 0.09785, 0.50100],
-    [0.39038, 0.10038, 0.50186],
-    [0.39647, 0.10290, 0.50266],
-    [0.40255, 0.10542, 0.50339],
-    [0.40863, 0.10793, 0.50405],
-    [0.41471, 0.11043, 0.50466],
-    [0.42079, 0.11292, 0.50521],
-    [0.42688, 0.11539, 0.50571],
-    [0.43297, 0.11786, 0.50616],
-    [0.43906, 0.12030, 0.50655],
-    [0.44516, 0.12272, 0.50690],
-    [0.45127, 0.12513, 0.50720],
-    [0.45739, 0.12752, 0.50745],
-    [0.46351, 0.12989, 0.50765],
-    [0.46964, 0.13225, 0.50781],
-    [0.47578, 0.13458, 0.50792],
-    [0.48193, 0.13689, 0.50799],
-    [0.48809, 0.13919, 0.50801],
-    [0.49426, 0.14146, 0.50799],
-    [0.50044, 0.14372, 0.50792],
-    [0.50663, 0.14596, 0.50781],
-    [0.51283, 0.14818, 0.50765],
-    [0.51904, 0.15038, 0.50744],
-    [0.52527, 0.15257, 0.50719],
-    [0.53151, 0.15474, 0.50689],
-    [0.53775, 0.15689, 0.50655],
-    [0.54402, 0.15903, 0.50616],
-    [0.55029, 0.16116, 0.50572],
-    [0.55657, 0.16327, 0.50523],
-    [0.56287, 0.16537, 0.50469],
-    [0.56917, 0.16745, 0.50411],
-    [0.57549, 0.16953, 0.50347],
-    [0.58182, 0.17160, 0.50278],
-    [0.58816, 0.17365, 0.50204],
-    [0.59451, 0.17570, 0.50124],
-    [0.60087, 0.17774, 0.50039],
-    [0.60724, 0.17978, 0.49949],
-    [0.61362, 0.18181, 0.49854],
-    [0.62001, 0.18384, 0.49752],
-    [0.62640, 0.18587, 0.49646],
-    [0.63280, 0.18789, 0.49533],
-    [0.63922, 0.18992, 0.49415],
-    [0.64563, 0.19195, 0.49291],
-    [0.65206, 0.19399, 0.49161],
-    [0.65848, 0.19603, 0.49025],
-    [0.66492, 0.19808, 0.48884],
-    [0.67135, 0.20013, 0.48736],
-    [0.67779, 0.20220, 0.48582],
-    [0.68422, 0.20429, 0.48422],
-    [0.69066, 0.20638, 0.48256],
-    [0.69710, 0.20850, 0.48084],
-    [0.70353, 0.21064, 0.47905],
-    [0.70996, 0.21280, 0.47720],
-    [0.71639, 0.21498, 0.47529],
-    [0.72281, 0.21719, 0.47332],
-    [0.72922, 0.21944, 0.47128],
-    [0.73562, 0.22171, 0.46918],
-    [0.74200, 0.22403, 0.46702],
-    [0.74838, 0.22638, 0.46479],
-    [0.75474, 0.22877, 0.46251],
-    [0.76108, 0.23121, 0.46016],
-    [0.76740, 0.23370, 0.45776],
-    [0.77370, 0.23625, 0.45529],
-    [0.77997, 0.23885, 0.45276],
-    [0.78621, 0.24151, 0.45018],
-    [0.79243, 0.24424, 0.44754],
-    [0.79861, 0.24704, 0.44485],
-    [0.80475, 0.24991, 0.44210],
-    [0.81085, 0.25286, 0.43931],
-    [0.81691, 0.25589, 0.43646],
-    [0.82293, 0.25902, 0.43357],
-    [0.82889, 0.26223, 0.43064],
-    [0.83479, 0.26554, 0.42767],
-    [0.84064, 0.26895, 0.42467],
-    [0.84642, 0.27247, 0.42163],
-    [0.85213, 0.27611, 0.41857],
-    [0.85776, 0.27986, 0.41550],
-    [0.86332, 0.28373, 0.41240],
-    [0.86879, 0.28773, 0.40930],
-    [0.87418, 0.29186, 0.40620],
-    [0.87946, 0.29613, 0.40312],
-    [0.88465, 0.30053, 0.40005],
-    [0.88973, 0.30508, 0.39700],
-    [0.89470, 0.30977, 0.39399],
-    [0.89955, 0.31462, 0.39104],
-    [0.90428, 0.31961, 0.38814],
-    [0.90888, 0.32476, 0.38531],
-    [0.91335, 0.33005, 0.38256],
-    [0.91769, 0.33550, 0.37992],
-    [0.92188, 0.34110, 0.37738],
-    [0.92594, 0.34684, 0.37496],
-    [0.92985, 0.35273, 0.37268],
-    [0.93361, 0.35876, 0.37054],
-    [0.93722, 0.36493, 0.36857],
-    [0.94069, 0.37122, 0.36676],
-    [0.94401, 0.37764, 0.36514],
-    [0.94718, 0.38418, 0.36370],
-    [0.95021, 0.39082, 0.36247],
-    [0.95310, 0.39756, 0.36144],
-    [0.95585, 0.40440, 0.36062],
-    [0.95846, 0.41132, 0.36001],
-    [0.96095, 0.41832, 0.35963],
-    [0.96331, 0.42539, 0.35947],
-    [0.96555, 0.43252, 0.35953],
-    [0.96767, 0.43970, 0.35981],
-    [0.96968, 0.44694, 0.36031],
-    [0.97158, 0.45421, 0.36103],
-    [0.97338, 0.46152, 0.36196],
-    [0.97508, 0.46886, 0.36311],
-    [0.97669, 0.47623, 0.36447],
-    [0.97821, 0.48361, 0.36602],
-    [0.97964, 0.49101, 0.36778],
-    [0.98100, 0.49843, 0.36973],
-    [0.98228, 0.50585, 0.37187],
-    [0.98349, 0.51328, 0.37420],
-    [0.98462, 0.52071, 0.37670],
-    [0.98569, 0.52815, 0.37937],
-    [0.98670, 0.53558, 0.38221],
-    [0.98765, 0.54302, 0.38521],
-    [0.98853, 0.55045, 0.38837],
-    [0.98936, 0.55787, 0.39167],
-    [0.99014, 0.56530, 0.39512],
-    [0.99087, 0.57271, 0.39871],
-    [0.99156, 0.58011, 0.40244],
-    [0.99220, 0.58750, 0.40630],
-    [0.99279, 0.59489, 0.41028],
-    [0.99333, 0.60228, 0.41439],
-    [0.99383, 0.60964, 0.41861],
-    [0.99431, 0.61700, 0.42295],
-    [0.99474, 0.62435, 0.42740],
-    [0.99512, 0.63170, 0.43195],
-    [0.99548, 0.63903, 0.43661],
-    [0.99581, 0.64634, 0.44136],
-    [0.99610, 0.65366, 0.44621],
-    [0.99634, 0.66097, 0.45116],
-    [0.99658, 0.66826, 0.45619],
-    [0.99677, 0.67554, 0.46131],
-    [0.99692, 0.68283, 0.46653],
-    [0.99708, 0.69009, 0.47181],
-    [0.99719, 0.69735, 0.47718],
-    [0.99725, 0.70461, 0.48263],
-    [0.99733, 0.71185, 0.48815],
-    [0.99735, 0.71909, 0.49375],
-    [0.99735, 0.72632, 0.49943],
-    [0.99734, 0.73355, 0.50517],
-    [0.99728, 0.74077, 0.51098],
-    [0.99723, 0.74798, 0.51686],
-    [0.99714, 0.75519, 0.52281],
-    [0.99702, 0.76240, 0.52882],
-    [0.99690, 0.76959, 0.53489],
-    [0.99673, 0.77680, 0.54104],
-    [0.99657, 0.78398, 0.54723],
-    [0.99637, 0.79117, 0.55350],
-    [0.99616, 0.79835, 0.55982],
-    [0.99593, 0.80553, 0.56620],
-    [0.99568, 0.81271, 0.57264],
-    [0.99542, 0.81988, 0.57914],
-    [0.99513, 0.82705, 0.58570],
-    [0.99485, 0.83421, 0.59231],
-    [0.99452, 0.84139, 0.59898],
-    [0.99422, 0.84854, 0.60570],
-    [0.99387, 0.85571, 0.61248],
-    [0.99355, 0.86286, 0.61930],
-    [0.99317, 0.87002, 0.62619],
-    [0.99283, 0.87717, 0.63311],
-    [0.99244, 0.88433, 0.64010],
-    [0.99209, 0.89147, 0.64712],
-    [0.99169, 0.89863, 0.65420],
-    [0.99133, 0.90576, 0.66131],
-    [0.99093, 0.91292, 0.66848],
-    [0.99057, 0.92005, 0.67568],
-    [0.99018, 0.92720, 0.68293],
-    [0.98982, 0.93433, 0.69020],
-    [0.98943, 0.94147, 0.69752],
-    [0.98908, 0.94860, 0.70486],
-    [0.98872, 0.95574, 0.71224],
-    [0.98837, 0.96288, 0.71965],
-    [0.98803, 0.97001, 0.72708],
-    [0.98769, 0.97715, 0.73454],
-    [0.98739, 0.98429, 0.74200],
-    [0.98705, 0.99144, 0.74950],
-])
 
-CIVIDIS = np.array([
-    [0.00000, 0.13511, 0.30475],
-    [0.00000, 0.13807, 0.31111],
-    [0.00000, 0.14101, 0.31758],
-    [0.00000, 0.14395, 0.32398],
-    [0.00000, 0.14688, 0.33048],
-    [0.00000, 0.14979, 0.33707],
-    [0.00000, 0.15267, 0.34370],
-    [0.00000, 0.15538, 0.35050],
-    [0.00000, 0.15793, 0.35752],
-    [0.00000, 0.16049, 0.36453],
-    [0.00000, 0.16306, 0.37161],
-    [0.00000, 0.16562, 0.37877],
-    [0.00000, 0.16820, 0.38590],
-    [0.00000, 0.17080, 0.39310],
-    [0.00000, 0.17342, 0.40035],
-    [0.00000, 0.17608, 0.40758],
-    [0.00000, 0.17880, 0.41476],
-    [0.00000, 0.18161, 0.42186],
-    [0.00000, 0.18455, 0.42880],
-    [0.00000, 0.18691, 0.43553],
-    [0.00000, 0.18877, 0.43956],
-    [0.00000, 0.19095, 0.44109],
-    [0.00000, 0.19337, 0.44156],
-    [0.00360, 0.19591, 0.44156],
-    [0.01785, 0.19853, 0.44125],
-    [0.03211, 0.20120, 0.44078],
-    [0.04621, 0.20390, 0.44020],
-    [0.05838, 0.20663, 0.43953],
-    [0.06897, 0.20937, 0.43886],
-    [0.07862, 0.21212, 0.43811],
-    [0.08747, 0.21488, 0.43734],
-    [0.09564, 0.21764, 0.43659],
-    [0.10340, 0.22041, 0.43579],
-    [0.11066, 0.22317, 0.43507],
-    [0.11761, 0.22593, 0.43431],
-    [0.12429, 0.22870, 0.43355],
-    [0.13067, 0.23146, 0.43284],
-    [0.13683, 0.23422, 0.43215],
-    [0.14285, 0.23697, 0.43140],
-    [0.14864, 0.23972, 0.43075],
-    [0.15426, 0.24247, 0.43012],
-    [0.15973, 0.24522, 0.42953],
-    [0.16511, 0.24796, 0.42891],
-    [0.17036, 0.25071, 0.42833],
-    [0.17549, 0.25344, 0.42779],
-    [0.18050, 0.25618, 0.42730],
-    [0.18545, 0.25891, 0.42679],
-    [0.19030, 0.26164, 0.42633],
-    [0.19506, 0.26437, 0.42592],
-    [0.19976, 0.26710, 0.42550],
-    [0.20439, 0.26982, 0.42513],
-    [0.20893, 0.27255, 0.42481],
-    [0.21343, 0.27527, 0.42448],
-    [0.21786, 0.27798, 0.42421],
-    [0.22226, 0.28070, 0.42391],
-    [0.22660, 0.28342, 0.42368],
-    [0.23087, 0.28613, 0.42350],
-    [0.23512, 0.28885, 0.42330],
-    [0.23931, 0.29156, 0.42317],
-    [0.24349, 0.29427, 0.42301],
-    [0.24760, 0.29699, 0.42292],
-    [0.25167, 0.29970, 0.42287],
-    [0.25573, 0.30241, 0.42281],
-    [0.25974, 0.30512, 0.42281],
-    [0.26374, 0.30783, 0.42279],
-    [0.26769, 0.31054, 0.42282],
-    [0.27164, 0.31325, 0.42284],
-    [0.27551, 0.31596, 0.42298],
-    [0.27941, 0.31868, 0.42303],
-    [0.28324, 0.32139, 0.42321],
-    [0.28707, 0.32410, 0.42337],
-    [0.29088, 0.32682, 0.42352],
-    [0.29467, 0.32953, 0.42372],
-    [0.29842, 0.33225, 0.42397],
-    [0.30217, 0.33496, 0.42421],
-    [0.30589, 0.33768, 0.42451],
-    [0.30960, 0.34040, 0.42479],
-    [0.31329, 0.34312, 0.42512],
-    [0.31694, 0.34584, 0.42551],
-    [0.32060, 0.34857, 0.42589],
-    [0.32425, 0.35129, 0.42625],
-    [0.32788, 0.35402, 0.42667],
-    [0.33147, 0.35674, 0.42714],
-    [0.33507, 0.35947, 0.42761],
-    [0.33867, 0.36221, 0.42805],
-    [0.34225, 0.36494, 0.42856],
-    [0.34579, 0.36768, 0.42913],
-    [0.34934, 0.37041, 0.42968],
-    [0.35289, 0.37315, 0.43023],
-    [0.35642, 0.37590, 0.43082],
-    [0.35992, 0.37864, 0.43150],
-    [0.36345, 0.38139, 0.43207],
-    [0.36692, 0.38414, 0.43280],
-    [0.37043, 0.38689, 0.43343],
-    [0.37388, 0.38965, 0.43421],
-    [0.37737, 0.39240, 0.43489],
-    [0.38083, 0.39516, 0.43565],
-    [0.38427, 0.39793, 0.43648],
-    [0.38771, 0.40069, 0.43730],
-    [0.39115, 0.40346, 0.43810],
-    [0.39457, 0.40624, 0.43899],
-    [0.39799, 0.40901, 0.43985],
-    [0.40142, 0.41179, 0.44071],
-    [0.40482, 0.41457, 0.44164],
-    [0.40823, 0.41736, 0.44257],
-    [0.41161, 0.42014, 0.44358],
-    [0.41499, 0.42294, 0.44458],
-    [0.41838, 0.42573, 0.44556],
-    [0.42175, 0.42853, 0.44664],
-    [0.42512, 0.43133, 0.44769],
-    [0.42846, 0.43414, 0.44886],
-    [0.43182, 0.43695, 0.44998],
-    [0.43517, 0.43976, 0.45113],
-    [0.43850, 0.44258, 0.45234],
-    [0.44181, 0.44540, 0.45366],
-    [0.44515, 0.44823, 0.45488],
-    [0.44845, 0.45105, 0.45626],
-    [0.45176, 0.45389, 0.45758],
-    [0.45507, 0.45672, 0.45898],
-    [0.45837, 0.45955, 0.46046],
-    [0.46162, 0.46241, 0.46197],
-    [0.46495, 0.46524, 0.46340],
-    [0.46825, 0.46808, 0.46491],
-    [0.47150, 0.47096, 0.46636],
-    [0.47481, 0.47383, 0.46768],
-    [0.47819, 0.47670, 0.46885],
-    [0.48162, 0.47957, 0.46977],
-    [0.48514, 0.48245, 0.47038],
-    [0.48870, 0.48532, 0.47101],
-    [0.49228, 0.48820, 0.47145],
-    [0.49591, 0.49108, 0.47175],
-    [0.49955, 0.49396, 0.47203],
-    [0.50318, 0.49685, 0.47230],
-    [0.50687, 0.49974, 0.47243],
-    [0.51054, 0.50264, 0.47255],
-    [0.51423, 0.50555, 0.47264],
-    [0.51792, 0.50845, 0.47271],
-    [0.52164, 0.51137, 0.47264],
-    [0.52535, 0.51428, 0.47266],
-    [0.52909, 0.51721, 0.47254],
-    [0.53283, 0.52014, 0.47240],
-    [0.53655, 0.52307, 0.47235],
-    [0.54031, 0.52600, 0.47216],
-    [0.54407, 0.52895, 0.47195],
-    [0.54784, 0.53190, 0.47170],
-    [0.55161, 0.53485, 0.47144],
-    [0.55539, 0.53781, 0.47115],
-    [0.55918, 0.54077, 0.47083],
-    [0.56297, 0.54374, 0.47049],
-    [0.56680, 0.54671, 0.46999],
-    [0.57061, 0.54970, 0.46959],
-    [0.57442, 0.55268, 0.46917],
-    [0.57824, 0.55567, 0.46872],
-    [0.58209, 0.55867, 0.46812],
-    [0.58592, 0.56167, 0.46762],
-    [0.58975, 0.56468, 0.46709],
-    [0.59362, 0.56770, 0.46640],
-    [0.59747, 0.57072, 0.46582],
-    [0.60135, 0.57374, 0.46507],
-    [0.60521, 0.57678, 0.46444],
-    [0.60911, 0.57982, 0.46364],
-    [0.61298, 0.58286, 0.46295],
-    [0.61685, 0.58591, 0.46224],
-    [0.62077, 0.58897, 0.46135],
-    [0.62465, 0.59203, 0.46058],
-    [0.62858, 0.59510, 0.45964],
-    [0.63251, 0.59818, 0.45867],
-    [0.63641, 0.60126, 0.45782],
-    [0.64035, 0.60435, 0.45679],
-    [0.64427, 0.60745, 0.45589],
-    [0.64822, 0.61055, 0.45480],
-    [0.65218, 0.61366, 0.45369],
-    [0.65611, 0.61678, 0.45270],
-    [0.66008, 0.61990, 0.45153],
-    [0.66405, 0.62303, 0.45034],
-    [0.66801, 0.62617, 0.44927],
-    [0.67199, 0.62932, 0.44802],
-    [0.67598, 0.63247, 0.44674],
-    [0.67998, 0.63563, 0.44542],
-    [0.68395, 0.63879, 0.44425],
-    [0.68796, 0.64197, 0.44289],
-    [0.69197, 0.64514, 0.44149],
-    [0.69598, 0.64833, 0.44007],
-    [0.70001, 0.65153, 0.43862],
-    [0.70404, 0.65473, 0.43715],
-    [0.70807, 0.65794, 0.43565],
-    [0.71210, 0.66116, 0.43412],
-    [0.71618, 0.66438, 0.43239],
-    [0.72022, 0.66762, 0.43080],
-    [0.72427, 0.67086, 0.42919],
-    [0.72833, 0.67411, 0.42755],
-    [0.73242, 0.67736, 0.42572],
-    [0.73649, 0.68063, 0.42403],
-    [0.74059, 0.68390, 0.42213],
-    [0.74466, 0.68718, 0.42039],
-    [0.74877, 0.69047, 0.41845],
-    [0.75289, 0.69377, 0.41647],
-    [0.75697, 0.69707, 0.41466],
-    [0.76110, 0.70038, 0.41264],
-    [0.76522, 0.70371, 0.41059],
-    [0.76935, 0.70703, 0.40852],
-    [0.77349, 0.71037, 0.40642],
-    [0.77765, 0.71372, 0.40411],
-    [0.78180, 0.71707, 0.40197],
-    [0.78597, 0.72044, 0.39961],
-    [0.79012, 0.72381, 0.39742],
-    [0.79430, 0.72719, 0.39502],
-    [0.79848, 0.73058, 0.39260],
-    [0.80267, 0.73398, 0.39015],
-    [0.80686, 0.73738, 0.38768],
-    [0.81105, 0.74080, 0.38520],
-    [0.81527, 0.74423, 0.38250],
-    [0.81950, 0.74766, 0.37978],
-    [0.82373, 0.75110, 0.37704],
-    [0.82796, 0.75455, 0.37429],
-    [0.83219, 0.75801, 0.37153],
-    [0.83643, 0.76148, 0.36875],
-    [0.84069, 0.76496, 0.36575],
-    [0.84496, 0.76845, 0.36274],
-    [0.84922, 0.77195, 0.35973],
-    [0.85352, 0.77545, 0.35650],
-    [0.85781, 0.77897, 0.35326],
-    [0.86211, 0.78249, 0.35001],
-    [0.86642, 0.78603, 0.34657],
-    [0.87072, 0.78957, 0.34333],
-    [0.87506, 0.79312, 0.33969],
-    [0.87938, 0.79669, 0.33624],
-    [0.88372, 0.80026, 0.33260],
-    [0.88808, 0.80384, 0.32877],
-    [0.89244, 0.80743, 0.32497],
-    [0.89682, 0.81103, 0.32098],
-    [0.90119, 0.81464, 0.31702],
-    [0.90559, 0.81826, 0.31289],
-    [0.91000, 0.82188, 0.30859],
-    [0.91441, 0.82552, 0.30435],
-    [0.91883, 0.82917, 0.29996],
-    [0.92328, 0.83282, 0.29524],
-    [0.92772, 0.83649, 0.29061],
-    [0.93218, 0.84016, 0.28588],
-    [0.93666, 0.84384, 0.28088],
-    [0.94115, 0.84753, 0.27581],
-    [0.94565, 0.85123, 0.27053],
-    [0.95018, 0.85493, 0.26509],
-    [0.95473, 0.85865, 0.25937],
-    [0.95928, 0.86237, 0.25356],
-    [0.96387, 0.86609, 0.24744],
-    [0.96847, 0.86982, 0.24131],
-    [0.97311, 0.87355, 0.23468],
-    [0.97778, 0.87728, 0.22795],
-    [0.98250, 0.88101, 0.22088],
-    [0.98729, 0.88472, 0.21334],
-    [0.99222, 0.88838, 0.20547],
-    [0.99485, 0.89295, 0.20344],
-    [0.99525, 0.89838, 0.20756],
-    [0.99550, 0.90387, 0.21237],
-    [0.99574, 0.90934, 0.21777],
-])
+def available_colormaps() -> list[str]:
+    return list(_colormaps)
+
+
+def get_colormap_array(colormap: ColormapName | str) -> np.ndarray:
+    # The colormap's float32 table (N x 3, from 0 to 1)
+    if colormap not in _colormaps:
+        raise ValueError(f'Colormap {colormap} not supported')
+    table = _colormaps[colormap]
+    if table is None:
+        # Only this colormap's table is read (and decompressed) from the file
+        with np.load(COLORMAPS_PATH) as tables:
+            table = tables[colormap].astype(np.float32)
+        _colormaps[colormap] = table
+    return table
+
+
+def get_colormap_uint8(colormap: ColormapName | str) -> np.ndarray:
+    # The colormap's uint8 table (N x 3, from 0 to 255): the same colors as 'get_colormap_array(colormap) * 255'
+    # cast to uint8, ready to be copied into an image
+    table = _colormaps_uint8.get(colormap)
+    if table is None:
+        table = (get_colormap_array(colormap) * 255).astype(np.uint8)
+        _colormaps_uint8[colormap] = table
+    return table
 
 
 def apply_colormap(
     normalized_array: np.ndarray, 
-    colormap: Literal['viridis', 'plasma', 'inferno', 'magma', 'cividis']
+    colormap: ColormapName | str
 ) -> np.ndarray:
     
-    if colormap == 'viridis':
-        cmap_array = VIRIDIS
-    elif colormap == 'plasma':
-        cmap_array = PLASMA
-    elif colormap == 'inferno':
-        cmap_array = INFERNO
-    elif colormap == 'magma':
-        cmap_array = MAGMA
-    elif colormap == 'cividis':
-        cmap_array = CIVIDIS
-    else:
-        raise ValueError(f'Colormap {colormap} not supported')
+    cmap_array = get_colormap_array(colormap)
     
     normalized_array = np.clip(normalized_array, 0, 1) # Clip values to [0, 1]
-    indices = (normalized_array * (len(cmap_array) - 1)).astype(int) # Map values to indices
+    indices = (normalized_array * (len(cmap_array) - 1)).astype(np.intp) # Map values to indices
     colored_array = cmap_array[indices] # Map indices to colors
         
-    return colored_array
\ No newline at end of file
+    return colored_array
+
+
+class ColormapLUT:
+    # Lookup table from raw readings (0 to ADC_LEVELS-1) straight to uint8 RGB colors.
+    # Readings at or below 'low' get the first color of the colormap, readings at or above 'high' the last.
+    # Coloring a frame is then a single 'np.take', with no float arithmetic or temporary arrays.
+    # The table is only rebuilt when the colormap or the scaling range changes.
+
+    def __init__(self, levels: int = ADC_LEVELS) -> None:
+        self.levels = levels
+        self.table: np.ndarray = np.zeros((levels, 3), dtype=np.uint8)
+        self.rebuilds: int = 0 # number of times the table has been built
+        self._key: tuple | None = None # (colormap, low, high) the table was built for
+
+    def get_table(self, colormap: ColormapName | str, low: float, high: float) -> np.ndarray:
+        key = (colormap, float(low), float(high))
+        if key != self._key:
+            readings = np.arange(self.levels, dtype=np.float64)
+            normalized = (readings - low) / (high - low) if high > low else (readings > low).astype(np.float64)
+            # Same colors as 'apply_colormap(normalized) * 255' followed by a cast to uint8
+            colors = get_colormap_uint8(colormap)
+            indices = (np.clip(normalized, 0, 1) * (len(colors) - 1)).astype(np.intp)
+            np.take(colors, indices, axis=0, out=self.table)
+            self._key = key
+            self.rebuilds += 1
+        return self.table
+
+    def apply(self, raw: np.ndarray, colormap: ColormapName | str, low: float, high: float, 
+              out: np.ndarray | None = None) -> np.ndarray:
+        # Color a frame of raw readings. Returns an array of shape raw.shape + (3,), written to 'out' if given.
+        # Readings above the table (which the ADC can't produce) get the last color.
+        table = self.get_table(colormap, low, high)
+        return np.take(table, raw, axis=0, mode='clip', out=out)
+
+
+if __name__ == "__main__":
+    # Compare coloring a raw uint16 frame the float way (normalize, apply_colormap, * 255, cast)
+    # and with a ColormapLUT whose scaling range doesn't change
+    import timeit
+
+    lut = ColormapLUT()
+    for rows, cols in [(16, 16), (64, 64), (256, 256)]:
+        raw = np.random.default_rng(0).integers(0, ADC_LEVELS, size=(rows, cols), dtype=np.uint16)
+        low, high = 200.0, 1000.0
+        out = np.empty((rows, cols, 3), dtype=np.uint8)
+
+        def float_path():
+            normalized = (raw - low) / (high - low)
+            return (apply_colormap(normalized, 'inferno') * 255).astype(np.uint8)
+
+        def lut_path():
+            return lut.apply(raw, 'inferno', low, high, out=out)
+
+        number = max(10, 200000 // (rows * cols))
+        float_time = min(timeit.repeat(float_path, number=number, repeat=5)) / number
+        lut_time = min(timeit.repeat(lut_path, number=number, repeat=5)) / number
+        print(f"{rows:4d}x{cols:<4d} float path {float_time * 1e6:9.1f} us   LUT {lut_time * 1e6:9.1f} us   ({float_time / lut_time:.1f}x faster)")
+
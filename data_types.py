@@ -0,0 +1,21 @@
+"""
+The numeric types used along the data path, from the Arduino to the screen.
+
+    RAW_DTYPE         uint16   raw frames: 10-bit ADC readings (0-1023), as decoded from the wire,
+                               in the ring buffer, in histories and in raw recordings
+    CALIBRATED_DTYPE  float32  calibrated values (e.g. pressure), colormap tables and interpolation
+    PIXEL_DTYPE       uint8    RGB pixels: colored heatmaps, canvas images and video frames
+
+A 10-bit reading fits in 2 bytes, so raw frames are 4x smaller than int64/float64 ones, and so is
+the memory bandwidth and cache used by every step that touches them. float32 has far more precision
+than the sensor (24 bits against 10), so nothing is lost by not using float64.
+Convert at the boundaries (e.g. 'np.copyto(..., casting="unsafe")' into a preallocated buffer),
+not by letting numpy promote whole frames to 8-byte types.
+"""
+
+import numpy as np
+
+
+RAW_DTYPE = np.uint16 # raw ADC readings
+CALIBRATED_DTYPE = np.float32 # calibrated values
+PIXEL_DTYPE = np.uint8 # RGB pixels
@@ -0,0 +1,250 @@
+"""
+Requests frames from the Arduino and reads them back.
+
+Three acquisition modes are supported:
+    "lock-step": Send a request, wait for the whole frame, return it. The next request is only
+                 sent when the next frame is wanted, so the serial link and the Arduino sit idle
+                 while the computer decodes and draws the frame.
+    "pipelined": Keep one request in flight at all times. The next request is sent as soon as the
+                 header of the current frame arrives, so the Arduino starts scanning the next frame
+                 (in 'collectAndSendData') while the computer is still decoding and drawing this one.
+    "streaming": Ask the Arduino once to send frames continuously, without any requests. Each frame
+                 carries a sync word, a sequence number and a checksum (see 'frame_decoder.py'), so a
+                 lost or corrupted byte only costs one frame, and lost frames are counted.
+
+In pipelined mode, the Arduino only checks for a new request after it has finished sending a frame,
+so a request sent early simply waits in its serial receive buffer.
+If a frame doesn't arrive in time, its reply (or the rest of it) may still arrive later and be read as the
+header of the next frame. So after a timeout, everything is thrown away until the line is quiet before the
+next request is sent.
+
+The wire format of the values ("uint16", "packed10" or "delta", see 'frame_decoder.py') is negotiated
+with the Arduino: the computer sends the format command and the Arduino echoes it back. Firmware that
+doesn't know the command never answers, and the Arduino keeps using the format it had.
+The "delta" format is only used while streaming, because reconstructing a frame from the previous one
+relies on the sequence numbers and checksums of streamed frames. In the other modes "packed10" is used.
+
+In the "lock-step" and "pipelined" modes, a region of interest (ROI) can be requested instead of the whole
+matrix: a rectangle (first row, first col, rows, cols). The Arduino only scans and sends that window, so
+small windows arrive many times faster, and the window is merged into a full-size frame. The rectangle's
+bytes are sent with their top bit set, so firmware that doesn't know the ROI request ignores them (and
+never answers, in which case full frames are used). ROIs aren't supported while streaming.
+"""
+
+from typing import Literal
+import time
+import numpy as np
+
+from frame_decoder import FrameDecoder, FrameStreamParser, WireFormat
+
+
+AcquisitionMode = Literal["lock-step", "pipelined", "streaming"]
+ACQUISITION_MODES: tuple[AcquisitionMode, ...] = ("lock-step", "pipelined", "streaming")
+
+START_STREAM_SIGNAL = b'\x02' # Asks the Arduino to start streaming frames (START_STREAM in pressure_sensor.ino)
+STOP_STREAM_SIGNAL = b'\x03' # Asks the Arduino to stop streaming frames (STOP_STREAM in pressure_sensor.ino)
+STREAM_READ_TIMEOUT = 0.05 # seconds. Serial port timeout while streaming, so a read never blocks for long.
+STREAM_FRAME_TIMEOUT = 0.5 # seconds. Longest time to wait for a streamed frame before giving up.
+LINE_QUIET_TIME = 0.25 # seconds. After stopping a stream or a timeout, the line must be quiet this long (longer than a frame's scan).
+SET_PACKED_FORMAT_SIGNAL = b'\x04' # Asks the Arduino to pack values 4 into 5 bytes (SET_PACKED_FORMAT in pressure_sensor.ino)
+SET_UINT16_FORMAT_SIGNAL = b'\x05' # Asks the Arduino to send values as uint16 (SET_UINT16_FORMAT in pressure_sensor.ino)
+SET_DELTA_FORMAT_SIGNAL = b'\x06' # Asks the Arduino to stream deltas (SET_DELTA_FORMAT in pressure_sensor.ino)
+REQUEST_KEY_FRAME_SIGNAL = b'\x07' # Asks the Arduino for a key frame right away (REQUEST_KEY_FRAME in pressure_sensor.ino)
+FORMAT_ACK_TIMEOUT = 0.5 # seconds. Longest time to wait for the Arduino to acknowledge a wire format.
+DELTA_KEY_FRAME_INTERVAL = 30 # frames. How often the Arduino sends a full frame in delta format.
+GET_ROI_SIGNAL = b'\x0B' # Asks the Arduino for a window of the matrix. Followed by the rectangle. (GET_ROI in pressure_sensor.ino)
+ROI_PARAMETER_FLAG = 0x80 # Set on the rectangle's bytes, so they can't be mistaken for commands
+MAX_ROI_PARAMETER = 0x7F # Largest first row/col and rows/cols of a rectangle
+ROI_PROBE_TIMEOUT = 0.5 # seconds. Longest time to wait for the first ROI frame before deciding the Arduino doesn't support it.
+
+RegionOfInterest = tuple[int, int, int, int] # (first row, first col, rows, cols)
+
+WIRE_FORMAT_SIGNALS: dict[WireFormat, bytes] = {
+    "uint16": SET_UINT16_FORMAT_SIGNAL,
+    "packed10": SET_PACKED_FORMAT_SIGNAL,
+    "delta": SET_DELTA_FORMAT_SIGNAL,
+}
+
+
+class FrameAcquirer:
+
+    def __init__(self, request_signal: bytes, frame_decoder: FrameDecoder | None = None) -> None:
+        self.request_signal = request_signal # byte that asks the Arduino for a frame
+        self.frame_decoder = frame_decoder if frame_decoder is not None else FrameDecoder()
+        self.request_in_flight: bool = False # a request has been sent but its frame not yet read
+        self.resync_needed: bool = False # a frame timed out, and its late reply must be thrown away
+
+        self.stream_parser = FrameStreamParser()
+        self.streaming: bool = False # the Arduino has been asked to stream frames
+        self._serial_timeout: float | None = None # serial port timeout to restore after streaming
+
+        self.wire_format: WireFormat = "uint16" # wire format the Arduino is currently using
+        self._requested_wire_format: WireFormat = "uint16" # last wire format asked for
+
+        self.roi_supported: bool | None = None # None until the Arduino has answered (or not) an ROI request
+        self._roi_in_flight: RegionOfInterest | None = None # ROI of the request in flight (None for a full frame)
+
+    def get_frame(self, serialcomm, mode: AcquisitionMode = "lock-step", wire_format: WireFormat = "uint16", 
+                  roi: RegionOfInterest | None = None) -> np.ndarray:
+        if mode not in ACQUISITION_MODES:
+            raise ValueError(f"Acquisition mode {mode} not supported")
+
+        if wire_format == "delta" and mode != "streaming":
+            wire_format = "packed10"
+        if wire_format != self._requested_wire_format:
+            self._negotiate_wire_format(serialcomm, wire_format)
+
+        if mode == "streaming":
+            if not self.streaming:
+                self._start_streaming(serialcomm)
+            # If no new frame arrives in time, the previous frame is returned again
+            self.stream_parser.read_frame(serialcomm, STREAM_FRAME_TIMEOUT)
+            if self.stream_parser.key_frame_needed:
+                # A delta frame couldn't be reconstructed. Don't wait for the next scheduled key frame.
+                serialcomm.write(REQUEST_KEY_FRAME_SIGNAL)
+                self.stream_parser.key_frame_needed = False
+            return self.stream_parser.frame
+        if self.streaming:
+            self._stop_streaming(serialcomm)
+
+        if roi is not None:
+            roi = tuple(roi) if self.roi_supported is not False else None
+        if self.request_in_flight and self._roi_in_flight != roi:
+            # The request in flight was for a different window
+            self._finish_request_in_flight(serialcomm)
+
+        if self.resync_needed:
+            self._resync(serialcomm)
+
+        # Request a frame, unless one was already requested (pipelined mode, or just switched from it)
+        if not self.request_in_flight:
+            self._send_request(serialcomm, roi)
+        self.request_in_flight = False
+
+        if roi is not None:
+            return self._read_roi_frame(serialcomm, mode, wire_format, roi)
+
+        rows, cols = self.frame_decoder.read_header(serialcomm)
+        if rows == 0 or cols == 0:
+            # Timed out waiting for the frame. Start over on the next call, once its reply can't get in the way.
+            self.resync_needed = True
+            return self.frame_decoder.read_body(serialcomm, rows, cols)
+
+        # The header is here, so the Arduino is busy with this frame. Queue up the next one.
+        if mode == "pipelined":
+            self._send_request(serialcomm, roi)
+            self.request_in_flight = True
+
+        frame = self.frame_decoder.read_body(serialcomm, rows, cols)
+        self.resync_needed = self.frame_decoder.timed_out
+        return frame
+
+    def _read_roi_frame(self, serialcomm, mode: AcquisitionMode, wire_format: WireFormat, roi: RegionOfInterest) -> np.ndarray:
+        if self.roi_supported is None:
+            # The first ROI request also checks whether the Arduino supports it, so don't wait long
+            serial_timeout = serialcomm.timeout
+            serialcomm.timeout = ROI_PROBE_TIMEOUT
+            row_offset, col_offset, rows, cols = self.frame_decoder.read_roi_header(serialcomm)
+            serialcomm.timeout = serial_timeout
+            self.roi_supported = rows > 0 and cols > 0
+            if not self.roi_supported:
+                return self.get_frame(serialcomm, mode, wire_format)
+        else:
+            row_offset, col_offset, rows, cols = self.frame_decoder.read_roi_header(serialcomm)
+
+        if rows > 0 and cols > 0 and mode == "pipelined":
+            self._send_request(serialcomm, roi)
+            self.request_in_flight = True
+        frame = self.frame_decoder.read_roi_body(serialcomm, row_offset, col_offset, rows, cols)
+        # (the header or the values timed out, or the header didn't make sense: a late reply may follow)
+        self.resync_needed = self.frame_decoder.timed_out or rows == 0 or cols == 0
+        return frame
+
+    def _send_request(self, serialcomm, roi: RegionOfInterest | None):
+        self._roi_in_flight = roi
+        if roi is None:
+            serialcomm.write(self.request_signal)
+            return
+        parameters = [min(max(int(value), 0), MAX_ROI_PARAMETER) | ROI_PARAMETER_FLAG for value in roi]
+        serialcomm.write(GET_ROI_SIGNAL + bytes(parameters))
+
+    def _finish_request_in_flight(self, serialcomm):
+        # Read (and throw away) the frame of the request in flight, so it isn't mistaken for something else
+        if self._roi_in_flight is None:
+            self.frame_decoder.read_frame(serialcomm)
+        else:
+            self.frame_decoder.read_roi_body(serialcomm, *self.frame_decoder.read_roi_header(serialcomm))
+        self.request_in_flight = False
+
+    def _resync(self, serialcomm):
+        # Throw away the late reply of a frame that timed out, and any request that was queued behind it
+        self._drain(serialcomm)
+        serialcomm.reset_input_buffer()
+        self.request_in_flight = False
+        self.resync_needed = False
+
+    def _drain(self, serialcomm):
+        # Read (and throw away) everything until the line has been quiet for LINE_QUIET_TIME
+        serial_timeout = serialcomm.timeout
+        serialcomm.timeout = STREAM_READ_TIMEOUT
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < LINE_QUIET_TIME:
+            if serialcomm.read(4096):
+                quiet_since = time.monotonic()
+        serialcomm.timeout = serial_timeout
+
+    def reset(self):
+        # Call when the serial port is closed or reopened (the Arduino resets and forgets any request)
+        self.request_in_flight = False
+        self.resync_needed = False
+        self.roi_supported = None
+        self.streaming = False
+        self.stream_parser.reset()
+        self._set_wire_format("uint16")
+        self._requested_wire_format = "uint16"
+
+    def _start_streaming(self, serialcomm):
+        # Finish reading a requested frame that is still on its way, so it isn't parsed as stream data
+        if self.request_in_flight:
+            self._finish_request_in_flight(serialcomm)
+
+        self._serial_timeout = serialcomm.timeout
+        serialcomm.timeout = STREAM_READ_TIMEOUT
+        self.stream_parser.reset()
+        serialcomm.write(START_STREAM_SIGNAL)
+        self.streaming = True
+
+    def _stop_streaming(self, serialcomm):
+        serialcomm.write(STOP_STREAM_SIGNAL)
+        # The Arduino finishes the frame it is sending. Throw away everything until the line is quiet.
+        self._drain(serialcomm)
+        serialcomm.timeout = self._serial_timeout
+        self.streaming = False
+
+    def _negotiate_wire_format(self, serialcomm, wire_format: WireFormat):
+        # Nothing else may be on its way from the Arduino while waiting for the acknowledgement
+        if self.streaming:
+            self._stop_streaming(serialcomm)
+        if self.request_in_flight:
+            self._finish_request_in_flight(serialcomm)
+
+        signal = WIRE_FORMAT_SIGNALS[wire_format]
+        serial_timeout = serialcomm.timeout
+        serialcomm.timeout = FORMAT_ACK_TIMEOUT
+        if wire_format == "delta":
+            serialcomm.write(signal + bytes([DELTA_KEY_FRAME_INTERVAL]))
+        else:
+            serialcomm.write(signal)
+        acknowledged = serialcomm.read(1) == signal
+        serialcomm.timeout = serial_timeout
+
+        # Without an acknowledgement, the Arduino is still using the format it had.
+        # (Firmware that doesn't acknowledge "uint16" only knows "uint16".)
+        if acknowledged or wire_format == "uint16":
+            self._set_wire_format(wire_format)
+        self._requested_wire_format = wire_format
+
+    def _set_wire_format(self, wire_format: WireFormat):
+        self.wire_format = wire_format
+        self.frame_decoder.wire_format = wire_format
+        self.stream_parser.wire_format = wire_format
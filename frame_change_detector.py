@@ -0,0 +1,61 @@
+"""
+Finds which cells of a frame changed since the frame that was last drawn on the heatmap.
+
+When the mat is empty or the load is static, most frames are the same as the one on the screen
+(or only differ by a little noise). Comparing each new frame with the last drawn one lets the
+heatmap skip those frames entirely, and only redraw the bounding box of the cells that did change.
+
+A cell counts as changed when it differs from the last drawn frame by more than 'threshold'
+raw ADC counts. The comparison is always with what is on the screen, not with the previous frame,
+so a slow drift still gets drawn once it adds up to more than the threshold.
+"""
+
+import numpy as np
+
+
+CellBox = tuple[int, int, int, int] # (first row, end row, first col, end col), like slices
+
+
+class FrameChangeDetector:
+
+    def __init__(self) -> None:
+        self.last_drawn: np.ndarray | None = None # copy of the readings on the screen, None when it must all be redrawn
+        self.skipped_frames: int = 0 # frames that didn't change enough to be drawn
+        self.partial_frames: int = 0 # frames where only a bounding box was drawn
+        self.full_frames: int = 0 # frames that were drawn entirely
+        self._difference = np.zeros((0, 0), dtype=np.int32)
+        self._changed = np.zeros((0, 0), dtype=bool)
+
+    def reset(self):
+        # The next frame is drawn entirely (e.g. after the canvas was resized or a setting changed)
+        self.last_drawn = None
+
+    def changed_box(self, frame: np.ndarray, threshold: int = 0) -> CellBox | None:
+        # Bounding box of the cells that changed by more than 'threshold' since the last drawn frame,
+        # the whole frame if it must all be redrawn, or None if nothing changed.
+        rows, cols = frame.shape
+        if self.last_drawn is None or self.last_drawn.shape != frame.shape:
+            return (0, rows, 0, cols)
+
+        if self._difference.shape != frame.shape:
+            self._difference = np.zeros(frame.shape, dtype=np.int32)
+            self._changed = np.zeros(frame.shape, dtype=bool)
+        np.subtract(frame, self.last_drawn, out=self._difference, dtype=np.int32)
+        np.abs(self._difference, out=self._difference)
+        np.greater(self._difference, threshold, out=self._changed)
+
+        changed_rows = np.flatnonzero(self._changed.any(axis=1))
+        if len(changed_rows) == 0:
+            return None
+        changed_cols = np.flatnonzero(self._changed.any(axis=0))
+        return (int(changed_rows[0]), int(changed_rows[-1]) + 1, int(changed_cols[0]), int(changed_cols[-1]) + 1)
+
+    def mark_drawn(self, frame: np.ndarray, box: CellBox | None = None):
+        # Remember what is now on the screen: the cells in 'box', or the whole frame if None
+        if box is None or self.last_drawn is None or self.last_drawn.shape != frame.shape:
+            self.last_drawn = frame.copy()
+            self.full_frames += 1
+            return
+        first_row, end_row, first_col, end_col = box
+        self.last_drawn[first_row:end_row, first_col:end_col] = frame[first_row:end_row, first_col:end_col]
+        self.partial_frames += 1
@@ -0,0 +1,122 @@
+"""
+Hands frames from the acquisition thread to the drawing (Tk main) thread.
+
+The ring buffer holds the newest 'capacity' frames in preallocated arrays (capacity x rows x cols
+RAW_DTYPE, plus a timestamp and sequence number for each frame). Exactly one thread writes frames and
+any thread can read the newest one, without locks:
+    - The writer copies a frame into the next slot, and only then publishes it by incrementing
+      'frames_written' (a single assignment, which is atomic in Python).
+    - A reader copies the newest published slot, then checks that the writer hasn't come all the way
+      around the ring and started overwriting that slot while it was being copied. If it has, the
+      reader tries again with the (new) newest frame. So a reader never gets a torn frame, and
+      neither side ever waits for the other.
+When the frame size changes, the writer makes new arrays and swaps them in with a single assignment.
+
+Run this file directly to check for torn frames under load:
+    python frame_ring_buffer.py
+"""
+
+import threading
+import time
+import numpy as np
+
+from data_types import RAW_DTYPE
+
+
+DEFAULT_CAPACITY = 8 # frames
+
+
+class FrameRingBuffer:
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, rows: int = 16, cols: int = 16) -> None:
+        self.capacity = max(capacity, 2) # with 1 slot, every read would overlap the write in progress
+        self.frames_written: int = 0 # total frames published. Frame i is in slot i % capacity.
+        self.torn_reads: int = 0 # reads that had to be retried because the writer caught up
+        self._storage = _RingStorage(self.capacity, rows, cols)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._storage.frames.shape[1:]
+
+    def write(self, frame: np.ndarray, timestamp: float | None = None) -> int:
+        # Copy 'frame' into the ring (writer thread only). Returns its sequence number.
+        storage = self._storage
+        if storage.frames.shape[1:] != frame.shape:
+            # Readers that still hold the old arrays can finish with them
+            storage = _RingStorage(self.capacity, *frame.shape)
+            storage.first_sequence = self.frames_written
+            self._storage = storage
+
+        sequence = self.frames_written
+        slot = sequence % self.capacity
+        np.copyto(storage.frames[slot], frame, casting="unsafe")
+        storage.timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+        storage.sequence_numbers[slot] = sequence
+        self.frames_written = sequence + 1 # publish
+        return sequence
+
+    def read_newest(self, out: np.ndarray | None = None) -> tuple[np.ndarray, int, float] | None:
+        # Copy the newest frame into 'out' (reallocated if it isn't the right shape).
+        # Returns (frame, sequence number, timestamp), or None if no frame has been written yet.
+        while True:
+            storage = self._storage
+            sequence = self.frames_written - 1
+            if sequence < storage.first_sequence:
+                if storage is self._storage:
+                    return None
+                continue # the storage was just replaced, try the new one
+
+            slot = sequence % self.capacity
+            if out is None or out.shape != storage.frames.shape[1:]:
+                out = np.empty(storage.frames.shape[1:], dtype=storage.frames.dtype)
+            np.copyto(out, storage.frames[slot])
+            timestamp = float(storage.timestamps[slot])
+
+            # The slot was being overwritten if the writer has since started frame 'sequence + capacity'
+            if self.frames_written - sequence < self.capacity and storage is self._storage:
+                return out, sequence, timestamp
+            self.torn_reads += 1
+
+
+class _RingStorage:
+    # The arrays of a ring buffer, replaced as a whole when the frame size changes
+
+    def __init__(self, capacity: int, rows: int, cols: int) -> None:
+        self.frames = np.zeros((capacity, rows, cols), dtype=RAW_DTYPE)
+        self.timestamps = np.zeros(capacity, dtype=np.float64) # time.monotonic() when each frame was acquired
+        self.sequence_numbers = np.zeros(capacity, dtype=np.int64)
+        self.first_sequence: int = 0 # sequence number of the first frame written to these arrays
+
+
+if __name__ == "__main__":
+    # A writer filling a small ring as fast as possible, and a reader checking every frame it gets
+    ring = FrameRingBuffer(capacity=2, rows=16, cols=16)
+    stop = threading.Event()
+
+    def writer():
+        frame = np.zeros((16, 16), dtype=RAW_DTYPE)
+        while not stop.is_set():
+            frame.fill(ring.frames_written & 0x3FF) # every value of a frame is the same
+            ring.write(frame)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = 0
+    bad_frames = 0
+    out = np.zeros((16, 16), dtype=RAW_DTYPE)
+    started = time.perf_counter()
+    while time.perf_counter() - started < 2:
+        result = ring.read_newest(out)
+        if result is None:
+            continue
+        frame, sequence, _ = result
+        reads += 1
+        if frame.min() != frame.max() or frame[0, 0] != sequence & 0x3FF:
+            bad_frames += 1
+    stop.set()
+    thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"{ring.frames_written / elapsed:10.0f} frames/s written")
+    print(f"{reads / elapsed:10.0f} frames/s read")
+    print(f"{ring.torn_reads:10d} reads retried (writer caught up)")
+    print(f"{bad_frames:10d} torn frames returned")
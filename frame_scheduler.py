@@ -0,0 +1,172 @@
+"""
+Paces the data thread to the requested frame rate, and measures how well the rate is met.
+
+Frame k is due at an absolute deadline, start + k / frames_per_second, on the monotonic clock.
+The scheduler sleeps until the deadline instead of sleeping "one frame time" after each frame,
+so time spent doing the frame (and sleeping too long) doesn't build up as drift.
+If the loop falls more than a whole frame behind, the deadlines it missed are counted and skipped,
+instead of running frames back to back to catch up.
+
+Pausing and resuming use an Event, so a paused loop uses no CPU and resumes instantly.
+A pause or 'interrupt()' (e.g. after the frame rate was changed) also cuts the current sleep short.
+
+'stats()' reports, over the last 'stats_window' frames:
+    - the achieved frames per second
+    - percentiles of the frame time (time between the starts of consecutive frames)
+    - percentiles of the jitter (how late each frame started after its deadline)
+    - the number of missed deadlines (since the frame rate was last set)
+
+Run this file directly to see the effect of a busy CPU on the timing:
+    python frame_scheduler.py
+"""
+
+from dataclasses import dataclass
+import threading
+import time
+import numpy as np
+
+
+DEFAULT_STATS_WINDOW = 300 # frames
+
+
+@dataclass
+class FrameTimingStats:
+    target_fps: float | None # None for "as fast as possible"
+    achieved_fps: float
+    frame_time_ms: tuple[float, float, float] # 50th, 95th, 99th percentile
+    jitter_ms: tuple[float, float, float] # 50th, 95th, 99th percentile of lateness (zeros without a target)
+    missed_deadlines: int
+    frames: int # frames the stats are calculated from
+
+
+class FrameScheduler:
+
+    def __init__(self, stats_window: int = DEFAULT_STATS_WINDOW) -> None:
+        self._running = threading.Event() # cleared while paused
+        self._running.set()
+        self._interrupt = threading.Event() # cuts a sleep short (pause or new frame rate)
+
+        self._frames_per_second: float | None = None
+        self._next_deadline: float | None = None # None: the next frame starts right away and sets the pace
+        self._last_start: float | None = None
+        self.missed_deadlines: int = 0
+
+        # Timing of the last 'stats_window' frames, in a ring
+        self._frame_times = np.zeros(stats_window, dtype=np.float64) # seconds between frame starts
+        self._lateness = np.zeros(stats_window, dtype=np.float64) # seconds after the deadline
+        self._num_samples: int = 0
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self):
+        self._running.clear()
+        self._interrupt.set()
+
+    def resume(self):
+        self._running.set()
+
+    def interrupt(self):
+        # Cut the current sleep short (e.g. the frame rate was changed from 1 to 20 fps)
+        self._interrupt.set()
+
+    def wait_for_next_frame(self, frames_per_second: float | None):
+        # Block until the next frame is due (and while paused). Call once at the start of every frame.
+        # 'frames_per_second' None runs frames back to back.
+        if frames_per_second != self._frames_per_second:
+            self._frames_per_second = frames_per_second
+            self._next_deadline = None
+            self.missed_deadlines = 0
+            self._num_samples = 0
+            self._last_start = None
+
+        while True:
+            if not self._running.is_set():
+                self._running.wait()
+                # Don't count the pause as a late frame
+                self._next_deadline = None
+                self._last_start = None
+            self._interrupt.clear()
+
+            now = time.monotonic()
+            if frames_per_second is None or self._next_deadline is None:
+                break
+            remaining = self._next_deadline - now
+            if remaining <= 0:
+                break
+            if self._interrupt.wait(remaining):
+                if not self._running.is_set():
+                    continue # paused
+                # Interrupted because the frame rate changed. Start a frame now, and let it set the new pace.
+                self._next_deadline = None
+            now = time.monotonic()
+            break
+
+        lateness = 0.0
+        if frames_per_second is not None:
+            period = 1 / frames_per_second
+            if self._next_deadline is None:
+                self._next_deadline = now
+            lateness = now - self._next_deadline
+            if lateness >= period:
+                # More than a whole frame late. Skip the deadlines that were missed.
+                missed = int(lateness // period)
+                self.missed_deadlines += missed
+                self._next_deadline += missed * period
+            self._next_deadline += period
+
+        if self._last_start is not None:
+            index = self._num_samples % len(self._frame_times)
+            self._frame_times[index] = now - self._last_start
+            self._lateness[index] = lateness
+            self._num_samples += 1
+        self._last_start = now
+
+    def stats(self) -> FrameTimingStats:
+        count = min(self._num_samples, len(self._frame_times))
+        if count == 0:
+            return FrameTimingStats(self._frames_per_second, 0.0, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0), self.missed_deadlines, 0)
+        frame_times = self._frame_times[:count]
+        lateness = self._lateness[:count]
+        frame_time_ms = np.percentile(frame_times, (50, 95, 99)) * 1000
+        jitter_ms = np.percentile(lateness, (50, 95, 99)) * 1000
+        return FrameTimingStats(
+            self._frames_per_second,
+            count / frame_times.sum(),
+            tuple(float(value) for value in frame_time_ms),
+            tuple(float(value) for value in jitter_ms),
+            self.missed_deadlines,
+            count,
+        )
+
+
+if __name__ == "__main__":
+    # A 60 fps loop doing 5 ms of work per frame, with and without a busy thread competing for the CPU
+    def busy(stop: threading.Event):
+        while not stop.is_set():
+            sum(range(10000))
+
+    def run(description: str):
+        scheduler = FrameScheduler()
+        started = time.monotonic()
+        while time.monotonic() - started < 2:
+            scheduler.wait_for_next_frame(60)
+            work_until = time.perf_counter() + 0.005
+            while time.perf_counter() < work_until:
+                pass
+        stats = scheduler.stats()
+        print(f"{description:22s} {stats.achieved_fps:6.1f} fps (target {stats.target_fps})   "
+              f"frame time p50/p95/p99 {'/'.join(f'{t:.1f}' for t in stats.frame_time_ms)} ms   "
+              f"jitter p50/p95/p99 {'/'.join(f'{t:.2f}' for t in stats.jitter_ms)} ms   "
+              f"{stats.missed_deadlines} missed")
+
+    run("idle")
+    stop = threading.Event()
+    threads = [threading.Thread(target=busy, args=(stop,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    run("2 busy threads")
+    stop.set()
+    for thread in threads:
+        thread.join()
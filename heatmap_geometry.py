@@ -0,0 +1,229 @@
+"""
+Maps the cells of a frame to the pixels of the heatmap canvas (rotation, mirroring and cell scaling).
+
+For a given (frame shape, canvas size, rotation, mirror), every pixel row of the heatmap image
+comes from one row of cells, and every pixel column from one column of cells (after rotating and
+mirroring). So the whole mapping is one row index map and one column index map, which are built
+once and reused for every frame until something changes. Drawing a frame is then two gathers
+into preallocated buffers: the columns first (a small image, one cell tall per row of cells),
+then the rows, which copies whole pixel rows at a time. When only some cells changed,
+'render_region' redraws just the pixels of their bounding box.
+
+The layout is the same as the original 'draw_heatmap': square-ish cells (ASPECT_RATIO) as large
+as fit, with the leftover pixels spread out by making a few cells 1 pixel larger.
+
+Run this file directly to compare it with the original np.repeat/np.insert code:
+    python heatmap_geometry.py
+"""
+
+import numpy as np
+
+
+class HeatmapGeometry:
+
+    def __init__(self, aspect_ratio: float = 1.0) -> None:
+        self.aspect_ratio = aspect_ratio # width/height of the heatmap cells
+        self.rebuilds: int = 0 # number of times the index maps have been built
+        self._key: tuple | None = None # (frame shape, canvas size, rotation, mirror) of the index maps
+
+        self.row_map = np.zeros(0, dtype=np.intp) # for each pixel row of the image, the row of (rotated) cells
+        self.col_map = np.zeros(0, dtype=np.intp) # for each pixel column of the image, the column of (rotated) cells
+        self.transpose: bool = False # the rotation swaps rows and columns
+        self.image_size: tuple[int, int] = (0, 0) # (width, height) in pixels
+        self.offset: tuple[int, int] = (0, 0) # (left, top) pixel of the image on the canvas
+
+        self._transposed_buffer = np.zeros((0, 0, 3), dtype=np.uint8) # the cells, transposed (for 90 and 270 degrees)
+        self._columns_buffer = np.zeros((0, 0, 3), dtype=np.uint8) # cell rows x pixel columns
+        self.image = np.zeros((0, 0, 3), dtype=np.uint8) # pixel rows x pixel columns. Reused every frame.
+
+    @property
+    def frame_shape(self) -> tuple[int, int] | None:
+        # Frame shape the index maps were built for
+        return None if self._key is None else self._key[0]
+
+    def update(self, frame_shape: tuple[int, int], canvas_size: tuple[int, int], rotation: int, mirror: bool) -> bool:
+        # Rebuild the index maps if anything changed. Returns True if they were rebuilt
+        # (the image size may have changed). An empty 'image_size' means there is nothing to draw.
+        key = (tuple(frame_shape), tuple(canvas_size), rotation, mirror)
+        if key == self._key:
+            return False
+        self._key = key
+        self.rebuilds += 1
+        self._build(*key)
+        return True
+
+    @property
+    def source_rows(self) -> int:
+        # Rows of cells after rotating (the rows 'render_columns' can be split into)
+        return len(self._columns_buffer)
+
+    def render(self, cells_rgb: np.ndarray) -> np.ndarray:
+        # Scale/rotate/mirror an image of one RGB pixel per cell (frame shape + (3,)) to the heatmap image
+        self.render_columns(cells_rgb, 0, self.source_rows)
+        self.render_rows(0, len(self.image))
+        return self.image
+
+    def render_columns(self, cells_rgb: np.ndarray, first_row: int, end_row: int):
+        # First half of 'render', for rows first_row to end_row-1 of the rotated cells: scale them to the pixel columns.
+        # Different row ranges can be rendered at the same time (in different threads).
+        # (mode="clip" because with the default "raise", np.take copies through a temporary output array)
+        source = cells_rgb[first_row:end_row]
+        if self.transpose:
+            # np.take would copy a non-contiguous (transposed) source to a new array
+            np.copyto(self._transposed_buffer[first_row:end_row], cells_rgb[:, first_row:end_row].transpose(1, 0, 2))
+            source = self._transposed_buffer[first_row:end_row]
+        np.take(source, self.col_map, axis=1, out=self._columns_buffer[first_row:end_row], mode="clip")
+
+    def render_rows(self, first_pixel: int, end_pixel: int):
+        # Second half of 'render', for pixel rows first_pixel to end_pixel-1 of the image (after 'render_columns'
+        # has rendered every row of cells). Different pixel ranges can be rendered at the same time.
+        np.take(self._columns_buffer, self.row_map[first_pixel:end_pixel], axis=0,
+                out=self.image[first_pixel:end_pixel], mode="clip")
+
+    def render_region(self, cells_rgb: np.ndarray, box: tuple[int, int, int, int]) -> tuple[int, int, int, int]:
+        # Like 'render', but only redraws the pixels of the cells in 'box' (first row, end row, first col, end col
+        # of 'cells_rgb', before rotating). The rest of 'image' is left as it is.
+        # Returns the (left, top, right, bottom) pixels that were redrawn.
+        first_row, end_row, first_col, end_col = box
+        source = cells_rgb
+        if self.transpose:
+            source = cells_rgb.transpose(1, 0, 2)
+            first_row, end_row, first_col, end_col = first_col, end_col, first_row, end_row
+        top, bottom = _pixel_span(self.row_map, first_row, end_row)
+        left, right = _pixel_span(self.col_map, first_col, end_col)
+        if top < bottom and left < right:
+            columns = np.take(source, self.col_map[left:right], axis=1, mode="clip")
+            self.image[top:bottom, left:right] = np.take(columns, self.row_map[top:bottom], axis=0, mode="clip")
+        return (left, top, right, bottom)
+
+    def _build(self, frame_shape: tuple[int, int], canvas_size: tuple[int, int], rotation: int, mirror: bool):
+        frame_rows, frame_cols = frame_shape
+        canvas_width, canvas_height = canvas_size
+
+        # Shape of the rotated frame (np.rot90 by 90 or 270 degrees swaps rows and columns)
+        self.transpose = rotation in (90, 270)
+        rows, cols = (frame_cols, frame_rows) if self.transpose else (frame_rows, frame_cols)
+
+        if rows == 0 or cols == 0 or canvas_width <= 0 or canvas_height <= 0:
+            self._set_empty()
+            return
+
+        # Calculate the size of each heatmap cell based on the size of the canvas
+        canvas_aspect_ratio = canvas_width / canvas_height
+        if canvas_aspect_ratio > self.aspect_ratio:
+            # canvas will be wider than the heatmap
+            cell_height = int(canvas_height / rows)
+            cell_width = int(cell_height / self.aspect_ratio)
+        else:
+            # canvas will be taller than the heatmap
+            cell_width = int(canvas_width / cols)
+            cell_height = int(cell_width * self.aspect_ratio)
+        if cell_width == 0 or cell_height == 0:
+            self._set_empty()
+            return
+
+        # Each cell is repeated to its size, then a few cells get 1 extra pixel to fill the leftover space
+        leftover_height = canvas_height - (cell_height * rows)
+        leftover_width = canvas_width - (cell_width * cols)
+        pixels_to_add = leftover_height if canvas_aspect_ratio > self.aspect_ratio else leftover_width
+        row_map = _spread_cells(rows, cell_height, pixels_to_add)
+        col_map = _spread_cells(cols, cell_width, pixels_to_add)
+
+        # Rotation (like np.rot90, counterclockwise) and mirroring (like np.fliplr) only flip index maps:
+        #    90: rotated[i, j] = frame[j, cols-1-i]      (transposed, then the rows flipped)
+        #   180: rotated[i, j] = frame[rows-1-i, cols-1-j]
+        #   270: rotated[i, j] = frame[rows-1-j, i]      (transposed, then the columns flipped)
+        flip_rows = rotation in (90, 180)
+        flip_cols = rotation in (180, 270)
+        if mirror:
+            flip_cols = not flip_cols
+        if flip_rows:
+            row_map = rows - 1 - row_map
+        if flip_cols:
+            col_map = cols - 1 - col_map
+        # After transposing the source (see 'render'), rows of the image come from its rows
+        self.row_map = row_map
+        self.col_map = col_map
+
+        height, width = len(row_map), len(col_map)
+        self.image_size = (width, height)
+        topmost_pixel = 0 if canvas_aspect_ratio > self.aspect_ratio else int((leftover_height - leftover_width) / 2)
+        leftmost_pixel = 0 if canvas_aspect_ratio < self.aspect_ratio else int((leftover_width - leftover_height) / 2)
+        self.offset = (leftmost_pixel, topmost_pixel)
+        self._transposed_buffer = np.zeros((rows, cols, 3) if self.transpose else (0, 0, 3), dtype=np.uint8)
+        self._columns_buffer = np.zeros((rows, width, 3), dtype=np.uint8)
+        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def _set_empty(self):
+        self.row_map = np.zeros(0, dtype=np.intp)
+        self.col_map = np.zeros(0, dtype=np.intp)
+        self.image_size = (0, 0)
+        self.offset = (0, 0)
+        self._transposed_buffer = np.zeros((0, 0, 3), dtype=np.uint8)
+        self._columns_buffer = np.zeros((0, 0, 3), dtype=np.uint8)
+        self.image = np.zeros((0, 0, 3), dtype=np.uint8)
+
+
+def _spread_cells(num_cells: int, cell_size: int, pixels_to_add: int) -> np.ndarray:
+    # Index map of 'num_cells' cells of 'cell_size' pixels, with 'pixels_to_add' extra pixels inserted
+    # one at a time in the middle of the first few cells (exactly like the np.insert loop it replaces)
+    index_map = np.repeat(np.arange(num_cells, dtype=np.intp), cell_size)
+    for pixel in range(pixels_to_add):
+        i = pixel * cell_size + int(cell_size / 2)
+        index_map = np.insert(index_map, i, index_map[i])
+    return index_map
+
+
+def _pixel_span(index_map: np.ndarray, first_cell: int, end_cell: int) -> tuple[int, int]:
+    # The pixels drawn from cells first_cell to end_cell-1 (contiguous, since the index maps are monotonic)
+    pixels = np.flatnonzero((index_map >= first_cell) & (index_map < end_cell))
+    if len(pixels) == 0:
+        return (0, 0)
+    return int(pixels[0]), int(pixels[-1]) + 1
+
+
+if __name__ == "__main__":
+    import timeit
+
+    def original(cells_rgb: np.ndarray, canvas_size: tuple[int, int], rotation: int, mirror: bool) -> np.ndarray:
+        # The code from 'draw_heatmap' before the index maps
+        heatmap_image = cells_rgb
+        if rotation == 90:
+            heatmap_image = np.rot90(heatmap_image)
+        elif rotation == 180:
+            heatmap_image = np.rot90(heatmap_image, 2)
+        elif rotation == 270:
+            heatmap_image = np.rot90(heatmap_image, 3)
+        if mirror:
+            heatmap_image = np.fliplr(heatmap_image)
+        rows, cols = heatmap_image.shape[:2]
+        canvas_width, canvas_height = canvas_size
+        canvas_aspect_ratio = canvas_width / canvas_height
+        if canvas_aspect_ratio > 1.0:
+            cell_height = int(canvas_height / rows)
+            cell_width = int(cell_height / 1.0)
+        else:
+            cell_width = int(canvas_width / cols)
+            cell_height = int(cell_width * 1.0)
+        heatmap_image = np.repeat(heatmap_image, cell_width, axis=1)
+        heatmap_image = np.repeat(heatmap_image, cell_height, axis=0)
+        heatmap_image = np.ascontiguousarray(heatmap_image)
+        leftover_height = canvas_height - (cell_height * rows)
+        leftover_width = canvas_width - (cell_width * cols)
+        pixels_to_add = leftover_height if canvas_aspect_ratio > 1.0 else leftover_width
+        for pixel in range(pixels_to_add):
+            i = pixel * cell_height + int(cell_height/2)
+            j = pixel * cell_width + int(cell_width/2)
+            heatmap_image = np.insert(heatmap_image, i, heatmap_image[i, :], axis=0)
+            heatmap_image = np.insert(heatmap_image, j, heatmap_image[:, j], axis=1)
+        return heatmap_image
+
+    rng = np.random.default_rng(0)
+    geometry = HeatmapGeometry()
+    cells_rgb = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+    for canvas_size in [(400, 400), (950, 700), (1920, 1010), (3840, 2050)]: # up to a maximized window on a 4K monitor
+        geometry.update((16, 16), canvas_size, 90, True)
+        original_time = min(timeit.repeat(lambda: original(cells_rgb, canvas_size, 90, True), number=3, repeat=3)) / 3
+        render_time = min(timeit.repeat(lambda: geometry.render(cells_rgb), number=20, repeat=3)) / 20
+        print(f"canvas {canvas_size[0]:4d}x{canvas_size[1]:<4d} original {original_time * 1000:8.2f} ms   "
+              f"index maps {render_time * 1000:6.2f} ms   ({original_time / render_time:.0f}x faster)")
@@ -0,0 +1,133 @@
+"""
+Smooths the heatmap by interpolating between the sensor cells ('interp_level' in the app settings).
+
+Bilinear and bicubic interpolation are separable: upsampling a rows x cols frame by 'level' is
+    smooth = row_weights @ frame @ col_weights.T
+where row_weights is a (rows*level) x rows matrix (each row holds the weights of the 2 or 4 nearest
+cells) and col_weights is (cols*level) x cols. The weight matrices only depend on (rows, cols, level,
+method), so they are built once and cached, and each frame is just two small matrix multiplies into
+preallocated float32 buffers (instead of running 'ndimage.zoom' on every frame).
+
+The output samples are spread evenly over each cell (like the pixels of a resized image), and the edge
+cells are repeated outside the frame. Bicubic uses the Catmull-Rom kernel (Keys, a = -0.5), which can
+overshoot a little around sharp peaks, so the result is clipped to the range of the ADC.
+
+Run this file directly to compare it with 'ndimage.zoom':
+    python heatmap_interpolation.py
+"""
+
+from typing import Literal
+import numpy as np
+
+from colormaps import ADC_LEVELS
+
+
+InterpolationMethod = Literal["bilinear", "bicubic"]
+
+INTERP_LEVELS = (1, 2, 4, 8) # samples per cell along each axis. 1 draws the cells as blocks.
+BICUBIC_A = -0.5 # Keys' parameter (Catmull-Rom)
+
+
+class HeatmapInterpolator:
+
+    def __init__(self, levels: int = ADC_LEVELS) -> None:
+        self.levels = levels # the output is clipped to 0 to levels-1
+        self.rebuilds: int = 0 # number of times the weight matrices have been built
+        self._key: tuple | None = None # (rows, cols, level, method) of the weight matrices
+
+        self.row_weights = np.zeros((0, 0), dtype=np.float32) # (rows*level) x rows
+        self.col_weights_t = np.zeros((0, 0), dtype=np.float32) # cols x (cols*level), transposed for the multiply
+        self._frame = np.zeros((0, 0), dtype=np.float32) # the frame as float32
+        self._rows_done = np.zeros((0, 0), dtype=np.float32) # (rows*level) x cols
+        self._smooth = np.zeros((0, 0), dtype=np.float32) # (rows*level) x (cols*level)
+        self._output = np.zeros((0, 0), dtype=np.uint16)
+
+    def interpolate(self, frame: np.ndarray, level: int, method: InterpolationMethod = "bicubic") -> np.ndarray:
+        # Upsample a frame of raw readings by 'level' along each axis. Returns uint16 readings of
+        # shape (rows*level, cols*level), in an array that is reused by the next call.
+        # Level 1 returns the frame itself.
+        if level <= 1:
+            return frame
+
+        rows, cols = frame.shape
+        key = (rows, cols, level, method)
+        if key != self._key:
+            self._build(*key)
+            self._key = key
+            self.rebuilds += 1
+
+        np.copyto(self._frame, frame, casting="unsafe")
+        np.matmul(self.row_weights, self._frame, out=self._rows_done)
+        np.matmul(self._rows_done, self.col_weights_t, out=self._smooth)
+        np.clip(self._smooth, 0, self.levels - 1, out=self._smooth)
+        np.rint(self._smooth, out=self._smooth)
+        np.copyto(self._output, self._smooth, casting="unsafe")
+        return self._output
+
+    def _build(self, rows: int, cols: int, level: int, method: InterpolationMethod):
+        self.row_weights = interpolation_weights(rows, level, method)
+        self.col_weights_t = np.ascontiguousarray(interpolation_weights(cols, level, method).T)
+        self._frame = np.zeros((rows, cols), dtype=np.float32)
+        self._rows_done = np.zeros((rows * level, cols), dtype=np.float32)
+        self._smooth = np.zeros((rows * level, cols * level), dtype=np.float32)
+        self._output = np.zeros((rows * level, cols * level), dtype=np.uint16)
+
+
+def interpolation_radius(level: int, method: InterpolationMethod) -> int:
+    # How many cells away a change in one cell can still affect the interpolated samples
+    if level <= 1:
+        return 0
+    return 1 if method == "bilinear" else 2
+
+
+def interpolation_weights(num_cells: int, level: int, method: InterpolationMethod) -> np.ndarray:
+    # (num_cells*level) x num_cells matrix. Output sample i is 'weights[i] @ cells'.
+    # Sample i is at (i + 0.5)/level - 0.5 in cell coordinates (cell k is centered on k).
+    positions = (np.arange(num_cells * level) + 0.5) / level - 0.5
+    first_cell = np.floor(positions).astype(np.intp)
+    t = positions - first_cell # 0 to 1, from 'first_cell' to the next one
+
+    if method == "bilinear":
+        offsets = (0, 1)
+        tap_weights = (1 - t, t)
+    elif method == "bicubic":
+        offsets = (-1, 0, 1, 2)
+        tap_weights = tuple(_keys_kernel(t - offset) for offset in offsets)
+    else:
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    weights = np.zeros((num_cells * level, num_cells), dtype=np.float64)
+    samples = np.arange(num_cells * level)
+    for offset, tap_weight in zip(offsets, tap_weights):
+        # Cells outside the frame are the edge cells repeated
+        cells = np.clip(first_cell + offset, 0, num_cells - 1)
+        np.add.at(weights, (samples, cells), tap_weight)
+    return weights.astype(np.float32)
+
+
+def _keys_kernel(x: np.ndarray) -> np.ndarray:
+    # Keys' cubic convolution kernel
+    x = np.abs(x)
+    a = BICUBIC_A
+    return np.where(
+        x <= 1,
+        (a + 2) * x**3 - (a + 3) * x**2 + 1,
+        np.where(x < 2, a * x**3 - 5*a * x**2 + 8*a * x - 4*a, 0.0),
+    )
+
+
+if __name__ == "__main__":
+    import timeit
+    from scipy import ndimage
+
+    interpolator = HeatmapInterpolator()
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, ADC_LEVELS, size=(16, 16), dtype=np.uint16)
+
+    for level in (2, 4, 8):
+        zoom_time = min(timeit.repeat(lambda: ndimage.zoom(frame, zoom=level, order=3, mode='nearest'), number=50, repeat=3)) / 50
+        for method in ("bilinear", "bicubic"):
+            interpolator.interpolate(frame, level, method)
+            time = min(timeit.repeat(lambda: interpolator.interpolate(frame, level, method), number=500, repeat=3)) / 500
+            print(f"16x16 level {level}  ndimage.zoom (cubic spline) {zoom_time * 1e6:7.1f} us   "
+                  f"{method:8s} weight matrices {time * 1e6:6.1f} us   ({zoom_time / time:.0f}x faster)")
@@ -0,0 +1,249 @@
+"""
+Turns frames of raw readings into heatmap images for one canvas, without allocating arrays per frame.
+
+The render context owns every stage of the pipeline and the buffer each stage writes into:
+    1. interpolate  (HeatmapInterpolator)  frame (uint16)            -> samples (uint16, then intp color table indices)
+    2. color        (ColormapLUT)          samples                   -> samples_rgb (uint8, one pixel per sample)
+    3. place        (HeatmapGeometry)      samples_rgb               -> image (uint8, canvas pixels)
+    4. label        (ValueOverlay)         frame                     -> image (the reading of each cell, optional)
+Each stage writes with 'out=' into its buffer. The buffers are only reallocated when their shape changes
+(the canvas is resized, the frame size or the interpolation level changes), so drawing a frame doesn't
+allocate anything that grows with the size of the frame or the canvas. The labels are the exception: they
+use small temporary arrays, the size of the pixels covered by the digits that are drawn.
+
+With 'render_threads' above 1, 'render' splits the coloring and the scaling to the canvas into horizontal
+tiles (bands of rows) and runs them on a small thread pool, each tile writing into its own rows of the same
+buffers. np.take releases the GIL while it copies, so the tiles run on different cores at the same time.
+This only pays off for large canvases: for small ones, handing the tiles to the threads costs more than it
+saves, so images with fewer than MIN_TILE_ROWS rows per thread use fewer tiles (one tile runs in the calling
+thread). 'render_region' and the labels always run in the calling thread.
+
+'measure_allocations()' reports how many bytes were allocated while drawing each frame (with tracemalloc,
+which tracks numpy arrays too), so a stage that starts allocating again shows up. Tracing slows every
+allocation down a little, so it is off unless 'trace_allocations' is set.
+
+Run this file directly to see the bytes allocated per frame, and the time to render with 1 to 4 threads:
+    python heatmap_renderer.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import tracemalloc
+import numpy as np
+
+from colormaps import ColormapLUT, ColormapName
+from heatmap_geometry import HeatmapGeometry
+from heatmap_interpolation import HeatmapInterpolator, InterpolationMethod, interpolation_radius
+from value_overlay import ValueOverlay
+
+
+MIN_TILE_ROWS = 128 # fewest rows of pixels (or samples) worth handing to another thread
+
+
+class HeatmapRenderContext:
+
+    def __init__(self, aspect_ratio: float = 1.0, colormap: ColormapName = "inferno", trace_allocations: bool = False,
+                 render_threads: int = 1) -> None:
+        self.colormap: ColormapName = colormap
+        self.geometry = HeatmapGeometry(aspect_ratio) # index maps and the image buffer
+        self.interpolator = HeatmapInterpolator() # weight matrices and the samples buffer
+        self.colormap_lut = ColormapLUT() # color table
+        self.value_overlay = ValueOverlay() # digit glyphs and where each cell's label goes
+        self._indices = np.zeros((0, 0), dtype=np.intp) # the samples as color table indices
+        self._samples_rgb = np.zeros((0, 0, 3), dtype=np.uint8) # one pixel per sample
+
+        # Tiled rendering (None: everything is rendered in the calling thread)
+        self.render_threads = max(1, render_threads)
+        self._pool = ThreadPoolExecutor(self.render_threads, "render") if self.render_threads > 1 else None
+
+        # Allocation tracing
+        self.trace_allocations = trace_allocations
+        self.bytes_allocated: int = 0 # most bytes allocated at once while drawing the last frame
+        self.max_bytes_allocated: int = 0 # the same, for the worst frame since tracing started
+        self._started_tracing: bool = False
+
+    @property
+    def image(self) -> np.ndarray:
+        # The heatmap image (canvas pixels), reused by every render
+        return self.geometry.image
+
+    def update_geometry(self, frame_shape: tuple[int, int], canvas_size: tuple[int, int], rotation: int,
+                        mirror: bool, interp_level: int) -> bool:
+        # Rebuild the index maps if anything changed. Returns True if they were rebuilt.
+        level = max(1, interp_level)
+        return self.geometry.update((frame_shape[0] * level, frame_shape[1] * level), canvas_size, rotation, mirror)
+
+    def render(self, frame: np.ndarray, low: float, high: float, interp_level: int,
+               interp_method: InterpolationMethod, show_values: bool = False) -> np.ndarray:
+        # Draw the whole frame, with the reading of each cell on it if 'show_values'. Returns 'image'.
+        if self._pool is None:
+            self.geometry.render(self._color(frame, low, high, interp_level, interp_method))
+        else:
+            self._render_tiled(frame, low, high, interp_level, interp_method)
+        if show_values:
+            self.value_overlay.update_layout(self.geometry, frame.shape, interp_level)
+            self.value_overlay.invalidate()
+            self.value_overlay.draw(self.geometry.image, frame)
+        return self.geometry.image
+
+    def render_region(self, frame: np.ndarray, low: float, high: float, interp_level: int,
+                      interp_method: InterpolationMethod, box: tuple[int, int, int, int],
+                      show_values: bool = False) -> tuple[int, int, int, int]:
+        # Only redraw the cells in 'box' (first row, end row, first col, end col of the frame), and the
+        # samples interpolated from them. The colors and 'show_values' must be the same as the last render.
+        # Returns the (left, top, right, bottom) pixels of 'image' that were redrawn.
+        samples_rgb = self._color(frame, low, high, interp_level, interp_method)
+        rows, cols = frame.shape
+        level = max(1, interp_level)
+        radius = interpolation_radius(level, interp_method)
+        first_row, end_row, first_col, end_col = box
+        sample_box = (
+            max(0, first_row - radius) * level, min(rows, end_row + radius) * level,
+            max(0, first_col - radius) * level, min(cols, end_col + radius) * level,
+        )
+        pixel_box = self.geometry.render_region(samples_rgb, sample_box)
+        if show_values:
+            # The redrawn pixels are whole cells (the sample box is whole cells), so their labels are inside them
+            self.value_overlay.invalidate(pixel_box)
+            self.value_overlay.draw(self.geometry.image, frame)
+        return pixel_box
+
+    def _color(self, frame: np.ndarray, low: float, high: float, interp_level: int,
+               interp_method: InterpolationMethod) -> np.ndarray:
+        samples = self._interpolate(frame, interp_level, interp_method)
+        self._color_rows(samples, low, high, 0, len(samples))
+        return self._samples_rgb
+
+    def _interpolate(self, frame: np.ndarray, interp_level: int, interp_method: InterpolationMethod) -> np.ndarray:
+        samples = self.interpolator.interpolate(frame, interp_level, interp_method)
+        if self._samples_rgb.shape[:2] != samples.shape:
+            self._indices = np.zeros(samples.shape, dtype=np.intp)
+            self._samples_rgb = np.zeros(samples.shape + (3,), dtype=np.uint8)
+        return samples
+
+    def _color_rows(self, samples: np.ndarray, low: float, high: float, first_row: int, end_row: int):
+        # Color rows first_row to end_row-1 of the samples into '_samples_rgb'
+        # np.take would convert uint16 indices to a new intp array on every call
+        np.copyto(self._indices[first_row:end_row], samples[first_row:end_row], casting="unsafe")
+        self.colormap_lut.apply(self._indices[first_row:end_row], self.colormap, low, high,
+                                out=self._samples_rgb[first_row:end_row])
+
+    def _render_tiled(self, frame: np.ndarray, low: float, high: float, interp_level: int,
+                      interp_method: InterpolationMethod):
+        # Like 'self.geometry.render(self._color(...))', with each stage split into horizontal tiles that
+        # run on the thread pool. Each stage needs all of the previous one, so they run one after the other.
+        samples = self._interpolate(frame, interp_level, interp_method)
+        self.colormap_lut.get_table(self.colormap, low, high) # (re)built here, so the tiles only read it
+        self._run_tiles(lambda first, end: self._color_rows(samples, low, high, first, end), len(samples))
+        self._run_tiles(lambda first, end: self.geometry.render_columns(self._samples_rgb, first, end),
+                        self.geometry.source_rows)
+        self._run_tiles(self.geometry.render_rows, len(self.geometry.image))
+
+    def _run_tiles(self, render_tile, rows: int):
+        # Split 'rows' into (first, end) tiles of at least MIN_TILE_ROWS rows, one per thread at most,
+        # and wait for 'render_tile' to finish them all
+        tiles = max(1, min(self.render_threads, rows // MIN_TILE_ROWS))
+        if tiles == 1:
+            render_tile(0, rows)
+            return
+        bounds = [rows * tile // tiles for tile in range(tiles + 1)]
+        futures = [self._pool.submit(render_tile, first, end) for first, end in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result() # re-raises an exception from the tile
+
+    @contextmanager
+    def measure_allocations(self):
+        # Wrap the drawing of a frame: sets 'bytes_allocated' to the most bytes that were allocated at once
+        # inside the block (by Python objects and numpy arrays). Does nothing unless 'trace_allocations' is set.
+        if not self.trace_allocations:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.bytes_allocated = peak - before
+            self.max_bytes_allocated = max(self.max_bytes_allocated, self.bytes_allocated)
+
+    def stop_tracing(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def close(self):
+        # Stop the render threads (if any) and allocation tracing
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        self.stop_tracing()
+
+
+if __name__ == "__main__":
+    # Bytes allocated per frame by the old 'draw_heatmap' stages and by the render context,
+    # for a 16x16 frame on a maximized 4K window
+    from colormaps import apply_colormap
+
+    canvas_size = (3840, 2050)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 1024, size=(16, 16), dtype=np.uint16) for _ in range(10)]
+
+    def old_pipeline(frame: np.ndarray) -> np.ndarray:
+        heatmap_image = frame.copy()
+        heatmap_image = np.rot90(heatmap_image)
+        max_val = np.max(heatmap_image)
+        p25 = np.percentile(heatmap_image, 25)
+        normalized = np.clip((heatmap_image - p25) / (max_val - p25), 0, 1)
+        heatmap_image = apply_colormap(normalized, "inferno")
+        heatmap_image *= 255
+        heatmap_image = heatmap_image.astype(np.uint8)
+        cell = int(canvas_size[1] / 16)
+        heatmap_image = np.repeat(heatmap_image, cell, axis=1)
+        heatmap_image = np.repeat(heatmap_image, cell, axis=0)
+        heatmap_image = np.ascontiguousarray(heatmap_image)
+        for pixel in range(canvas_size[1] - cell * 16):
+            i = pixel * cell + int(cell / 2)
+            heatmap_image = np.insert(heatmap_image, i, heatmap_image[i, :], axis=0)
+            heatmap_image = np.insert(heatmap_image, i, heatmap_image[:, i], axis=1)
+        return heatmap_image
+
+    context = HeatmapRenderContext(trace_allocations=True)
+    for interp_level in (1, 4):
+        context.update_geometry((16, 16), canvas_size, 90, False, interp_level)
+        context.render(frames[0], 100, 1000, interp_level, "bicubic") # the buffers are allocated by the first frame
+        context.max_bytes_allocated = 0
+        for frame in frames:
+            with context.measure_allocations():
+                context.render(frame, 100, 1000, interp_level, "bicubic")
+        print(f"render context, interp level {interp_level}:   {context.max_bytes_allocated:10,d} bytes/frame")
+
+    old_bytes = 0
+    for frame in frames:
+        with context.measure_allocations():
+            old_pipeline(frame)
+        old_bytes = max(old_bytes, context.bytes_allocated)
+    print(f"old draw_heatmap stages:               {old_bytes:10,d} bytes/frame")
+    context.stop_tracing()
+
+    # Time per frame with the image split into tiles on 1 to 4 threads
+    import os
+    import timeit
+
+    print(f"\nTiled rendering ({os.cpu_count()} CPU cores), interp level 4:")
+    for canvas_size in [(400, 400), (950, 700), (1920, 1010), (3840, 2050), (7680, 4320)]:
+        times = []
+        for render_threads in (1, 2, 3, 4):
+            context = HeatmapRenderContext(render_threads=render_threads)
+            context.update_geometry((16, 16), canvas_size, 90, False, 4)
+            context.render(frames[0], 100, 1000, 4, "bicubic")
+            number = 10
+            times.append(min(timeit.repeat(lambda: context.render(frames[0], 100, 1000, 4, "bicubic"),
+                                           number=number, repeat=5)) / number)
+            context.close()
+        print(f"canvas {canvas_size[0]:4d}x{canvas_size[1]:<4d} " + "   ".join(
+            f"{threads} thread{'s' if threads > 1 else ' '} {time * 1000:6.2f} ms ({times[0] / time:.1f}x)"
+            for threads, time in zip((1, 2, 3, 4), times)))
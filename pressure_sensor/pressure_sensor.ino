@@ -29,6 +29,21 @@
 #define ROW 16 //Number of rows in the sensor matrix
 
 #define GET_DATA 0b1 //Byte defining the get data command received from the computer
+#define START_STREAM 0b10 //Byte defining the command to start streaming frames continuously
+#define STOP_STREAM 0b11 //Byte defining the command to stop streaming frames
+#define SET_PACKED_FORMAT 0b100 //Byte defining the command to send values packed 4 per 5 bytes (echoed back as acknowledgement)
+#define SET_UINT16_FORMAT 0b101 //Byte defining the command to send values as 2 bytes each (echoed back as acknowledgement)
+#define SET_DELTA_FORMAT 0b110 //Byte defining the command to stream changes since the previous frame. Followed by the key frame interval byte. (echoed back as acknowledgement)
+#define REQUEST_KEY_FRAME 0b111 //Byte defining the command to make the next delta frame a key frame (the computer lost a frame)
+#define NEGOTIATE_BAUD 0b1000 //Byte defining the command to switch baud rate. Followed by the rate (4 bytes, little-endian). (echoed back at the old rate)
+#define LOOPBACK_TEST 0b1001 //Byte defining the command to echo back a test burst. Followed by its length (2 bytes, little-endian) and the bytes.
+#define CONFIRM_BAUD 0b1010 //Byte defining the command to keep the negotiated baud rate (echoed back as acknowledgement)
+#define GET_ROI 0b1011 //Byte defining the command to get a window of the matrix. Followed by its first row, first col, rows and cols (1 byte each, top bit set).
+
+#define SERIAL_BAUD_RATE 115200 //Baud rate after a reset, before any negotiation
+#define BAUD_CONFIRM_TIMEOUT_MS 500 //Go back to the old baud rate if the new one isn't confirmed within this time
+
+#define SYNC_WORD 0x5AA5 //Marks the start of a streamed frame (sent as 0xA5 0x5A). Can't appear in 10-bit values.
 
 
 /*
@@ -43,6 +58,22 @@ bool s3_states[16] = {LOW, LOW, LOW, LOW, LOW, LOW, LOW, LOW, HIGH, HIGH, HIGH,
 
 bool D1On = false; //Demux 1 enable state
 
+bool streaming = false; //Whether frames are being streamed continuously
+uint16_t frameSequence = 0; //Sequence number of the next streamed frame
+uint16_t checksum = 0; //Running sum of the values sent with sendTwoByteInt and sendValue (wraps around)
+
+bool packedFormat = false; //Whether values are sent packed (4 values in 5 bytes) instead of 2 bytes each
+byte packedGroup[5]; //Packed group being filled: low 8 bits of 4 values, then their high 2 bits
+int packedCount = 0; //Number of values in packedGroup
+
+bool deltaFormat = false; //Whether streamed frames are sent as changes since the previous frame
+byte keyFrameInterval = 30; //Every this many frames, a full "key" frame is sent in delta format
+byte framesSinceKeyFrame = 0; //Counts up to keyFrameInterval; a key frame is sent when it is 0
+uint16_t previousFrame[ROW][COL]; //The previous frame, that deltas are relative to
+byte deltaPayload[2 * ROW * COL]; //Encoded delta frame (at most 2 bytes per cell)
+
+unsigned long baudRate = SERIAL_BAUD_RATE; //Current baud rate of the serial port
+
 
 /*
  * Function declarations
@@ -51,14 +82,22 @@ void muxSetup();
 void demuxSetup();
 
 void sendTwoByteInt(uint16_t value);
+void sendValue(uint16_t value);
+void flushPackedValues();
+void collectAndSendDeltaFrame();
 void sendData();
+void sendStreamFrame();
+void negotiateBaudRate();
+bool echoLoopbackTest(unsigned long deadline);
+int readByteBefore(unsigned long deadline);
 
 void muxSelect(int i);
 void demuxSelect(int i);
 void calculateBias();
 int removeBias(int row, int col);
 
-void collectAndSendData(bool debug = false);
+void collectAndSendData(bool debug = false, int firstRow = 0, int firstCol = 0, int numRows = ROW, int numCols = COL);
+void collectAndSendWindow();
 
 
 /*
@@ -66,7 +105,7 @@ void collectAndSendData(bool debug = false);
 */
 
 void setup() {
-    Serial.begin(115200);
+    Serial.begin(SERIAL_BAUD_RATE);
     
     demuxSetup();
     muxSetup();
@@ -79,13 +118,53 @@ void setup() {
 void loop() {
 
     #ifndef DEBUG
-      //Wait until data is requested by the computer
-      while(Serial.read() != GET_DATA);
-      
-      // Send the size of the data array
-      sendTwoByteInt(ROW);
-      sendTwoByteInt(COL);
-      collectAndSendData();
+      //Handle a command from the computer, if there is one
+      if (Serial.available() > 0) {
+        byte command = Serial.read();
+        if (command == GET_DATA) {
+          // Send the size of the data array, then the data
+          sendTwoByteInt(ROW);
+          sendTwoByteInt(COL);
+          collectAndSendData();
+        }
+        else if (command == START_STREAM) {
+          streaming = true;
+          framesSinceKeyFrame = 0; // Start with a key frame
+        }
+        else if (command == STOP_STREAM) {
+          streaming = false;
+        }
+        else if (command == SET_PACKED_FORMAT || command == SET_UINT16_FORMAT) {
+          packedFormat = (command == SET_PACKED_FORMAT);
+          deltaFormat = false;
+          Serial.write(command); // Acknowledge, so the computer knows this firmware supports it
+        }
+        else if (command == REQUEST_KEY_FRAME) {
+          framesSinceKeyFrame = 0;
+        }
+        else if (command == SET_DELTA_FORMAT) {
+          while (Serial.available() == 0); // Wait for the key frame interval
+          keyFrameInterval = max(Serial.read(), 1);
+          framesSinceKeyFrame = 0;
+          packedFormat = false;
+          deltaFormat = true;
+          Serial.write(command); // Acknowledge, so the computer knows this firmware supports it
+        }
+        else if (command == NEGOTIATE_BAUD) {
+          negotiateBaudRate();
+        }
+        else if (command == GET_ROI) {
+          collectAndSendWindow();
+        }
+        else if (command == LOOPBACK_TEST) {
+          echoLoopbackTest(millis() + BAUD_CONFIRM_TIMEOUT_MS);
+        }
+      }
+
+      //While streaming, send frames back to back without waiting for requests
+      if (streaming) {
+        sendStreamFrame();
+      }
     #endif
 
 
@@ -156,15 +235,57 @@ void demuxSelect(int i) {
 
 void sendTwoByteInt(uint16_t value) {
   Serial.write((byte*)&value, sizeof(uint16_t));
+  checksum += value;
 }
 
-void collectAndSendData(bool debug = false) {
-  for(int row = 0; row < ROW; row++) {
+void sendValue(uint16_t value) {
+  // Send one 10-bit reading in the current format
+  if (!packedFormat) {
+    sendTwoByteInt(value);
+    return;
+  }
+  checksum += value;
+  packedGroup[packedCount] = value & 0xFF; // low 8 bits
+  if (packedCount == 0) packedGroup[4] = 0;
+  packedGroup[4] |= ((value >> 8) & 0b11) << (2 * packedCount); // high 2 bits
+  packedCount++;
+  if (packedCount == 4) {
+    Serial.write(packedGroup, 5);
+    packedCount = 0;
+  }
+}
+
+void flushPackedValues() {
+  // Pad the last packed group of a frame with zeros and send it
+  while (packedCount != 0) {
+    sendValue(0);
+  }
+}
+
+void sendStreamFrame() {
+  // Sync word, sequence number, size, data, then the checksum of everything after the sync word
+  sendTwoByteInt(SYNC_WORD);
+  checksum = 0;
+  sendTwoByteInt(frameSequence);
+  sendTwoByteInt(ROW);
+  sendTwoByteInt(COL);
+  if (deltaFormat) {
+    collectAndSendDeltaFrame();
+  } else {
+    collectAndSendData();
+  }
+  uint16_t frameChecksum = checksum;
+  sendTwoByteInt(frameChecksum);
+  frameSequence++;
+}
+
+void collectAndSendData(bool debug = false, int firstRow = 0, int firstCol = 0, int numRows = ROW, int numCols = COL) {
+  for(int row = firstRow; row < firstRow + numRows; row++) {
     
     demuxSelect(row); // Select the row on the demultiplexer
     delayMicroseconds(100);
     
-    for(int col = 0; col < COL; col++) {
+    for(int col = firstCol; col < firstCol + numCols; col++) {
 
       muxSelect(col); // Select the column on the multiplexer
       delayMicroseconds(100);
@@ -175,10 +296,144 @@ void collectAndSendData(bool debug = false) {
         Serial.print(value);
         Serial.print("  ");
       } else {
-        sendTwoByteInt(static_cast<uint16_t>(value)); // Send the value to the computer
+        sendValue(static_cast<uint16_t>(value)); // Send the value to the computer
       }
     }
     if (debug) Serial.println();
   }
   if (debug) Serial.println();
-}
\ No newline at end of file
+  else if (packedFormat) flushPackedValues();
+}
+
+void collectAndSendWindow() {
+  // Scan and send only a window of the matrix, with its position, so small windows can be sent much faster
+  byte window[4]; // first row, first col, rows, cols
+  for (int i = 0; i < 4; i++) {
+    while (Serial.available() == 0); // Wait for the rest of the command
+    window[i] = Serial.read() & 0x7F; // The top bit is set so older firmware doesn't mistake these for commands
+  }
+  int firstRow = min(window[0], ROW - 1);
+  int firstCol = min(window[1], COL - 1);
+  int numRows = constrain(window[2], 1, ROW - firstRow);
+  int numCols = constrain(window[3], 1, COL - firstCol);
+
+  sendTwoByteInt(ROW);
+  sendTwoByteInt(COL);
+  sendTwoByteInt(firstRow);
+  sendTwoByteInt(firstCol);
+  sendTwoByteInt(numRows);
+  sendTwoByteInt(numCols);
+  collectAndSendData(false, firstRow, firstCol, numRows, numCols);
+}
+
+void collectAndSendDeltaFrame() {
+  // Scan the matrix and encode each cell relative to the previous frame:
+  //   0nnnnnnn          the next n (1-127) cells are unchanged
+  //   10dddddd          the next cell changed by d (-32 to 31)
+  //   110hhhhh 111lllll the next cell's 10-bit value, for larger changes (and every cell of a key frame)
+  // The payload length is sent first, so the whole frame is encoded before it is sent.
+  bool keyFrame = (framesSinceKeyFrame == 0);
+  framesSinceKeyFrame = (framesSinceKeyFrame + 1) % keyFrameInterval;
+
+  uint16_t frameSum = 0; // Sum of the values (part of the checksum)
+  int length = 0;
+  byte run = 0;
+  for(int row = 0; row < ROW; row++) {
+    
+    demuxSelect(row); // Select the row on the demultiplexer
+    delayMicroseconds(100);
+    
+    for(int col = 0; col < COL; col++) {
+
+      muxSelect(col); // Select the column on the multiplexer
+      delayMicroseconds(100);
+
+      uint16_t value = analogRead(VOLTAGE_READ); // Read the voltage at the selected row and column
+      int delta = (int)value - (int)previousFrame[row][col];
+      previousFrame[row][col] = value;
+      frameSum += value;
+
+      if (!keyFrame && delta == 0) {
+        run++;
+        if (run == 127) {
+          deltaPayload[length++] = run;
+          run = 0;
+        }
+        continue;
+      }
+      if (run > 0) {
+        deltaPayload[length++] = run;
+        run = 0;
+      }
+      if (!keyFrame && delta >= -32 && delta <= 31) {
+        deltaPayload[length++] = 0x80 | (delta & 0x3F);
+      } else {
+        deltaPayload[length++] = 0xC0 | (value >> 5);
+        deltaPayload[length++] = 0xE0 | (value & 0x1F);
+      }
+    }
+  }
+  if (run > 0) {
+    deltaPayload[length++] = run;
+  }
+
+  sendTwoByteInt(length);
+  Serial.write(deltaPayload, length);
+  checksum += frameSum;
+}
+
+void negotiateBaudRate() {
+  // Switch to the proposed baud rate, echo the computer's test bursts, and keep the new rate only
+  // if the computer confirms it in time. Otherwise go back to the old rate.
+  unsigned long deadline = millis() + BAUD_CONFIRM_TIMEOUT_MS;
+  unsigned long newBaudRate = 0;
+  for (int i = 0; i < 4; i++) {
+    int value = readByteBefore(deadline);
+    if (value < 0) return;
+    newBaudRate |= (unsigned long)value << (8 * i);
+  }
+  Serial.write(NEGOTIATE_BAUD); // Acknowledge at the old rate
+  Serial.flush(); // Wait until the acknowledgement is sent before switching
+
+  unsigned long oldBaudRate = baudRate;
+  Serial.end();
+  Serial.begin(newBaudRate);
+  deadline = millis() + BAUD_CONFIRM_TIMEOUT_MS;
+  while ((long)(millis() - deadline) < 0) {
+    int command = readByteBefore(deadline);
+    if (command == LOOPBACK_TEST) {
+      if (!echoLoopbackTest(deadline)) break;
+    }
+    else if (command == CONFIRM_BAUD) {
+      Serial.write(CONFIRM_BAUD);
+      baudRate = newBaudRate;
+      return;
+    }
+  }
+
+  Serial.flush();
+  Serial.end();
+  Serial.begin(oldBaudRate);
+}
+
+bool echoLoopbackTest(unsigned long deadline) {
+  // Echo back a test burst byte for byte. Returns false if the burst didn't arrive in time.
+  int low = readByteBefore(deadline);
+  int high = readByteBefore(deadline);
+  if (low < 0 || high < 0) return false;
+  unsigned int length = low | (high << 8);
+  for (unsigned int i = 0; i < length; i++) {
+    int value = readByteBefore(deadline);
+    if (value < 0) return false;
+    Serial.write((byte)value);
+  }
+  return true;
+}
+
+int readByteBefore(unsigned long deadline) {
+  // Like Serial.read(), but waits for a byte until 'deadline' (in millis). Returns -1 on timeout.
+  while (Serial.available() == 0) {
+    if ((long)(millis() - deadline) >= 0) return -1;
+  }
+  return Serial.read();
+}
@@ -0,0 +1,196 @@
+"""
+Records the raw frames from the mat to a file, exactly as they were read (uint16 ADC readings).
+
+The file is a small fixed-size header followed by fixed-size records, one per frame:
+    header   HEADER_DTYPE, padded to HEADER_SIZE bytes: magic, version, frame shape, record size,
+             number of frames, and when the recording started
+    records  record_dtype(rows, cols): monotonic timestamp (seconds, float64), sequence number
+             (from the ring buffer, so dropped frames show up as gaps), and the frame (rows x cols uint16)
+Every record has the same size, so frame i is at 'HEADER_SIZE + i * record_size' and can be read
+without reading anything before it. A 16x16 frame takes 528 bytes, so an hour at 60 frames/sec is
+about 114 MB (the same session as mp4 video of the heatmap is several GB, and the readings are lost).
+
+The file is pre-sized in chunks of CHUNK_BYTES and written through an np.memmap of the chunk, so
+appending a frame is just copying it into memory. The operating system writes the pages to the disk
+in large blocks in the background. When the recording is closed, the header gets the final number of
+frames and the unused end of the last chunk is cut off. If the App crashes first, the header still
+has the number of frames when the last chunk was added, and 'RawRecordingReader' finds the rest.
+
+Run this file directly to time recording a few thousand frames:
+    python raw_recording.py
+"""
+
+import os
+import threading
+import time
+import numpy as np
+
+from data_types import RAW_DTYPE
+
+
+RAW_RECORDING_EXTENSION = ".psraw"
+MAGIC = b"PSRAW\x00\x00\x00"
+VERSION = 1
+HEADER_SIZE = 64 # bytes, before the first record
+CHUNK_BYTES = 16 * 1024 * 1024 # the file grows by this much at a time
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("rows", "<u4"),
+    ("cols", "<u4"),
+    ("record_size", "<u4"),
+    ("closed", "<u4"), # 1 once the recording was closed properly ('frame_count' is exact)
+    ("frame_count", "<u8"),
+    ("start_timestamp", "<f8"), # time.monotonic() when the recording started (same clock as the records)
+    ("start_time", "<f8"), # time.time() when the recording started (the date and time)
+])
+
+
+def record_dtype(rows: int, cols: int) -> np.dtype:
+    # One frame and when it was read
+    return np.dtype([
+        ("timestamp", "<f8"), # time.monotonic(), seconds
+        ("sequence", "<u8"), # sequence number from the ring buffer
+        ("frame", RAW_DTYPE, (rows, cols)),
+    ])
+
+
+class RawRecordingWriter:
+
+    def __init__(self, path: str, frame_shape: tuple[int, int]) -> None:
+        # Create (or overwrite) the file at 'path' for frames of 'frame_shape'
+        self.path = path
+        self.frame_shape: tuple[int, int] = tuple(frame_shape)
+        self.record_dtype = record_dtype(*self.frame_shape)
+        self.frames_written: int = 0
+        self.skipped_frames: int = 0 # frames of a different shape (e.g. while the mat was disconnected), not recorded
+        self.closed: bool = False
+        self._lock = threading.Lock() # append() and close() may be called from different threads
+        self._records_per_chunk = max(1, CHUNK_BYTES // self.record_dtype.itemsize)
+        self._records: np.memmap | None = None # the current chunk
+        self._chunk_first_record: int = 0 # index of the chunk's first record in the file
+
+        self._header = np.zeros((), dtype=HEADER_DTYPE)
+        self._header["magic"] = MAGIC
+        self._header["version"] = VERSION
+        self._header["header_size"] = HEADER_SIZE
+        self._header["rows"], self._header["cols"] = self.frame_shape
+        self._header["record_size"] = self.record_dtype.itemsize
+        self._header["start_timestamp"] = time.monotonic()
+        self._header["start_time"] = time.time()
+        with open(path, "wb") as file:
+            file.write(self._header.tobytes().ljust(HEADER_SIZE, b"\x00"))
+        self._add_chunk()
+
+    def append(self, frame: np.ndarray, timestamp: float | None = None, sequence: int | None = None) -> bool:
+        # Copy a frame into the file. Returns False if it wasn't recorded (closed, or a different shape).
+        with self._lock:
+            if self.closed:
+                return False
+            if frame.shape != self.frame_shape:
+                self.skipped_frames += 1
+                return False
+            index = self.frames_written - self._chunk_first_record
+            if index == len(self._records):
+                self._add_chunk()
+                index = 0
+            record = self._records[index]
+            record["timestamp"] = time.monotonic() if timestamp is None else timestamp
+            record["sequence"] = self.frames_written if sequence is None else sequence
+            np.copyto(record["frame"], frame, casting="unsafe")
+            self.frames_written += 1
+            return True
+
+    def close(self):
+        # Write the final number of frames to the header and cut off the unused end of the file
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._release_chunk()
+            self._header["closed"] = 1
+            self._write_header(truncate_to=HEADER_SIZE + self.frames_written * self.record_dtype.itemsize)
+
+    def _add_chunk(self):
+        # Grow the file by one chunk and map it. The header is updated first, so after a crash
+        # at most one chunk of frames is missing from its count.
+        self._release_chunk()
+        self._chunk_first_record = self.frames_written
+        self._write_header(truncate_to=HEADER_SIZE + (self.frames_written + self._records_per_chunk) * self.record_dtype.itemsize)
+        self._records = np.memmap(
+            self.path, dtype=self.record_dtype, mode="r+", shape=(self._records_per_chunk,),
+            offset=HEADER_SIZE + self._chunk_first_record * self.record_dtype.itemsize,
+        )
+
+    def _release_chunk(self):
+        if self._records is not None:
+            self._records.flush()
+            self._records = None # unmapped (nothing else holds a view of it): Windows can't resize a mapped file
+
+    def _write_header(self, truncate_to: int):
+        self._header["frame_count"] = self.frames_written
+        with open(self.path, "r+b") as file:
+            file.write(self._header.tobytes())
+            file.truncate(truncate_to)
+
+
+class RawRecordingReader:
+
+    def __init__(self, path: str) -> None:
+        # Open a recording for reading. Nothing is read until it is used (the records are memory-mapped).
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header[0]["magic"] != MAGIC.rstrip(b"\x00"):
+            raise ValueError(f"{path} is not a raw recording")
+        header = header[0]
+        if header["version"] > VERSION:
+            raise ValueError(f"{path} was recorded by a newer version of the App (version {header['version']})")
+        self.frame_shape: tuple[int, int] = (int(header["rows"]), int(header["cols"]))
+        self.record_dtype = record_dtype(*self.frame_shape)
+        self.start_time: float = float(header["start_time"])
+        self.closed_properly: bool = bool(header["closed"])
+
+        header_size = int(header["header_size"])
+        records_in_file = (os.path.getsize(path) - header_size) // self.record_dtype.itemsize
+        if records_in_file == 0:
+            self.records = np.zeros(0, dtype=self.record_dtype)
+        else:
+            self.records = np.memmap(path, dtype=self.record_dtype, mode="r", shape=(records_in_file,), offset=header_size)
+        frame_count = min(int(header["frame_count"]), records_in_file)
+        if not self.closed_properly:
+            # The App didn't close the recording: the frames after 'frame_count' that were written before it
+            # stopped have timestamps, and the rest of the last chunk is still zeros
+            unwritten = np.flatnonzero(self.records["timestamp"][frame_count:] == 0)
+            frame_count = frame_count + (int(unwritten[0]) if len(unwritten) else records_in_file - frame_count)
+        self.records = self.records[:frame_count]
+
+        # Views of the records (nothing is copied)
+        self.timestamps: np.ndarray = self.records["timestamp"]
+        self.sequences: np.ndarray = self.records["sequence"]
+        self.frames: np.ndarray = self.records["frame"]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def duration(self) -> float:
+        # Seconds from the first frame to the last
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) > 1 else 0.0
+
+
+if __name__ == "__main__":
+    import tempfile
+    import timeit
+
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 1024, size=(5000, 16, 16), dtype=np.uint16)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test" + RAW_RECORDING_EXTENSION)
+        writer = RawRecordingWriter(path, (16, 16))
+        append_time = timeit.timeit(lambda: writer.append(frames[writer.frames_written % len(frames)]), number=len(frames))
+        writer.close()
+        size = os.path.getsize(path)
+        print(f"{len(frames)} frames: {append_time / len(frames) * 1e6:.1f} us/frame to record, "
+              f"{size / len(frames):.0f} bytes/frame ({size * 60 * 3600 / len(frames) / 1e6:.0f} MB per hour at 60 frames/sec)")
@@ -0,0 +1,167 @@
+"""
+Plays back a raw recording (see 'raw_recording.py') as a data source, like the mat or the simulation.
+
+The recording is memory-mapped, so nothing is read until a frame is used, and then only that frame's
+pages: a session of any length plays without being loaded into RAM, and the frames handed out are
+views of the file (the ring buffer copies them, as it does with every frame).
+    - Jumping to frame i is O(1): its record is at a fixed offset in the file.
+    - Jumping to a time is a binary search of the (memory-mapped) timestamps, which only reads the
+      ~log2(frames) records it looks at (about 22 for an hour at 60 frames/sec).
+    - Playing follows the recording's own timestamps, scaled by 'speed' (MIN_SPEED to MAX_SPEED):
+      the frame shown is the last one recorded at or before the current playback time, so at high
+      speeds the frames in between are skipped instead of played back to back, and at low speeds
+      a frame is handed out once and then held.
+    - At the end of the recording, playback starts again from the beginning if 'loop' is set,
+      and stops on the last frame otherwise.
+
+Run this file directly to play a recording at a few speeds:
+    python recording_playback.py
+"""
+
+import threading
+import time
+import numpy as np
+
+from raw_recording import RawRecordingReader
+
+
+MIN_SPEED = 0.1
+MAX_SPEED = 16.0
+PLAYBACK_SPEEDS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0) # choices in the GUI
+
+
+class RecordingPlayback:
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = True) -> None:
+        self.reader = RawRecordingReader(path) # raises ValueError if it isn't a raw recording
+        if len(self.reader) == 0:
+            raise ValueError(f"{path} has no frames")
+        self.loop = loop
+        self.speed: float = float(np.clip(speed, MIN_SPEED, MAX_SPEED))
+        self.playing: bool = True
+        self.frames_skipped: int = 0 # frames passed over because playback was faster than the frames were taken
+
+        self._lock = threading.Lock() # the data thread takes frames, the GUI seeks and changes the speed
+        self._first_timestamp = float(self.reader.timestamps[0])
+        self._index: int = 0 # frame being shown
+        self._last_handed_out: int = -1 # frame last returned by 'next_frame'
+        self._anchor_position: float = 0.0 # playback time (seconds from the first frame) at '_anchor_clock'
+        self._anchor_clock: float = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def duration(self) -> float:
+        # Seconds from the first frame to the last
+        return self.reader.duration
+
+    def position(self, index: int | None = None) -> float:
+        # Seconds from the first frame to frame 'index' (the current frame if None)
+        return float(self.reader.timestamps[self._index if index is None else index]) - self._first_timestamp
+
+    def frame(self, index: int) -> np.ndarray:
+        # Frame 'index' (a read-only view of the file)
+        return self.reader.frames[index]
+
+    def seek(self, index: int):
+        # Go to frame 'index'
+        with self._lock:
+            self._go_to(int(np.clip(index, 0, len(self) - 1)))
+
+    def seek_time(self, seconds: float):
+        # Go to the last frame recorded at or before 'seconds' from the first frame
+        with self._lock:
+            self._go_to(self._index_at(seconds))
+
+    def step(self, frames: int):
+        # Go forward (or back, if negative) by 'frames' frames. Steps past either end wrap around if looping.
+        with self._lock:
+            index = self._index + frames
+            index = index % len(self) if self.loop else int(np.clip(index, 0, len(self) - 1))
+            self._go_to(index)
+
+    def set_speed(self, speed: float):
+        with self._lock:
+            self._anchor_position, self._anchor_clock = self._playback_position(), time.monotonic()
+            self.speed = float(np.clip(speed, MIN_SPEED, MAX_SPEED))
+
+    def set_playing(self, playing: bool):
+        # Pause or resume the playback clock (playback resumes from the frame being shown)
+        with self._lock:
+            if playing and not self.playing:
+                if not self.loop and self._index == len(self) - 1:
+                    self._go_to(0) # it had stopped at the end: play again from the beginning
+                self._anchor_position, self._anchor_clock = self.position(), time.monotonic()
+            self.playing = playing
+
+    def next_frame(self) -> tuple[np.ndarray, int] | None:
+        # The frame to show now and its index, or None if it is still the frame that was handed out last
+        with self._lock:
+            if self.playing:
+                position = self._playback_position()
+                if position > self.duration:
+                    if self.loop and self.duration > 0:
+                        # Start again, with one frame time between the last frame and the first
+                        period = self.duration + self.duration / max(1, len(self) - 1)
+                        position %= period
+                        self._anchor_position, self._anchor_clock = position, time.monotonic()
+                    else:
+                        position = self.duration
+                        self.playing = False
+                index = self._index_at(position)
+                if index > self._last_handed_out >= 0:
+                    self.frames_skipped += index - self._last_handed_out - 1
+                self._index = index
+            if self._index == self._last_handed_out:
+                return None
+            self._last_handed_out = self._index
+            return self.reader.frames[self._index], self._index
+
+    def _go_to(self, index: int):
+        self._index = index
+        self._last_handed_out = -1 # hand out the frame gone to, even if it is the one shown
+        self._anchor_position, self._anchor_clock = self.position(index), time.monotonic()
+
+    def _playback_position(self) -> float:
+        # Seconds from the first frame that playback has reached
+        return self._anchor_position + (time.monotonic() - self._anchor_clock) * self.speed
+
+    def _index_at(self, seconds: float) -> int:
+        # Binary search of the memory-mapped timestamps (only the records it looks at are read)
+        index = int(np.searchsorted(self.reader.timestamps, self._first_timestamp + seconds, side="right")) - 1
+        return int(np.clip(index, 0, len(self) - 1))
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from raw_recording import RawRecordingWriter, RAW_RECORDING_EXTENSION
+
+    with tempfile.TemporaryDirectory() as directory:
+        # 10 seconds at 60 frames/sec. Each frame is filled with its index.
+        path = os.path.join(directory, "test" + RAW_RECORDING_EXTENSION)
+        writer = RawRecordingWriter(path, (16, 16))
+        for index in range(600):
+            writer.append(np.full((16, 16), index, dtype=np.uint16), timestamp=1000 + index / 60)
+        writer.close()
+
+        playback = RecordingPlayback(path, loop=False)
+        for speed in (0.1, 1.0, 16.0):
+            playback.seek(0)
+            playback.set_speed(speed)
+            playback.set_playing(True)
+            playback.frames_skipped = 0
+            handed_out = 0
+            started = time.monotonic()
+            while time.monotonic() - started < 0.5:
+                if playback.next_frame() is not None:
+                    handed_out += 1
+                time.sleep(1 / 60) # like the data thread, at 60 frames/sec
+            print(f"speed {speed:4.1f}x: 0.5 s of playback reached frame {playback.index:3d} "
+                  f"({playback.position():.2f} s), {handed_out} frames handed out, {playback.frames_skipped} skipped")
+        del playback
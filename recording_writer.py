@@ -0,0 +1,271 @@
+"""
+Writes recordings to disk in a background thread, so a slow disk or video encoder never holds up
+acquiring or drawing frames.
+
+Each recording sink (the raw frames, the mp4 video) has a bounded queue. The thread that produces a
+frame only 'prepares' it, copying it into a buffer the sink owns (for the video, converting it to BGR,
+which is the same cost as the copy), and puts it in the sink's queue. One writer thread takes the
+oldest queued frame of any sink and writes it (memmap copy, video encoding).
+
+When a sink's queue is full, its policy decides what happens:
+    "block"        wait for the writer thread to make room (no frame is lost, but the producer waits)
+    "drop-oldest"  throw away the oldest queued frame (the recording skips ahead)
+    "drop-newest"  throw away the new frame (the recording keeps what was already queued)
+Every sink counts the frames it dropped, and the frames that were written more than 'late_after'
+seconds after they were queued (the writer thread is falling behind).
+
+Run this file directly to see the counters with a slow sink and each policy:
+    python recording_writer.py
+"""
+
+from collections import deque
+from dataclasses import dataclass
+import threading
+import time
+from typing import Literal
+import cv2
+import numpy as np
+
+from data_types import PIXEL_DTYPE
+from raw_recording import RawRecordingWriter
+
+
+QueuePolicy = Literal["block", "drop-oldest", "drop-newest"]
+QUEUE_POLICIES: tuple[QueuePolicy, ...] = ("block", "drop-oldest", "drop-newest")
+
+DEFAULT_QUEUE_CAPACITY = 120 # frames per sink (2 seconds at 60 frames/sec)
+DEFAULT_LATE_AFTER = 0.5 # seconds from queueing to writing, after which a frame counts as late
+
+
+@dataclass
+class SinkStats:
+    queued: int = 0 # frames in the queue now
+    max_queued: int = 0 # most frames that were ever in the queue at once
+    submitted: int = 0 # frames handed to the sink
+    written: int = 0 # frames written to disk
+    dropped: int = 0 # frames thrown away because the queue was full (or the sink failed)
+    skipped: int = 0 # frames the sink didn't write (e.g. raw frames of a different size than the recording)
+    late: int = 0 # frames written more than 'late_after' seconds after they were queued
+    blocked_seconds: float = 0.0 # time producers waited for room in the queue ("block" policy)
+    error: str | None = None # the first error the sink raised (the frames it failed on count as dropped)
+
+
+class RawFrameSink:
+    # Appends raw frames (with their timestamp and sequence number) to a raw recording
+
+    def __init__(self, raw_recording: RawRecordingWriter) -> None:
+        self.raw_recording = raw_recording
+
+    def prepare(self, frame: np.ndarray, timestamp: float, sequence: int) -> tuple:
+        # The frame may be a buffer the acquisition reuses (e.g. while streaming), so it is copied (a few hundred bytes)
+        return frame.copy(), timestamp, sequence
+
+    def write(self, item: tuple) -> bool:
+        # False if the frame wasn't recorded (a different size than the recording)
+        return self.raw_recording.append(*item)
+
+    def release(self, item: tuple):
+        pass
+
+    def close(self):
+        self.raw_recording.close()
+
+
+class VideoSink:
+    # Encodes heatmap images (RGB) to an mp4 video. The video is created with the size of the first image,
+    # and later images of another size (the window was resized) are scaled to it.
+
+    def __init__(self, path: str, fps: int) -> None:
+        self.path = path
+        self.fps = fps
+        self.frame_size: tuple[int, int] | None = None # (width, height) of the video
+        self._video: cv2.VideoWriter | None = None
+        self._free_buffers: deque[np.ndarray] = deque() # BGR buffers that can be reused
+
+    def prepare(self, image: np.ndarray) -> np.ndarray:
+        # Convert to BGR (what OpenCV writes) into a free buffer, so the caller can reuse 'image' right away
+        height, width = image.shape[:2]
+        if self.frame_size is None:
+            self.frame_size = (width, height)
+        try:
+            buffer = self._free_buffers.popleft()
+        except IndexError:
+            buffer = np.zeros((self.frame_size[1], self.frame_size[0], 3), dtype=PIXEL_DTYPE)
+        if (width, height) != self.frame_size:
+            image = cv2.resize(image, self.frame_size, interpolation=cv2.INTER_NEAREST)
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=buffer)
+
+    def write(self, item: np.ndarray):
+        if self._video is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self._video = cv2.VideoWriter(self.path, fourcc, self.fps, self.frame_size, True)
+        self._video.write(item)
+
+    def release(self, item: np.ndarray):
+        self._free_buffers.append(item)
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._free_buffers.clear()
+
+
+class _SinkQueue:
+    def __init__(self, sink, capacity: int, policy: QueuePolicy) -> None:
+        self.sink = sink
+        self.capacity = max(1, capacity)
+        self.policy: QueuePolicy = policy
+        self.items: deque[tuple[float, object]] = deque() # (time queued, prepared item)
+        self.stats = SinkStats()
+
+
+class RecordingWriter:
+
+    def __init__(self, late_after: float = DEFAULT_LATE_AFTER) -> None:
+        self.late_after = late_after
+        self.closed: bool = False
+        self._queues: dict[str, _SinkQueue] = {}
+        self._condition = threading.Condition() # guards the queues; notified when a frame is queued or taken
+        self._thread = threading.Thread(target=self.threadloop_write, daemon=True, name="recording writer")
+        self._thread.start()
+
+    def add_sink(self, name: str, sink, capacity: int = DEFAULT_QUEUE_CAPACITY, policy: QueuePolicy = "drop-oldest"):
+        # 'sink' has prepare(*args) -> item (called in the producer's thread), write(item) and release(item)
+        # (called in the writer thread, release also when the item is dropped), and close(). If write()
+        # returns False, the frame counts as skipped instead of written.
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Queue policy {policy} not supported")
+        with self._condition:
+            self._queues[name] = _SinkQueue(sink, capacity, policy)
+
+    def submit(self, name: str, *args) -> bool:
+        # Queue a frame for sink 'name'. Returns False if it was dropped (the queue was full, or the writer is closed).
+        queue = self._queues.get(name)
+        if queue is None or self.closed:
+            return False
+        item = queue.sink.prepare(*args)
+        dropped = None
+        with self._condition:
+            queue.stats.submitted += 1
+            if len(queue.items) >= queue.capacity:
+                if queue.policy == "block":
+                    started_waiting = time.perf_counter()
+                    while len(queue.items) >= queue.capacity and not self.closed:
+                        self._condition.wait()
+                    queue.stats.blocked_seconds += time.perf_counter() - started_waiting
+                elif queue.policy == "drop-oldest":
+                    dropped = queue.items.popleft()[1]
+                else:
+                    dropped = item
+            if self.closed and dropped is None:
+                dropped = item
+            if dropped is not None:
+                queue.stats.dropped += 1
+            if dropped is not item:
+                queue.items.append((time.monotonic(), item))
+                queue.stats.max_queued = max(queue.stats.max_queued, len(queue.items))
+                self._condition.notify_all()
+        if dropped is not None:
+            queue.sink.release(dropped)
+        return dropped is not item
+
+    def stats(self, name: str) -> SinkStats:
+        # A copy of the counters of sink 'name'
+        queue = self._queues[name]
+        with self._condition:
+            queue.stats.queued = len(queue.items)
+            return SinkStats(**vars(queue.stats))
+
+    def sink_names(self) -> list[str]:
+        return list(self._queues)
+
+    def close(self, wait: bool = True):
+        # Stop taking frames. The writer thread writes what is still queued, closes the sinks and ends.
+        # With wait=False, this returns right away (e.g. so the GUI doesn't wait for the video encoder).
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        if wait:
+            self._thread.join()
+
+    def threadloop_write(self):
+        while True:
+            with self._condition:
+                # The oldest queued frame of any sink (so the sinks are written in the order the frames came)
+                while True:
+                    waiting = [queue for queue in self._queues.values() if queue.items]
+                    if waiting or self.closed:
+                        break
+                    self._condition.wait()
+                if not waiting:
+                    break # closed, and everything has been written
+                queue = min(waiting, key=lambda queue: queue.items[0][0])
+                queued_at, item = queue.items.popleft()
+                self._condition.notify_all() # room for a blocked producer
+
+            try:
+                written = queue.sink.write(item)
+            except Exception as error:
+                # A full disk or a failed encoder shouldn't stop the other sinks (or keep the producers blocked)
+                with self._condition:
+                    queue.stats.dropped += 1
+                    self._keep_error(queue, error)
+            else:
+                with self._condition:
+                    if written is False:
+                        queue.stats.skipped += 1
+                    else:
+                        queue.stats.written += 1
+                        if time.monotonic() - queued_at > self.late_after:
+                            queue.stats.late += 1
+            queue.sink.release(item)
+
+        for queue in self._queues.values():
+            # A sink that fails to close (e.g. to flush to a full disk) mustn't leave the others open
+            try:
+                queue.sink.close()
+            except Exception as error:
+                with self._condition:
+                    self._keep_error(queue, error)
+
+    def _keep_error(self, queue: _SinkQueue, error: Exception):
+        # Only the first error is kept (a full disk fails every frame after it). Call while holding '_condition'.
+        if queue.stats.error is None:
+            queue.stats.error = f"{type(error).__name__}: {error}"
+
+
+if __name__ == "__main__":
+    class SlowSink:
+        # Takes 'seconds' to write each frame
+        def __init__(self, seconds: float) -> None:
+            self.seconds = seconds
+            self.written: list[int] = []
+
+        def prepare(self, value: int) -> int:
+            return value
+
+        def write(self, item: int):
+            time.sleep(self.seconds)
+            self.written.append(item)
+
+        def release(self, item: int):
+            pass
+
+        def close(self):
+            pass
+
+    # 100 frames at 200 frames/sec into a sink that writes 100 frames/sec, with room for 10 frames
+    for policy in QUEUE_POLICIES:
+        writer = RecordingWriter(late_after=0.05)
+        sink = SlowSink(0.01)
+        writer.add_sink("slow", sink, capacity=10, policy=policy)
+        started = time.perf_counter()
+        for value in range(100):
+            writer.submit("slow", value)
+            time.sleep(0.005)
+        produce_time = time.perf_counter() - started
+        writer.close()
+        stats = writer.stats("slow")
+        print(f"{policy:12s} producer took {produce_time:.2f} s   written {stats.written:3d}   dropped {stats.dropped:3d}   "
+              f"late {stats.late:3d}   last frame written {sink.written[-1]}")
@@ -0,0 +1,243 @@
+"""
+Keeps the serial connection to the Arduino open, in a background thread.
+
+The connection manager:
+    - Polls 'list_ports.comports()' so it notices when the Arduino is plugged in or unplugged.
+    - Opens the selected port when it is present, and waits for the Arduino's ready byte with a
+      blocking read (the OS wakes the thread when the byte arrives, so no CPU is used while waiting).
+    - Negotiates a faster baud rate (see 'baud_negotiation.py'). If the Arduino gets lost on the way,
+      it is reset through the DTR line and the starting baud rate is kept.
+    - Reconnects after a failure or a lost connection, waiting longer after each failed attempt.
+    - Reports every change of state through 'on_state_change', which is called from the manager's
+      thread (a Tk app should pass it on to the main thread with 'after()').
+
+Whoever reads frames uses 'serialcomm' while holding 'lock', and calls 'connection_lost()' if
+the port raises an error. 'connection_count' goes up every time a new connection is made
+(the Arduino resets, so anything remembered about the previous connection must be reset too).
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Literal
+import os
+import threading
+import time
+import serial
+import serial.tools.list_ports as list_ports
+
+from baud_negotiation import BaudRateLostError, BaudRateResult, negotiate_baud_rate
+
+
+ConnectionState = Literal["disconnected", "waiting_for_port", "connecting", "connected", "retrying"]
+
+PORT_POLL_INTERVAL = 1.0 # seconds between checks for ports being plugged in or unplugged
+READY_TIMEOUT = 3.0 # seconds to wait for the Arduino's ready byte after opening the port
+MIN_RETRY_DELAY = 0.5 # seconds before retrying after the first failure
+MAX_RETRY_DELAY = 8.0 # seconds. The delay doubles after every failure, up to this.
+RESET_PULSE_TIME = 0.05 # seconds. DTR is held low this long to reset the Arduino (like the Arduino IDE does).
+
+
+@dataclass
+class ConnectionStatus:
+    state: ConnectionState
+    port: str | None = None # port selected by the user
+    detail: str = "" # link speed when connected, the error when retrying
+    retry_delay: float = 0.0 # seconds until the next attempt when retrying
+
+
+class SerialConnectionManager:
+
+    def __init__(self, ready_signal: bytes, baud_rate: int, serial_timeout: float = 4,
+                 on_state_change: Callable[[ConnectionStatus], None] | None = None,
+                 on_ports_change: Callable[[list[str]], None] | None = None) -> None:
+        self.ready_signal = ready_signal # byte the Arduino sends when it has finished booting
+        self.baud_rate = baud_rate # baud rate to open the port with (before any negotiation)
+        self.serial_timeout = serial_timeout # read timeout of the port once connected
+        self.on_state_change = on_state_change # called with the new status when the state changes
+        self.on_ports_change = on_ports_change # called with the port names when ports are plugged in or unplugged
+        self.negotiate_baud_rate: bool = True # try faster baud rates after connecting
+
+        self.serialcomm: serial.Serial = serial.Serial() # only use while holding 'lock'
+        self.lock = threading.Lock()
+        self.status = ConnectionStatus("disconnected")
+        self.connection_count: int = 0
+        self.baud_rate_result: BaudRateResult | None = None
+        self.available_ports: list[str] = []
+        self._comports: list = [] # result of the last 'list_ports.comports()'
+
+        self._port: str | None = None # port selected by the user
+        self._open_port: str | None = None # port 'serialcomm' was opened for
+        self._retry_delay: float = MIN_RETRY_DELAY
+        self._retry_at: float = 0.0 # time.monotonic() of the next attempt
+        self._connected = threading.Event()
+        self._lost = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._threadloop, daemon=True)
+
+    def start(self) -> "SerialConnectionManager":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._close()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def wait_until_connected(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def set_port(self, port: str | None):
+        # Connect to 'port' (a name from 'available_ports', or a device path), or disconnect if None
+        if port == "":
+            port = None
+        if port == self._port:
+            return
+        self._port = port
+        self._retry_delay = MIN_RETRY_DELAY
+        self._retry_at = 0.0
+        self._wake.set()
+
+    def connection_lost(self):
+        # Call when reading or writing the port failed (e.g. the cable was unplugged)
+        self._connected.clear()
+        self._lost.set()
+        self._wake.set()
+
+    ################################################################################################
+    # Background thread
+    ################################################################################################
+
+    def _threadloop(self):
+        next_poll = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_poll:
+                self._poll_ports()
+                next_poll = now + PORT_POLL_INTERVAL
+
+            port = self._port
+            device = self._find_device(port)
+            if self.serialcomm.is_open and (port != self._open_port or device is None or self._lost.is_set()):
+                lost = port == self._open_port and (self._lost.is_set() or device is None)
+                self._close()
+                if lost:
+                    self._schedule_retry("Connection lost")
+            self._lost.clear()
+
+            if port is None:
+                self._set_status(ConnectionStatus("disconnected"))
+            elif not self.serialcomm.is_open:
+                if device is None:
+                    self._set_status(ConnectionStatus("waiting_for_port", port))
+                elif time.monotonic() >= self._retry_at:
+                    self._connect(port, device)
+
+            # Sleep until something changes, the next port poll, or the next retry
+            wake_at = next_poll
+            if self._retry_at > time.monotonic():
+                wake_at = min(wake_at, self._retry_at)
+            self._wake.wait(max(0.0, wake_at - time.monotonic()))
+            self._wake.clear()
+
+    def _connect(self, port: str, device: str):
+        self._set_status(ConnectionStatus("connecting", port))
+        try:
+            serialcomm = serial.Serial(device, self.baud_rate, timeout=READY_TIMEOUT)
+        except (serial.SerialException, OSError) as e:
+            self._schedule_retry(str(e))
+            return
+
+        try:
+            # The Arduino resets when the port is opened, and sends the ready byte once it has booted
+            if not self._wait_for_ready(serialcomm):
+                serialcomm.close()
+                self._schedule_retry(f"Ready signal '{self.ready_signal}' not received within {READY_TIMEOUT:g} seconds.")
+                return
+
+            serialcomm.timeout = self.serial_timeout
+            self.baud_rate_result = BaudRateResult(serialcomm.baudrate, None)
+            if self.negotiate_baud_rate:
+                try:
+                    self.baud_rate_result = negotiate_baud_rate(serialcomm)
+                except BaudRateLostError:
+                    # Reset the Arduino, so both sides are back at the starting rate
+                    serialcomm.baudrate = self.baud_rate
+                    serialcomm.dtr = False
+                    time.sleep(RESET_PULSE_TIME)
+                    serialcomm.dtr = True
+                    if not self._wait_for_ready(serialcomm):
+                        serialcomm.close()
+                        self._schedule_retry("The Arduino didn't answer after a failed baud rate negotiation.")
+                        return
+                    serialcomm.timeout = self.serial_timeout
+        except (serial.SerialException, OSError) as e:
+            serialcomm.close()
+            self._schedule_retry(str(e))
+            return
+
+        with self.lock:
+            self.serialcomm = serialcomm
+            self._open_port = port
+            self.connection_count += 1
+        self._retry_delay = MIN_RETRY_DELAY
+        self._connected.set()
+
+        link_speed = f"{self.baud_rate_result.baud_rate} baud"
+        if self.baud_rate_result.bytes_per_second is not None:
+            link_speed += f", {self.baud_rate_result.bytes_per_second / 1000:.1f} kB/s"
+        self._set_status(ConnectionStatus("connected", port, link_speed))
+
+    def _wait_for_ready(self, serialcomm) -> bool:
+        # Wait for the ready byte. Each read blocks (without using the CPU) until a byte arrives or the time runs out.
+        ready = False
+        deadline = time.monotonic() + READY_TIMEOUT
+        while not ready and time.monotonic() < deadline:
+            serialcomm.timeout = max(0.0, deadline - time.monotonic())
+            received = serialcomm.read(1)
+            if not received:
+                break
+            ready = received == self.ready_signal
+        return ready
+
+    def _close(self):
+        self._connected.clear()
+        with self.lock:
+            self.serialcomm.close()
+            self._open_port = None
+
+    def _schedule_retry(self, error: str):
+        self._retry_at = time.monotonic() + self._retry_delay
+        self._set_status(ConnectionStatus("retrying", self._port, error, self._retry_delay))
+        self._retry_delay = min(2 * self._retry_delay, MAX_RETRY_DELAY)
+
+    def _poll_ports(self):
+        self._comports = list_ports.comports()
+        ports = [port.name for port in self._comports]
+        if ports != self.available_ports:
+            self.available_ports = ports
+            if self.on_ports_change is not None:
+                self.on_ports_change(ports)
+
+    def _find_device(self, port: str | None) -> str | None:
+        # Device path of 'port' if it is plugged in, else None. Ports that 'comports()' doesn't
+        # list (such as the pseudo-terminal of 'arduino_stand_in.py') can be given as a path.
+        if port is None:
+            return None
+        for comport in self._comports:
+            if port in (comport.name, comport.device):
+                return comport.device
+        if os.path.exists(port):
+            return port
+        return None
+
+    def _set_status(self, status: ConnectionStatus):
+        if status == self.status:
+            return
+        self.status = status
+        if self.on_state_change is not None:
+            self.on_state_change(status)
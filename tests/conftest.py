@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.fixture
+def connect_stand_in():
+    # Start an Arduino stand-in (see 'arduino_stand_in.py'), open its port and wait for the ready byte.
+    # Skipped where there are no pseudo-terminals (Windows) or pyserial isn't installed.
+    serial = pytest.importorskip("serial")
+    arduino_stand_in = pytest.importorskip("arduino_stand_in", reason="the Arduino stand-in needs a pty (Linux/macOS)")
+    connections = []
+
+    def connect(baud_rate: int = 115200, **options):
+        stand_in = arduino_stand_in.ArduinoStandIn(baud_rate=baud_rate, **options).start()
+        serialcomm = serial.Serial(stand_in.port, baud_rate, timeout=2)
+        connections.append((stand_in, serialcomm))
+        assert serialcomm.read(1) == arduino_stand_in.READY_SIGNAL
+        return stand_in, serialcomm
+
+    yield connect
+    for stand_in, serialcomm in connections:
+        serialcomm.close()
+        stand_in.stop()
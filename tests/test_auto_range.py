@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from auto_range import AutoRange
+from colormaps import ADC_LEVELS
+
+
+@pytest.mark.parametrize('rows, cols', [(16, 16), (64, 64), (128, 128)])
+def test_quantiles_match_numpy(rows, cols):
+    frame = np.random.default_rng(0).integers(0, ADC_LEVELS, size=(rows, cols), dtype=np.uint16)
+    auto_range = AutoRange("rolling")
+    auto_range.update(frame)
+    assert auto_range.quantiles(1.0)[0] == frame.max()
+    assert auto_range.quantiles(0.25)[0] == np.percentile(frame, 25, method="inverted_cdf")
+
+
+def test_one_loud_frame_does_not_jump():
+    # A weight that shows up for one frame: the per-frame range jumps, the smoothed one doesn't
+    rng = np.random.default_rng(0)
+    auto_range = AutoRange("rolling", rolling_window=30)
+    quiet = rng.integers(0, 50, size=(16, 16), dtype=np.uint16)
+    loud = quiet.copy()
+    loud[4:8, 4:8] = 900
+    for _ in range(30):
+        quiet_low, quiet_high = auto_range.update(quiet)
+    low, high = auto_range.update(loud)
+    assert abs(low - quiet_low) <= 1
+    assert quiet_high < high < quiet_high + 0.5 * (900 - quiet_high)
+
+
+def test_rolling_window_forgets_old_frames():
+    auto_range = AutoRange("rolling", rolling_window=3, smoothing=1)
+    auto_range.update(np.full((4, 4), 800, dtype=np.uint16))
+    for _ in range(3):
+        low, high = auto_range.update(np.full((4, 4), 100, dtype=np.uint16))
+    assert (low, high) == (100, 101) and auto_range.frames == 3
+
+
+def test_session_keeps_every_frame():
+    auto_range = AutoRange("session", smoothing=1)
+    auto_range.update(np.full((4, 4), 800, dtype=np.uint16))
+    for _ in range(100):
+        low, high = auto_range.update(np.full((4, 4), 100, dtype=np.uint16))
+    assert (low, high) == (100, 800) and auto_range.frames == 101
+    auto_range.reset()
+    assert auto_range.frames == 0 and auto_range.quantiles(0.5) == (0,)
+
+
+def test_fixed_range():
+    auto_range = AutoRange("fixed", fixed_range=(200, 200))
+    assert auto_range.update(np.zeros((4, 4), dtype=np.uint16)) == (200, 201)
+
+
+def test_empty_mat_uses_whole_scale():
+    auto_range = AutoRange("rolling")
+    assert auto_range.update(np.zeros((16, 16), dtype=np.uint16)) == (0, ADC_LEVELS - 1)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from auto_trigger import LoadTrigger, PreTriggerBuffer
+from data_types import RAW_DTYPE
+
+
+def noise(rng, shape=(16, 16)):
+    return rng.integers(0, 40, size=shape).astype(RAW_DTYPE)
+
+
+def test_press_is_recorded_from_before_it_started():
+    # 60 frames/sec: 5 s of noise, a press from 5 s to 8 s, then noise again
+    fps = 60
+    rng = np.random.default_rng(0)
+    buffer = PreTriggerBuffer(seconds=2.0)
+    trigger = LoadTrigger("peak", threshold=200, quiet_seconds=3.0)
+    recorded: list[int] = []
+    events: list[tuple[str, float]] = []
+    recording = False
+    for i in range(15 * fps):
+        timestamp = i / fps
+        frame = noise(rng)
+        if 5 <= timestamp < 8:
+            frame[6:10, 6:10] = 600
+        event = trigger.update(frame, timestamp)
+        if event is not None:
+            events.append((event, timestamp))
+        if event == "start":
+            recording = True
+            recorded += [sequence for _, _, sequence in buffer.drain(timestamp)]
+        if recording:
+            recorded.append(i)
+        else:
+            buffer.push(frame, timestamp, i)
+        if event == "stop":
+            recording = False
+
+    # Started within a few frames of the press (the load is averaged), and stopped after the quiet period
+    assert [event for event, _ in events] == ["start", "stop"]
+    assert events[0][1] == pytest.approx(5.0, abs=4 / fps)
+    assert events[1][1] == pytest.approx(8.0 + 3.0, abs=4 / fps)
+    # The recording has the 2 pre-trigger seconds, and no frame is missing
+    assert recorded[0] / fps == pytest.approx(events[0][1] - 2.0, abs=1 / fps)
+    assert recorded[-1] / fps == events[1][1]
+    assert recorded == list(range(recorded[0], recorded[-1] + 1))
+
+
+def test_one_noisy_frame_does_not_start():
+    trigger = LoadTrigger("peak", threshold=200, smoothing_frames=4)
+    rng = np.random.default_rng(0)
+    for i in range(10):
+        frame = noise(rng)
+        if i == 5:
+            frame[0, 0] = 600
+        assert trigger.update(frame, i / 60) is None
+
+
+def test_total_load():
+    # The mean reading: a quarter of the cells at 800 is a load of 200
+    trigger = LoadTrigger("total", threshold=200, smoothing_frames=1)
+    frame = np.zeros((16, 16), dtype=RAW_DTYPE)
+    frame[:8, :8] = 796
+    assert trigger.update(frame, 0.0) is None
+    frame[:8, :8] = 800
+    assert trigger.update(frame, 0.1) == "start" and trigger.load == 200
+
+
+def test_load_back_above_release_level_keeps_recording():
+    trigger = LoadTrigger("peak", threshold=200, quiet_seconds=1.0, smoothing_frames=1)
+    loaded = np.full((4, 4), 300, dtype=RAW_DTYPE)
+    light = np.full((4, 4), 170, dtype=RAW_DTYPE) # above RELEASE_FRACTION * threshold
+    quiet = np.zeros((4, 4), dtype=RAW_DTYPE)
+    assert trigger.update(loaded, 0.0) == "start"
+    assert trigger.update(light, 5.0) is None
+    assert trigger.update(quiet, 5.5) is None
+    assert trigger.update(quiet, 6.0) == "stop" and not trigger.active
+
+
+def test_buffer_keeps_the_last_seconds():
+    buffer = PreTriggerBuffer(seconds=1.0, rows=2, cols=2, max_frames_per_second=10)
+    for i in range(25):
+        buffer.push(np.full((2, 2), i, dtype=RAW_DTYPE), i / 10, i)
+    assert buffer.capacity == 10 and buffer.count == 10
+    frames = [(int(frame[0, 0]), sequence) for frame, _, sequence in buffer.drain(2.4)]
+    assert frames == [(i, i) for i in range(15, 25)]
+    assert buffer.count == 0 and list(buffer.drain(2.4)) == []
+
+
+def test_growing_keeps_the_frames():
+    buffer = PreTriggerBuffer(seconds=0.5, rows=2, cols=2, max_frames_per_second=10)
+    for i in range(12):
+        buffer.push(np.full((2, 2), i, dtype=RAW_DTYPE), i / 10, i)
+    buffer.set_seconds(2.0)
+    assert buffer.capacity == 20 and buffer.count == 5
+    for i in range(12, 15):
+        buffer.push(np.full((2, 2), i, dtype=RAW_DTYPE), i / 10, i)
+    assert [sequence for _, _, sequence in buffer.drain(1.4)] == list(range(7, 15))
+
+
+def test_shrinking_only_drains_the_last_seconds():
+    buffer = PreTriggerBuffer(seconds=2.0, rows=2, cols=2, max_frames_per_second=10)
+    for i in range(20):
+        buffer.push(np.full((2, 2), i, dtype=RAW_DTYPE), i / 10, i)
+    buffer.set_seconds(0.5)
+    assert [sequence for _, _, sequence in buffer.drain(1.9)] == list(range(14, 20))
+
+
+def test_frame_of_another_size_empties_the_buffer():
+    buffer = PreTriggerBuffer(seconds=1.0, rows=2, cols=2, max_frames_per_second=10)
+    buffer.push(np.zeros((2, 2), dtype=RAW_DTYPE), 0.0, 0)
+    buffer.push(np.ones((3, 4), dtype=RAW_DTYPE), 0.1, 1)
+    drained = list(buffer.drain(0.1))
+    assert len(drained) == 1 and drained[0][0].shape == (3, 4) and drained[0][2] == 1
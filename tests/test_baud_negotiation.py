@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from baud_negotiation import NEGOTIATE_BAUD_SIGNAL, BaudRateLostError, negotiate_baud_rate, try_baud_rate
+from frame_acquisition import FrameAcquirer
+
+
+def assert_frames_arrive(stand_in, serialcomm):
+    frame = np.random.default_rng(0).integers(0, 1024, size=(16, 16), dtype=np.uint16)
+    stand_in.frame_values = lambda: frame
+    assert np.array_equal(FrameAcquirer(b'\x01').get_frame(serialcomm), frame)
+
+
+@pytest.mark.parametrize("max_baud_rate", [500000, 1000000])
+def test_fastest_working_rate_is_kept(connect_stand_in, max_baud_rate):
+    stand_in, serialcomm = connect_stand_in(max_baud_rate=max_baud_rate)
+    result = negotiate_baud_rate(serialcomm)
+    assert result.baud_rate == max_baud_rate == serialcomm.baudrate == stand_in.baud_rate
+    assert result.bytes_per_second > 0
+    assert_frames_arrive(stand_in, serialcomm)
+
+
+def test_older_firmware_keeps_the_starting_rate(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(supports_baud_negotiation=False)
+    result = negotiate_baud_rate(serialcomm)
+    assert result.baud_rate == 115200 == stand_in.baud_rate
+    assert result.bytes_per_second is None
+    assert_frames_arrive(stand_in, serialcomm)
+
+
+def test_lost_confirmation_is_noticed(connect_stand_in):
+    # The Arduino keeps each new rate, but its acknowledgement never arrives
+    stand_in, serialcomm = connect_stand_in(loses_baud_confirmation=True)
+    result = negotiate_baud_rate(serialcomm)
+    assert result.baud_rate == 1000000 == serialcomm.baudrate == stand_in.baud_rate
+    assert_frames_arrive(stand_in, serialcomm)
+
+
+class _SilentAfterAcknowledging:
+    # A serial port whose Arduino acknowledges the new rate, then never answers again at any rate
+    def __init__(self) -> None:
+        self.baudrate = 115200
+        self.timeout = 1.0
+        self._replies = [NEGOTIATE_BAUD_SIGNAL]
+
+    def write(self, data: bytes):
+        pass
+
+    def read(self, num_bytes: int) -> bytes:
+        return self._replies.pop(0) if self._replies else b""
+
+    def reset_input_buffer(self):
+        pass
+
+
+def test_lost_arduino_raises():
+    serialcomm = _SilentAfterAcknowledging()
+    with pytest.raises(BaudRateLostError):
+        try_baud_rate(serialcomm, 500000)
+    assert serialcomm.baudrate == 115200
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import colormaps
+from colormaps import ADC_LEVELS, ColormapLUT, apply_colormap, available_colormaps, register_colormap
+
+
+def float_path(raw, colormap, low, high):
+    normalized = (raw - low) / (high - low)
+    return (apply_colormap(normalized, colormap) * 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('colormap', ['viridis', 'plasma', 'inferno', 'magma', 'cividis'])
+@pytest.mark.parametrize('rows, cols', [(16, 16), (12, 20), (64, 64)])
+@pytest.mark.parametrize('low, high', [(200.0, 1000.0), (0.0, 1023.0), (512.5, 600.25)])
+def test_lut_matches_float_path(colormap, rows, cols, low, high):
+    raw = np.random.default_rng(0).integers(0, ADC_LEVELS, size=(rows, cols), dtype=np.uint16)
+    out = np.empty((rows, cols, 3), dtype=np.uint8)
+    colored = ColormapLUT().apply(raw, colormap, low, high, out=out)
+    assert colored is out
+    assert np.array_equal(colored, float_path(raw, colormap, low, high))
+
+
+def test_table_only_rebuilt_when_range_changes():
+    lut = ColormapLUT()
+    raw = np.arange(ADC_LEVELS, dtype=np.uint16)
+    lut.apply(raw, 'inferno', 200, 1000)
+    lut.apply(raw, 'inferno', 200, 1000)
+    assert lut.rebuilds == 1
+    lut.apply(raw, 'inferno', 200, 900)
+    lut.apply(raw, 'viridis', 200, 900)
+    assert lut.rebuilds == 3
+
+
+def test_readings_outside_range_get_end_colors():
+    lut = ColormapLUT()
+    table = lut.get_table('inferno', 200, 1000)
+    colored = lut.apply(np.array([0, 200, 1000, 1023, 5000], dtype=np.uint16), 'inferno', 200, 1000)
+    assert np.array_equal(colored[0], table[0]) and np.array_equal(colored[1], table[0])
+    assert np.array_equal(colored[2], table[-1]) and np.array_equal(colored[4], table[-1])
+
+
+def test_registered_colormap(monkeypatch):
+    # Keep the registration out of the module's registry
+    monkeypatch.setattr(colormaps, '_colormaps', dict(colormaps._colormaps))
+    monkeypatch.setattr(colormaps, '_colormaps_uint8', dict(colormaps._colormaps_uint8))
+    register_colormap('test_gray', np.array([[0, 0, 0], [255, 255, 255]], dtype=np.uint8))
+    assert 'test_gray' in available_colormaps()
+    colored = ColormapLUT().apply(np.array([0, 1023], dtype=np.uint16), 'test_gray', 0, 1023)
+    assert np.array_equal(colored, [[0, 0, 0], [255, 255, 255]])
+    with pytest.raises(ValueError):
+        register_colormap('bad', np.zeros((5, 2)))
+
+
+def test_unknown_colormap():
+    with pytest.raises(ValueError):
+        ColormapLUT().get_table('not_a_colormap', 0, 1)
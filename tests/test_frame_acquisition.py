@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from frame_acquisition import FrameAcquirer
+
+GET_DATA_SIGNAL = b'\x01'
+
+
+def fixed_frame(seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 1024, size=(16, 16), dtype=np.uint16)
+
+
+def send_frame(stand_in, frame: np.ndarray):
+    # Make the stand-in send 'frame' from now on, instead of its moving wave
+    stand_in.frame_values = lambda: frame
+
+
+@pytest.mark.parametrize("wire_format", ["uint16", "packed10"])
+@pytest.mark.parametrize("mode", ["lock-step", "pipelined"])
+def test_requested_frames(connect_stand_in, mode, wire_format):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False)
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    for _ in range(5):
+        assert np.array_equal(acquirer.get_frame(serialcomm, mode, wire_format), frame)
+    assert acquirer.wire_format == wire_format
+    assert acquirer.request_in_flight == (mode == "pipelined")
+
+
+def test_switching_from_pipelined_reads_the_request_in_flight(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False)
+    send_frame(stand_in, fixed_frame())
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    acquirer.get_frame(serialcomm, "pipelined")
+    frame = fixed_frame(1)
+    send_frame(stand_in, frame) # the frame in flight may already be the new one
+    acquirer.get_frame(serialcomm, "lock-step")
+    assert np.array_equal(acquirer.get_frame(serialcomm, "lock-step"), frame)
+    assert not acquirer.request_in_flight
+
+
+@pytest.mark.parametrize("wire_format", ["uint16", "packed10", "delta"])
+def test_streaming(connect_stand_in, wire_format):
+    stand_in, serialcomm = connect_stand_in()
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    for _ in range(5):
+        assert np.array_equal(acquirer.get_frame(serialcomm, "streaming", wire_format), frame)
+    parser = acquirer.stream_parser
+    assert parser.frames_received >= 5 and parser.frames_corrupted == 0
+
+    # Back to requesting frames: the stream is stopped and nothing left of it is read as a frame
+    assert np.array_equal(acquirer.get_frame(serialcomm, "lock-step", wire_format), frame)
+    assert not acquirer.streaming
+
+
+def test_streaming_resyncs_after_lost_bytes(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False, byte_loss_rate=0.0005)
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    for _ in range(100):
+        assert np.array_equal(acquirer.get_frame(serialcomm, "streaming"), frame)
+    parser = acquirer.stream_parser
+    assert parser.frames_dropped > 0 and parser.frames_received > 0
+
+
+def test_region_of_interest(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False)
+    full = fixed_frame()
+    send_frame(stand_in, full)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    acquirer.get_frame(serialcomm, "lock-step")
+
+    changed = fixed_frame(1)
+    send_frame(stand_in, changed)
+    expected = full.copy()
+    expected[4:8, 3:8] = changed[4:8, 3:8] # only the window is scanned again
+    assert np.array_equal(acquirer.get_frame(serialcomm, "lock-step", roi=(4, 3, 4, 5)), expected)
+    assert acquirer.roi_supported
+
+
+def test_region_of_interest_on_older_firmware(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False, supports_roi=False)
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    assert np.array_equal(acquirer.get_frame(serialcomm, "pipelined", roi=(4, 3, 4, 5)), frame)
+    assert acquirer.roi_supported is False
+    assert np.array_equal(acquirer.get_frame(serialcomm, "pipelined", roi=(4, 3, 4, 5)), frame)
+
+
+def test_wire_format_on_older_firmware(connect_stand_in):
+    stand_in, serialcomm = connect_stand_in(realistic_timing=False, supports_packed_format=False)
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    assert np.array_equal(acquirer.get_frame(serialcomm, "lock-step", "packed10"), frame)
+    assert acquirer.wire_format == "uint16"
+
+
+def test_late_reply_after_a_timeout_is_thrown_away(connect_stand_in):
+    # A frame that times out arrives later. It must not be read as the header of the next frame.
+    stand_in, serialcomm = connect_stand_in()
+    frame = fixed_frame()
+    send_frame(stand_in, frame)
+    acquirer = FrameAcquirer(GET_DATA_SIGNAL)
+    for _ in range(3):
+        acquirer.get_frame(serialcomm, "pipelined")
+        serialcomm.timeout = 0.02 # shorter than a frame takes
+        acquirer.get_frame(serialcomm, "pipelined")
+        assert acquirer.resync_needed
+        serialcomm.timeout = 2
+        for _ in range(3):
+            assert np.array_equal(acquirer.get_frame(serialcomm, "pipelined"), frame)
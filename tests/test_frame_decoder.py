@@ -0,0 +1,96 @@
+import io
+
+import numpy as np
+import pytest
+
+from frame_decoder import (
+    WIRE_DTYPE, DeltaFrameDecoder, FrameDecoder, Packed10Unpacker, encode_delta_frame, pack_10bit, wire_body_size,
+)
+
+
+def wire_values(values: np.ndarray, wire_format: str) -> bytes:
+    if wire_format == "packed10":
+        return pack_10bit(values)
+    return values.astype(WIRE_DTYPE).tobytes()
+
+
+@pytest.mark.parametrize("wire_format", ["uint16", "packed10"])
+@pytest.mark.parametrize("shape", [(16, 16), (4, 5), (1, 3), (64, 64)])
+def test_read_frame_round_trip(wire_format, shape):
+    values = np.random.default_rng(0).integers(0, 1024, size=shape, dtype=np.uint16)
+    decoder = FrameDecoder()
+    decoder.wire_format = wire_format
+    wire = np.array(shape, dtype=WIRE_DTYPE).tobytes() + wire_values(values, wire_format)
+    assert len(wire) == 4 + wire_body_size(values.size, wire_format)
+    assert np.array_equal(decoder.read_frame(io.BytesIO(wire)), values)
+    assert not decoder.timed_out
+
+
+def test_frames_of_changing_size_reuse_nothing_stale():
+    rng = np.random.default_rng(1)
+    decoder = FrameDecoder()
+    for shape in [(16, 16), (4, 5), (16, 16)]:
+        values = rng.integers(0, 1024, size=shape, dtype=np.uint16)
+        wire = np.array(shape, dtype=WIRE_DTYPE).tobytes() + wire_values(values, "uint16")
+        assert np.array_equal(decoder.read_frame(io.BytesIO(wire)), values)
+
+
+def test_timed_out_read_leaves_missing_values_zero():
+    values = np.arange(1, 17, dtype=np.uint16).reshape(4, 4)
+    wire = np.array([4, 4], dtype=WIRE_DTYPE).tobytes() + wire_values(values, "uint16")
+    decoder = FrameDecoder()
+    frame = decoder.read_frame(io.BytesIO(wire[:4 + 2 * 10])) # only 10 of the 16 values arrived
+    assert decoder.timed_out
+    assert np.array_equal(frame.reshape(-1)[:10], values.reshape(-1)[:10])
+    assert not frame.reshape(-1)[10:].any()
+
+    assert decoder.read_header(io.BytesIO(b"\x04")) == (0, 0)
+    assert decoder.timed_out
+
+
+def test_roi_window_is_merged_into_full_frame():
+    rng = np.random.default_rng(2)
+    full = rng.integers(0, 1024, size=(16, 16), dtype=np.uint16)
+    window = rng.integers(0, 1024, size=(4, 5), dtype=np.uint16)
+    decoder = FrameDecoder()
+    decoder.read_frame(io.BytesIO(np.array([16, 16], dtype=WIRE_DTYPE).tobytes() + wire_values(full, "uint16")))
+
+    wire = np.array([16, 16, 4, 3, 4, 5], dtype=WIRE_DTYPE).tobytes() + wire_values(window, "uint16")
+    serialcomm = io.BytesIO(wire)
+    frame = decoder.read_roi_body(serialcomm, *decoder.read_roi_header(serialcomm))
+    expected = full.copy()
+    expected[4:8, 3:8] = window
+    assert np.array_equal(frame, expected)
+
+
+def test_roi_header_that_does_not_fit_is_rejected():
+    wire = np.array([16, 16, 14, 0, 4, 5], dtype=WIRE_DTYPE).tobytes()
+    assert FrameDecoder().read_roi_header(io.BytesIO(wire)) == (0, 0, 0, 0)
+
+
+def test_packed10_unpacks_every_value():
+    values = np.arange(1024, dtype=np.uint16)
+    out = np.zeros(1024, dtype=np.uint16)
+    packed = np.frombuffer(pack_10bit(values), dtype=np.uint8)
+    assert np.array_equal(Packed10Unpacker().unpack(packed, out), values)
+
+
+def test_delta_frames_round_trip():
+    rng = np.random.default_rng(3)
+    previous = rng.integers(0, 1024, size=(16, 16), dtype=np.uint16)
+    frame = previous.copy()
+    frame[3, 4] += 5 # small change
+    frame[7, 7] = 1023 - frame[7, 7] # large change
+    delta_decoder = DeltaFrameDecoder()
+
+    key_payload = np.frombuffer(encode_delta_frame(previous, None), dtype=np.uint8)
+    assert delta_decoder.is_key_frame(key_payload, previous.size)
+    working = np.zeros(previous.size, dtype=np.uint16)
+    assert delta_decoder.apply(key_payload, working)
+    assert np.array_equal(working, previous.reshape(-1))
+
+    payload = np.frombuffer(encode_delta_frame(frame, previous), dtype=np.uint8)
+    assert not delta_decoder.is_key_frame(payload, frame.size)
+    assert len(payload) < 20
+    assert delta_decoder.apply(payload, working)
+    assert np.array_equal(working, frame.reshape(-1))
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import numpy as np
+
+from data_types import RAW_DTYPE
+from frame_ring_buffer import FrameRingBuffer
+
+
+def test_empty_ring_has_no_frame():
+    assert FrameRingBuffer().read_newest() is None
+
+
+def test_newest_frame_is_read():
+    ring = FrameRingBuffer(capacity=4, rows=2, cols=3)
+    for value in range(10):
+        sequence = ring.write(np.full((2, 3), value, dtype=RAW_DTYPE), timestamp=100.0 + value)
+        assert sequence == value
+    frame, sequence, timestamp = ring.read_newest()
+    assert sequence == 9 and timestamp == 109.0
+    assert np.array_equal(frame, np.full((2, 3), 9)) and frame.dtype == RAW_DTYPE
+
+
+def test_frame_size_change():
+    ring = FrameRingBuffer(rows=16, cols=16)
+    ring.write(np.ones((16, 16), dtype=RAW_DTYPE))
+    ring.write(np.full((4, 5), 7, dtype=RAW_DTYPE))
+    assert ring.shape == (4, 5)
+    out = np.zeros((16, 16), dtype=RAW_DTYPE)
+    frame, sequence, _ = ring.read_newest(out)
+    assert sequence == 1 and np.array_equal(frame, np.full((4, 5), 7))
+
+
+def test_no_torn_reads_under_load():
+    # A writer filling a small ring as fast as it can, and a reader checking every frame it gets.
+    # Every value of a frame is the same, and equal to its sequence number, so a torn frame shows up.
+    ring = FrameRingBuffer(capacity=2, rows=16, cols=16)
+    stop = threading.Event()
+
+    def writer():
+        frame = np.zeros((16, 16), dtype=RAW_DTYPE)
+        while not stop.is_set():
+            frame.fill(ring.frames_written & 0x3FF)
+            ring.write(frame)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = 0
+    bad_frames = 0
+    out = np.zeros((16, 16), dtype=RAW_DTYPE)
+    try:
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.5:
+            result = ring.read_newest(out)
+            if result is None:
+                continue
+            frame, sequence, _ = result
+            reads += 1
+            if frame.min() != frame.max() or frame[0, 0] != sequence & 0x3FF:
+                bad_frames += 1
+    finally:
+        stop.set()
+        thread.join()
+    assert reads > 0
+    assert bad_frames == 0
@@ -0,0 +1,176 @@
+import struct
+
+import numpy as np
+import pytest
+
+from frame_decoder import SYNC_WORD, WIRE_DTYPE, FrameStreamParser, encode_delta_frame, pack_10bit
+
+
+def stream_frame(sequence: int, values: np.ndarray, wire_format: str = "uint16") -> bytes:
+    # A streamed frame as the Arduino sends it (see 'send_stream_frame' in 'arduino_stand_in.py')
+    rows, cols = values.shape
+    body = pack_10bit(values) if wire_format == "packed10" else values.astype(WIRE_DTYPE).tobytes()
+    checksum = (sequence + rows + cols + int(values.sum())) & 0xFFFF
+    return SYNC_WORD + struct.pack("<HHH", sequence & 0xFFFF, rows, cols) + body + struct.pack("<H", checksum)
+
+
+def random_frames(count: int, shape=(16, 16), seed: int = 0) -> list[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 1024, size=shape, dtype=np.uint16) for _ in range(count)]
+
+
+@pytest.mark.parametrize("wire_format", ["uint16", "packed10"])
+def test_frames_split_across_reads(wire_format):
+    frames = random_frames(5)
+    parser = FrameStreamParser()
+    parser.wire_format = wire_format
+    data = b"".join(stream_frame(sequence, frame, wire_format) for sequence, frame in enumerate(frames))
+    received = []
+    for i in range(0, len(data), 7): # a few bytes at a time
+        if parser.feed(data[i:i + 7]):
+            received.append(parser.frame.copy())
+    assert len(received) == len(frames)
+    assert all(np.array_equal(got, sent) for got, sent in zip(received, frames))
+    assert parser.frames_received == 5 and parser.frames_dropped == 0 and parser.frames_corrupted == 0
+
+
+def test_only_the_newest_frame_is_kept():
+    frames = random_frames(3)
+    parser = FrameStreamParser()
+    assert parser.feed(b"".join(stream_frame(sequence, frame) for sequence, frame in enumerate(frames)))
+    assert np.array_equal(parser.frame, frames[-1])
+    assert parser.sequence == 2 and parser.frames_skipped == 2
+
+
+def test_missing_sequence_numbers_count_as_dropped():
+    frames = random_frames(2)
+    parser = FrameStreamParser()
+    parser.feed(stream_frame(0xFFFE, frames[0]))
+    parser.feed(stream_frame(3, frames[1])) # 0xFFFF, 0, 1 and 2 are missing (the sequence wraps around)
+    assert parser.frames_dropped == 4
+
+
+def test_corrupted_frame_is_skipped():
+    frames = random_frames(3)
+    corrupted = bytearray(stream_frame(1, frames[1]))
+    corrupted[40] ^= 0x01
+    parser = FrameStreamParser()
+    parser.feed(stream_frame(0, frames[0]))
+    assert parser.feed(bytes(corrupted) + stream_frame(2, frames[2]))
+    assert np.array_equal(parser.frame, frames[2])
+    assert parser.frames_corrupted == 1 and parser.frames_dropped == 1
+
+
+def test_resyncs_after_lost_and_flipped_bytes():
+    # Every frame passes the checksum or is dropped: the parser never returns a damaged frame
+    frames = random_frames(200, seed=1)
+    rng = np.random.default_rng(2)
+    data = bytearray()
+    for sequence, frame in enumerate(frames):
+        wire = bytearray(stream_frame(sequence, frame))
+        if sequence % 10 == 3:
+            del wire[rng.integers(len(wire))] # a lost byte
+        elif sequence % 10 == 7:
+            wire[rng.integers(len(wire))] ^= 1 << int(rng.integers(8)) # a flipped bit
+        data += wire
+    parser = FrameStreamParser()
+    for i in range(0, len(data), 64):
+        if parser.feed(bytes(data[i:i + 64])):
+            assert np.array_equal(parser.frame, frames[parser.sequence])
+    assert parser.frames_received >= 150
+    assert parser.frames_received + parser.frames_dropped == len(frames)
+
+
+def test_garbage_before_the_first_frame_is_discarded():
+    frame = random_frames(1)[0]
+    parser = FrameStreamParser()
+    assert parser.feed(bytes(range(0x10, 0x90)) + stream_frame(0, frame))
+    assert np.array_equal(parser.frame, frame)
+    assert parser.bytes_discarded == 0x80
+
+
+def test_false_header_of_another_size_is_skipped_at_once():
+    # Once the stream's frame size is known, a sync word with another size can't start a frame
+    frames = random_frames(2)
+    parser = FrameStreamParser()
+    parser.feed(stream_frame(0, frames[0]))
+    assert parser.frame_shape == (16, 16)
+    false_header = SYNC_WORD + struct.pack("<HHH", 1, 8, 8)
+    assert parser.feed(false_header + stream_frame(1, frames[1]))
+    assert np.array_equal(parser.frame, frames[1])
+
+
+def test_false_header_does_not_grow_the_buffer():
+    frame = random_frames(1)[0]
+    parser = FrameStreamParser(buffer_size=1024)
+    huge_header = SYNC_WORD + struct.pack("<HHH", 0, 1000, 1000)
+    assert parser.feed(huge_header + stream_frame(0, frame))
+    assert np.array_equal(parser.frame, frame)
+    assert len(parser._buffer) == 1024
+
+
+def test_reset_forgets_the_frame_size():
+    frames = random_frames(1) + random_frames(1, shape=(4, 5))
+    parser = FrameStreamParser()
+    parser.feed(stream_frame(0, frames[0]))
+    parser.reset()
+    assert parser.feed(stream_frame(0, frames[1]))
+    assert np.array_equal(parser.frame, frames[1])
+
+
+def delta_stream_frame(sequence: int, values: np.ndarray, previous: np.ndarray | None) -> bytes:
+    # A streamed delta frame (a key frame if 'previous' is None). The checksum is of the reconstructed values.
+    rows, cols = values.shape
+    payload = encode_delta_frame(values, previous)
+    checksum = (sequence + rows + cols + len(payload) + int(values.sum())) & 0xFFFF
+    return (SYNC_WORD + struct.pack("<HHHH", sequence & 0xFFFF, rows, cols, len(payload)) + payload
+            + struct.pack("<H", checksum))
+
+
+def slowly_changing_frames(count: int) -> list[np.ndarray]:
+    frames = random_frames(1, seed=3)
+    for i in range(1, count):
+        frame = frames[-1].copy()
+        frame[i % 16, (3 * i) % 16] = (frame[i % 16, (3 * i) % 16] + 7) % 1024
+        frames.append(frame)
+    return frames
+
+
+def delta_parser() -> FrameStreamParser:
+    parser = FrameStreamParser()
+    parser.wire_format = "delta"
+    return parser
+
+
+def test_delta_frames_are_reconstructed():
+    frames = slowly_changing_frames(10)
+    parser = delta_parser()
+    for sequence, frame in enumerate(frames):
+        previous = frames[sequence - 1] if sequence > 0 else None
+        assert parser.feed(delta_stream_frame(sequence, frame, previous))
+        assert np.array_equal(parser.frame, frame)
+    assert parser.frames_received == 10 and not parser.key_frame_needed
+
+
+def test_delta_frames_after_a_lost_frame_wait_for_a_key_frame():
+    frames = slowly_changing_frames(6)
+    parser = delta_parser()
+    parser.feed(delta_stream_frame(0, frames[0], None) + delta_stream_frame(1, frames[1], frames[0]))
+    # Frame 2 is lost. Frames 3 and 4 can't be applied, and are skipped once the frame after each one starts.
+    assert not parser.feed(delta_stream_frame(3, frames[3], frames[2]) + delta_stream_frame(4, frames[4], frames[3]))
+    assert parser.key_frame_needed and parser.delta_frames_discarded == 1
+    assert parser.feed(delta_stream_frame(5, frames[5], None))
+    assert np.array_equal(parser.frame, frames[5])
+    assert parser.delta_frames_discarded == 2 and parser.frames_dropped == 3
+
+
+def test_false_delta_header_does_not_swallow_the_next_frame():
+    # The false header's payload length reaches into the real frame after it. The real frame isn't skipped.
+    frames = slowly_changing_frames(3)
+    parser = delta_parser()
+    parser.feed(delta_stream_frame(0, frames[0], None))
+    false_header = SYNC_WORD + struct.pack("<HHHH", 7, 16, 16, 6)
+    assert parser.feed(false_header + delta_stream_frame(1, frames[1], frames[0]))
+    assert np.array_equal(parser.frame, frames[1])
+    assert parser.feed(delta_stream_frame(2, frames[2], frames[1]))
+    assert parser.delta_frames_discarded == 0 and not parser.key_frame_needed and parser.frames_dropped == 0
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from heatmap_geometry import HeatmapGeometry
+
+
+def original(cells_rgb: np.ndarray, canvas_size: tuple[int, int], rotation: int, mirror: bool) -> np.ndarray:
+    # The code from 'draw_heatmap' before the index maps
+    heatmap_image = cells_rgb
+    if rotation == 90:
+        heatmap_image = np.rot90(heatmap_image)
+    elif rotation == 180:
+        heatmap_image = np.rot90(heatmap_image, 2)
+    elif rotation == 270:
+        heatmap_image = np.rot90(heatmap_image, 3)
+    if mirror:
+        heatmap_image = np.fliplr(heatmap_image)
+    rows, cols = heatmap_image.shape[:2]
+    canvas_width, canvas_height = canvas_size
+    canvas_aspect_ratio = canvas_width / canvas_height
+    if canvas_aspect_ratio > 1.0:
+        cell_height = int(canvas_height / rows)
+        cell_width = int(cell_height / 1.0)
+    else:
+        cell_width = int(canvas_width / cols)
+        cell_height = int(cell_width * 1.0)
+    heatmap_image = np.repeat(heatmap_image, cell_width, axis=1)
+    heatmap_image = np.repeat(heatmap_image, cell_height, axis=0)
+    heatmap_image = np.ascontiguousarray(heatmap_image)
+    leftover_height = canvas_height - (cell_height * rows)
+    leftover_width = canvas_width - (cell_width * cols)
+    pixels_to_add = leftover_height if canvas_aspect_ratio > 1.0 else leftover_width
+    for pixel in range(pixels_to_add):
+        i = pixel * cell_height + int(cell_height/2)
+        j = pixel * cell_width + int(cell_width/2)
+        heatmap_image = np.insert(heatmap_image, i, heatmap_image[i, :], axis=0)
+        heatmap_image = np.insert(heatmap_image, j, heatmap_image[:, j], axis=1)
+    return heatmap_image
+
+
+@pytest.mark.parametrize('frame_shape', [(16, 16), (12, 20)])
+@pytest.mark.parametrize('canvas_size', [(400, 400), (517, 389), (389, 517), (1003, 771)])
+@pytest.mark.parametrize('rotation', [0, 90, 180, 270])
+@pytest.mark.parametrize('mirror', [False, True])
+def test_same_image_as_original(frame_shape, canvas_size, rotation, mirror):
+    cells_rgb = np.random.default_rng(0).integers(0, 256, size=frame_shape + (3,), dtype=np.uint8)
+    geometry = HeatmapGeometry()
+    geometry.update(frame_shape, canvas_size, rotation, mirror)
+    assert np.array_equal(geometry.render(cells_rgb), original(cells_rgb, canvas_size, rotation, mirror))
+
+    # Redrawing a changed region gives the same image as redrawing everything
+    changed = cells_rgb.copy()
+    changed[2:5, 3:9] = 255 - changed[2:5, 3:9]
+    geometry.render_region(changed, (2, 5, 3, 9))
+    assert np.array_equal(geometry.image, original(changed, canvas_size, rotation, mirror))
+
+
+def test_index_maps_only_rebuilt_on_change():
+    geometry = HeatmapGeometry()
+    assert geometry.update((16, 16), (400, 400), 0, False)
+    assert not geometry.update((16, 16), (400, 400), 0, False)
+    assert geometry.update((16, 16), (400, 400), 90, False)
+    assert geometry.rebuilds == 2
+    assert geometry.frame_shape == (16, 16)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from colormaps import ADC_LEVELS
+from heatmap_interpolation import HeatmapInterpolator, interpolation_weights
+
+
+@pytest.mark.parametrize('method', ['bilinear', 'bicubic'])
+def test_linear_ramp_is_reproduced(method):
+    # Away from the edges, where the repeated edge cells bend it
+    ramp = np.add.outer(np.arange(16), np.arange(16)).astype(np.uint16) * 20
+    smooth = HeatmapInterpolator().interpolate(ramp, 4, method).astype(np.float64)
+    positions = (np.arange(64) + 0.5) / 4 - 0.5
+    expected = np.add.outer(positions, positions) * 20
+    inner = slice(8, -8)
+    assert np.allclose(smooth[inner, inner], np.rint(expected[inner, inner]), atol=1)
+
+
+@pytest.mark.parametrize('method', ['bilinear', 'bicubic'])
+@pytest.mark.parametrize('level', [2, 4, 8])
+def test_weights_sum_to_one(method, level):
+    weights = interpolation_weights(12, level, method)
+    assert weights.shape == (12 * level, 12)
+    assert np.allclose(weights.sum(axis=1), 1, atol=1e-6)
+
+
+@pytest.mark.parametrize('method', ['bilinear', 'bicubic'])
+def test_output_is_clipped_to_adc_range(method):
+    # A single peak makes bicubic overshoot below zero around it
+    frame = np.zeros((16, 20), dtype=np.uint16)
+    frame[8, 10] = ADC_LEVELS - 1
+    smooth = HeatmapInterpolator().interpolate(frame, 4, method)
+    assert smooth.shape == (64, 80) and smooth.dtype == np.uint16
+    assert smooth.max() <= ADC_LEVELS - 1 and smooth.max() > 0
+
+
+def test_level_one_returns_frame():
+    frame = np.ones((16, 16), dtype=np.uint16)
+    assert HeatmapInterpolator().interpolate(frame, 1) is frame
+
+
+def test_weights_only_rebuilt_on_change():
+    interpolator = HeatmapInterpolator()
+    frame = np.ones((16, 16), dtype=np.uint16)
+    interpolator.interpolate(frame, 4, 'bicubic')
+    interpolator.interpolate(frame, 4, 'bicubic')
+    assert interpolator.rebuilds == 1
+    interpolator.interpolate(frame, 2, 'bicubic')
+    assert interpolator.rebuilds == 2
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        interpolation_weights(16, 4, 'nearest')
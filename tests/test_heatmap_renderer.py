@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from heatmap_renderer import HeatmapRenderContext
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 1024, size=(16, 16), dtype=np.uint16)
+
+
+def render_image(frame, canvas_size, render_threads, interp_level=4, interp_method="bicubic"):
+    context = HeatmapRenderContext(render_threads=render_threads)
+    try:
+        context.update_geometry(frame.shape, canvas_size, 90, False, interp_level)
+        return context.render(frame, 100, 1000, interp_level, interp_method).copy()
+    finally:
+        context.close()
+
+
+@pytest.mark.parametrize('canvas_size', [(400, 400), (950, 700), (1920, 1010)])
+def test_tiled_rendering_gives_same_image(frame, canvas_size):
+    expected = render_image(frame, canvas_size, 1)
+    assert expected.shape[:2] == (canvas_size[1], canvas_size[1])
+    for render_threads in (2, 3, 4):
+        assert np.array_equal(render_image(frame, canvas_size, render_threads), expected), render_threads
+
+
+@pytest.mark.parametrize('interp_level, interp_method', [(1, "bicubic"), (4, "bilinear"), (4, "bicubic")])
+def test_render_region_gives_same_image(frame, interp_level, interp_method):
+    context = HeatmapRenderContext()
+    context.update_geometry(frame.shape, (517, 389), 270, True, interp_level)
+    context.render(frame, 100, 1000, interp_level, interp_method, show_values=True)
+    changed = frame.copy()
+    changed[5:7, 9:12] = 1023 - changed[5:7, 9:12]
+    context.render_region(changed, 100, 1000, interp_level, interp_method, (5, 7, 9, 12), show_values=True)
+    full = HeatmapRenderContext()
+    full.update_geometry(frame.shape, (517, 389), 270, True, interp_level)
+    expected = full.render(changed, 100, 1000, interp_level, interp_method, show_values=True)
+    assert np.array_equal(context.image, expected)
+
+
+def test_frames_allocate_little(frame):
+    # After the first frame the buffers are reused, so a frame allocates much less than the image
+    context = HeatmapRenderContext(trace_allocations=True)
+    try:
+        context.update_geometry(frame.shape, (1920, 1010), 90, False, 4)
+        context.render(frame, 100, 1000, 4, "bicubic")
+        for _ in range(5):
+            with context.measure_allocations():
+                context.render(frame, 100, 1000, 4, "bicubic")
+        assert context.max_bytes_allocated < context.image.nbytes // 20
+    finally:
+        context.close()
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+from data_types import RAW_DTYPE
+from raw_recording import HEADER_SIZE, RAW_RECORDING_EXTENSION, RawRecordingReader, RawRecordingWriter
+
+
+@pytest.fixture
+def frames():
+    return np.random.default_rng(0).integers(0, 1024, size=(2500, 16, 16), dtype=np.uint16)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / ("test" + RAW_RECORDING_EXTENSION))
+
+
+def test_round_trip(frames, path):
+    writer = RawRecordingWriter(path, (16, 16))
+    for frame in frames:
+        assert writer.append(frame)
+    assert not writer.append(np.zeros((10, 10), dtype=RAW_DTYPE)) # a different shape isn't recorded
+    writer.close()
+    assert writer.skipped_frames == 1 and writer.frames_written == len(frames)
+    assert not writer.append(frames[0])
+
+    reader = RawRecordingReader(path)
+    assert reader.closed_properly and reader.frame_shape == (16, 16)
+    assert len(reader) == len(frames) and np.array_equal(reader.frames, frames)
+    assert np.all(np.diff(reader.timestamps) >= 0)
+    assert np.array_equal(reader.sequences, np.arange(len(frames)))
+    # The unused end of the last chunk is cut off
+    assert os.path.getsize(path) == HEADER_SIZE + len(frames) * reader.record_dtype.itemsize
+    del reader
+
+
+def test_timestamps_and_sequences_are_kept(path):
+    writer = RawRecordingWriter(path, (2, 3))
+    for i in range(5):
+        writer.append(np.full((2, 3), i, dtype=RAW_DTYPE), timestamp=10.0 + i / 60, sequence=3 * i)
+    writer.close()
+    reader = RawRecordingReader(path)
+    assert np.array_equal(reader.sequences, [0, 3, 6, 9, 12])
+    assert reader.duration == pytest.approx(4 / 60)
+    del reader
+
+
+def test_recording_that_was_not_closed(frames, path):
+    # The App crashed: every frame written is still found, past the count in the header
+    writer = RawRecordingWriter(path, (16, 16))
+    writer._records_per_chunk = 1000
+    for frame in frames:
+        writer.append(frame)
+    writer._release_chunk()
+    reader = RawRecordingReader(path)
+    assert not reader.closed_properly
+    assert len(reader) == len(frames) and np.array_equal(reader.frames, frames)
+    del reader
+
+
+def test_empty_recording(path):
+    RawRecordingWriter(path, (16, 16)).close()
+    reader = RawRecordingReader(path)
+    assert len(reader) == 0 and reader.duration == 0.0
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "other.psraw"
+    path.write_bytes(b"not a recording" * 10)
+    with pytest.raises(ValueError):
+        RawRecordingReader(str(path))
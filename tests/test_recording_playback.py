@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import recording_playback
+from raw_recording import RAW_RECORDING_EXTENSION, RawRecordingWriter
+from recording_playback import MAX_SPEED, RecordingPlayback
+
+
+class FakeClock:
+    # Stands in for the 'time' module, so playback time only moves when the test moves it
+    def __init__(self) -> None:
+        self.now = 5000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(recording_playback, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    # 10 seconds at 60 frames/sec. Each frame is filled with its index.
+    path = str(tmp_path / ("test" + RAW_RECORDING_EXTENSION))
+    writer = RawRecordingWriter(path, (16, 16))
+    for index in range(600):
+        writer.append(np.full((16, 16), index, dtype=np.uint16), timestamp=1000 + index / 60)
+    writer.close()
+    return path
+
+
+def test_seek_and_step_while_paused(path, clock):
+    playback = RecordingPlayback(path, loop=False)
+    playback.set_playing(False)
+    playback.seek_time(5.0)
+    assert playback.index == 300
+    frame, index = playback.next_frame()
+    assert index == 300 and frame[0, 0] == 300
+    playback.step(-1)
+    assert playback.next_frame()[1] == 299
+    assert playback.next_frame() is None # no new frame until the playback moves
+    clock.advance(1)
+    assert playback.next_frame() is None
+    playback.seek(10_000)
+    assert playback.index == 599 and playback.position() == pytest.approx(599 / 60)
+
+
+def test_steps_wrap_around_when_looping(path, clock):
+    playback = RecordingPlayback(path, loop=True)
+    playback.step(-1)
+    assert playback.index == 599
+    playback.step(2)
+    assert playback.index == 1
+
+
+def test_playback_follows_the_timestamps(path, clock):
+    playback = RecordingPlayback(path, loop=False)
+    assert playback.next_frame()[1] == 0
+    clock.advance(0.5)
+    assert playback.next_frame()[1] == 30
+    assert playback.frames_skipped == 29
+    # Slower than the frames were taken: a frame is handed out once, then held
+    playback.set_speed(0.1)
+    clock.advance(1 / 60)
+    assert playback.next_frame() is None
+    clock.advance(10 / 60)
+    assert playback.next_frame()[1] == 31
+
+
+def test_speed_is_clamped(path, clock):
+    playback = RecordingPlayback(path, speed=100)
+    assert playback.speed == MAX_SPEED
+
+
+def test_stops_at_the_end_without_loop(path, clock):
+    playback = RecordingPlayback(path, loop=False)
+    clock.advance(20)
+    assert playback.next_frame()[1] == 599 and not playback.playing
+    # Playing again starts from the beginning
+    playback.set_playing(True)
+    assert playback.next_frame()[1] == 0
+
+
+def test_loops_back_to_the_start(path, clock):
+    playback = RecordingPlayback(path, loop=True)
+    clock.advance(10 + 1 / 60 + 0.5)
+    assert playback.next_frame()[1] == 30 and playback.playing
+
+
+def test_empty_recording(tmp_path):
+    path = tmp_path / ("empty" + RAW_RECORDING_EXTENSION)
+    RawRecordingWriter(str(path), (16, 16)).close()
+    with pytest.raises(ValueError):
+        RecordingPlayback(str(path))
@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pytest
+
+from data_types import RAW_DTYPE
+from raw_recording import RawRecordingReader, RawRecordingWriter
+from recording_writer import QUEUE_POLICIES, RawFrameSink, RecordingWriter, VideoSink
+
+
+class ListSink:
+    # Takes 'seconds' to write each frame. Raises 'fail_with' from write() (and close() if 'fail_close').
+    def __init__(self, seconds: float = 0.0, fail_with: Exception | None = None, fail_close: bool = False) -> None:
+        self.seconds = seconds
+        self.fail_with = fail_with
+        self.fail_close = fail_close
+        self.written: list[int] = []
+        self.released: int = 0
+        self.closed: bool = False
+
+    def prepare(self, value: int) -> int:
+        return value
+
+    def write(self, item: int):
+        time.sleep(self.seconds)
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.written.append(item)
+
+    def release(self, item: int):
+        self.released += 1
+
+    def close(self):
+        self.closed = True
+        if self.fail_close:
+            raise OSError("disk full")
+
+
+@pytest.mark.parametrize('policy', QUEUE_POLICIES)
+def test_slow_sink(policy):
+    # 60 frames at 400 frames/sec into a sink that writes 200 frames/sec, with room for 5 frames
+    writer = RecordingWriter(late_after=10)
+    sink = ListSink(0.005)
+    writer.add_sink("slow", sink, capacity=5, policy=policy)
+    for value in range(60):
+        writer.submit("slow", value)
+        time.sleep(0.0025)
+    writer.close()
+    stats = writer.stats("slow")
+    assert stats.submitted == 60 and stats.written + stats.dropped == 60
+    assert sink.written == sorted(sink.written) and len(sink.written) == stats.written
+    assert sink.released == 60 and sink.closed
+    assert stats.max_queued <= 5 and stats.queued == 0
+    if policy == "block":
+        assert stats.dropped == 0 and stats.blocked_seconds > 0
+    else:
+        assert stats.dropped > 0
+    if policy == "drop-oldest":
+        assert sink.written[-1] == 59
+    if policy == "drop-newest":
+        assert sink.written[:6] == list(range(6))
+
+
+def test_late_frames_are_counted():
+    writer = RecordingWriter(late_after=0.01)
+    writer.add_sink("slow", ListSink(0.02), capacity=10, policy="block")
+    for value in range(5):
+        writer.submit("slow", value)
+    writer.close()
+    assert writer.stats("slow").late >= 3
+
+
+def test_failing_sink_keeps_first_error():
+    writer = RecordingWriter()
+    failing = ListSink(fail_with=OSError("disk full"))
+    working = ListSink()
+    writer.add_sink("failing", failing, policy="block")
+    writer.add_sink("working", working, policy="block")
+    for value in range(10):
+        writer.submit("failing", value)
+        writer.submit("working", value)
+    writer.close()
+    stats = writer.stats("failing")
+    assert stats.dropped == 10 and stats.written == 0
+    assert stats.error == "OSError: disk full"
+    assert working.written == list(range(10)) and writer.stats("working").error is None
+
+
+def test_every_sink_is_closed():
+    # A sink that fails to close doesn't leave the others open
+    writer = RecordingWriter()
+    first, second = ListSink(fail_close=True), ListSink()
+    writer.add_sink("first", first)
+    writer.add_sink("second", second)
+    writer.close()
+    assert first.closed and second.closed
+    assert writer.stats("first").error == "OSError: disk full"
+
+
+def test_nothing_is_queued_after_close():
+    writer = RecordingWriter()
+    sink = ListSink()
+    writer.add_sink("sink", sink)
+    writer.close()
+    assert not writer.submit("sink", 1) and not writer.submit("unknown", 1)
+    assert sink.written == []
+
+
+def test_unknown_policy():
+    writer = RecordingWriter()
+    with pytest.raises(ValueError):
+        writer.add_sink("sink", ListSink(), policy="drop-all")
+    writer.close()
+
+
+def test_raw_frames_of_another_size_are_skipped(tmp_path):
+    path = str(tmp_path / "test.psraw")
+    writer = RecordingWriter()
+    writer.add_sink("raw", RawFrameSink(RawRecordingWriter(path, (16, 16))), policy="block")
+    frame = np.ones((16, 16), dtype=RAW_DTYPE)
+    for sequence in range(3):
+        writer.submit("raw", frame, 1.0 + sequence, sequence)
+        frame[:] += 1 # the producer reuses its buffer
+    writer.submit("raw", np.zeros((8, 8), dtype=RAW_DTYPE), 4.0, 3)
+    writer.close()
+    stats = writer.stats("raw")
+    assert stats.written == 3 and stats.skipped == 1
+    reader = RawRecordingReader(path)
+    assert reader.closed_properly and [int(frame[0, 0]) for frame in reader.frames] == [1, 2, 3]
+    del reader
+
+
+def test_video_images_are_scaled_to_the_first_size(tmp_path):
+    sink = VideoSink(str(tmp_path / "test.mp4"), 30)
+    first = sink.prepare(np.zeros((40, 60, 3), dtype=np.uint8))
+    image = np.zeros((80, 120, 3), dtype=np.uint8)
+    image[..., 0] = 255 # red
+    second = sink.prepare(image)
+    assert sink.frame_size == (60, 40) and first.shape == second.shape == (40, 60, 3)
+    assert np.all(second[..., 2] == 255) and np.all(second[..., 0] == 0) # BGR
+    sink.release(first)
+    assert sink.prepare(image) is first # the buffer is reused
+    sink.close()
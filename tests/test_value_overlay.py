@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from heatmap_geometry import HeatmapGeometry
+from value_overlay import ValueOverlay
+
+
+def overlay_for(canvas_size, rotation=0, mirror=False, frame_shape=(16, 16), interp_level=1):
+    geometry = HeatmapGeometry()
+    level = max(1, interp_level)
+    geometry.update((frame_shape[0] * level, frame_shape[1] * level), canvas_size, rotation, mirror)
+    overlay = ValueOverlay()
+    overlay.update_layout(geometry, frame_shape, interp_level)
+    return geometry, overlay
+
+
+@pytest.mark.parametrize('rotation', [0, 90, 180, 270])
+@pytest.mark.parametrize('mirror', [False, True])
+def test_labels_are_on_their_cells(rotation, mirror):
+    # Every label is where its cell is, after rotating and mirroring
+    geometry, overlay = overlay_for((517, 389), rotation, mirror)
+    cells = geometry.render(np.arange(256).reshape(16, 16, 1).repeat(3, axis=2).astype(np.uint8))
+    left, top, right, bottom = overlay.cell_boxes.T
+    assert np.array_equal(cells[top, left, 0], overlay.frame_indices)
+    assert np.array_equal(cells[bottom - 1, right - 1, 0], overlay.frame_indices)
+    assert sorted(overlay.frame_indices) == list(range(256))
+
+
+def test_interpolated_cells_are_one_label():
+    geometry, overlay = overlay_for((950, 700), 90, False, interp_level=4)
+    assert len(overlay.cell_boxes) == 16 * 16
+    assert sorted(overlay.frame_indices) == list(range(256))
+
+
+def test_only_invalidated_labels_are_drawn():
+    geometry, overlay = overlay_for((950, 700))
+    frame = np.random.default_rng(0).integers(0, 1024, size=(16, 16), dtype=np.uint16)
+    geometry.render(np.zeros((16, 16, 3), dtype=np.uint8))
+    assert overlay.glyphs is not None
+    assert overlay.draw(geometry.image, frame) is not None
+    assert overlay.labels_drawn == 256
+    assert overlay.draw(geometry.image, frame) is None
+    overlay.invalidate(tuple(overlay.cell_boxes[40]))
+    overlay.draw(geometry.image, frame)
+    assert overlay.labels_drawn == 257
+
+
+def test_text_contrasts_with_the_cell():
+    geometry, overlay = overlay_for((950, 700))
+    frame = np.full((16, 16), 888, dtype=np.uint16)
+    for background, text in ((0, 255), (255, 0)):
+        geometry.render(np.full((16, 16, 3), background, dtype=np.uint8))
+        overlay.invalidate()
+        left, top, right, bottom = overlay.draw(geometry.image, frame)
+        assert np.any(geometry.image[top:bottom, left:right] == text)
+
+
+def test_no_labels_on_small_cells():
+    geometry, overlay = overlay_for((100, 100))
+    assert overlay.glyphs is None
+    geometry.render(np.zeros((16, 16, 3), dtype=np.uint8))
+    assert overlay.draw(geometry.image, np.zeros((16, 16), dtype=np.uint16)) is None
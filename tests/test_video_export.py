@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+import pytest
+
+from auto_range import AutoRange
+from raw_recording import RAW_RECORDING_EXTENSION, RawRecordingReader, RawRecordingWriter
+from video_export import VideoExportSettings, color_ranges, export_video, resample_indices, video_size
+
+
+@pytest.fixture
+def path(tmp_path):
+    # 2 seconds at 60 frames/sec, getting brighter
+    path = str(tmp_path / ("test" + RAW_RECORDING_EXTENSION))
+    rng = np.random.default_rng(0)
+    writer = RawRecordingWriter(path, (16, 16))
+    for index in range(121):
+        frame = rng.integers(0, 50, size=(16, 16)) + index * 5
+        writer.append(frame.astype(np.uint16), timestamp=100 + index / 60)
+    writer.close()
+    return path
+
+
+def test_frames_recorded_faster_are_skipped():
+    timestamps = 10 + np.arange(61) / 60
+    assert np.array_equal(resample_indices(timestamps, 30), np.arange(0, 61, 2))
+
+
+def test_frames_recorded_slower_are_repeated():
+    timestamps = 10 + np.arange(6) / 5
+    assert np.array_equal(resample_indices(timestamps, 10), np.repeat(np.arange(6), 2)[:11])
+
+
+def test_irregular_timestamps():
+    # Output frame k shows the last frame recorded at or before k / fps
+    timestamps = np.array([0.0, 0.05, 0.31, 0.32, 0.9, 1.0])
+    assert np.array_equal(resample_indices(timestamps, 5), [0, 1, 3, 3, 3, 5])
+    assert len(resample_indices(np.zeros(0), 30)) == 0
+
+
+def test_color_ranges_follow_the_app(path):
+    reader = RawRecordingReader(path)
+    indices = resample_indices(reader.timestamps, 30)
+    ranges = color_ranges(reader, indices, VideoExportSettings())
+    auto_range = AutoRange("rolling")
+    expected = [auto_range.update(frame) for frame in reader.frames]
+    assert [tuple(ranges[k]) for k in range(len(indices))] == [expected[index] for index in indices]
+    del reader
+
+
+def test_video_size(path):
+    reader = RawRecordingReader(path)
+    assert video_size(reader, VideoExportSettings(frame_size=(400, 300))) == (300, 300)
+    assert video_size(reader, VideoExportSettings(frame_size=(10, 10))) == (0, 0)
+    del reader
+
+
+def test_export_video(path, tmp_path):
+    video_path = str(tmp_path / "test.mp4")
+    progress = []
+    settings = VideoExportSettings(fps=30, frame_size=(160, 160), interp_level=2)
+    frames = export_video(path, video_path, settings, workers=1, progress=lambda done, total: progress.append((done, total)))
+    assert frames == 61 and progress[-1] == (61, 61)
+    video = cv2.VideoCapture(video_path)
+    try:
+        assert int(video.get(cv2.CAP_PROP_FRAME_COUNT)) == 61
+        assert (video.get(cv2.CAP_PROP_FRAME_WIDTH), video.get(cv2.CAP_PROP_FRAME_HEIGHT)) == (160, 160)
+    finally:
+        video.release()
+
+
+def test_export_empty_recording(tmp_path):
+    path = str(tmp_path / ("empty" + RAW_RECORDING_EXTENSION))
+    RawRecordingWriter(path, (16, 16)).close()
+    with pytest.raises(ValueError):
+        export_video(path, str(tmp_path / "empty.mp4"))
@@ -0,0 +1,259 @@
+"""
+Draws the reading of each cell as text on top of the heatmap image.
+
+Drawing hundreds of Tk canvas text items every frame is far too slow, so the labels are drawn into
+the heatmap image itself (the same NumPy buffer that is shown on the canvas and written to the video):
+    - The digits 0-9 are rendered once per font size (with Pillow) into alpha masks, and the font
+      size is chosen once per cell size, so no text is rendered while drawing frames.
+    - A label is the masks of its digits side by side, blended into the image in black or white
+      (whichever shows up better on the cell's color). Only the pixels a digit covers are blended,
+      and all the labels are blended at once with NumPy, so there is no Python loop over the cells.
+    - Only the labels of cells whose pixels were just redrawn are drawn again ('invalidate'). The
+      heatmap is only redrawn where the readings changed (see 'frame_change_detector.py'), so on a
+      static load almost no labels are drawn.
+
+Run this file directly to compare it with drawing each label with Pillow's ImageDraw.text:
+    python value_overlay.py
+"""
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from heatmap_geometry import HeatmapGeometry
+
+
+MAX_DIGITS = 4 # raw readings go up to 1023
+LABEL_WIDTH_FRACTION = 0.9 # the widest label ('MAX_DIGITS' digits) takes at most this much of the cell width
+LABEL_HEIGHT_FRACTION = 0.5 # the digits take at most this much of the cell height
+MIN_FONT_PX = 8 # no labels on cells too small for text this size
+MAX_FONT_PX = 24 # larger cells still get labels this size (larger text is no easier to read, just slower to draw)
+DARK_TEXT_LUMINANCE = 140 # cells brighter than this (0-255) get black text, the rest white text
+FONT_FILE_NAMES = ("arial.ttf", "DejaVuSans.ttf") # tried in order before Pillow's built-in font
+
+
+class DigitGlyphs:
+
+    def __init__(self, font_px: int) -> None:
+        # Alpha masks (0-255) of the digits 0-9, all 'advance' pixels wide (centered) and 'height' pixels tall
+        self.font_px = font_px
+        font = _load_font(font_px)
+        left, top, right, bottom = font.getbbox("0123456789")
+        digit_boxes = [font.getbbox(str(digit)) for digit in range(10)]
+        # The font's own spacing between digits, or more if a digit's ink is wider than that
+        self.advance: int = max(max(box[2] - box[0] for box in digit_boxes),
+                                max(int(np.ceil(font.getlength(str(digit)))) for digit in range(10)))
+        self.height: int = bottom - top
+        self.masks = np.zeros((10, self.height, self.advance), dtype=np.uint8)
+        for digit, box in enumerate(digit_boxes):
+            mask = Image.new("L", (self.advance, self.height), 0)
+            x = (self.advance - (box[2] - box[0])) // 2 - box[0]
+            ImageDraw.Draw(mask).text((x, -top), str(digit), fill=255, font=font)
+            self.masks[digit] = np.asarray(mask)
+
+        # The pixels each digit covers (row and column in its mask), and how much (uint16, for blending)
+        self.pixel_rows: list[np.ndarray] = []
+        self.pixel_cols: list[np.ndarray] = []
+        self.coverage: list[np.ndarray] = []
+        for mask in self.masks:
+            rows, cols = np.nonzero(mask)
+            self.pixel_rows.append(rows)
+            self.pixel_cols.append(cols)
+            self.coverage.append(mask[rows, cols].astype(np.uint16))
+
+    def label_width(self, digits: int) -> int:
+        return digits * self.advance
+
+
+class ValueOverlay:
+
+    def __init__(self) -> None:
+        self._glyphs_by_font_px: dict[int, DigitGlyphs] = {} # rendered digits, per font size
+        self._font_px_by_cell_size: dict[tuple[int, int], int] = {} # chosen font size, per (width, height) of the cells
+        self.glyphs: DigitGlyphs | None = None # the digits for the current cell size, None if the cells are too small
+        self._key: tuple | None = None # (geometry rebuilds, frame shape, interpolation level) of the layout
+
+        # One entry per cell, in the order of the image (filled in by 'update_layout')
+        self.cell_boxes = np.zeros((0, 4), dtype=np.intp) # (left, top, right, bottom) pixels of each cell in the image
+        self.frame_indices = np.zeros(0, dtype=np.intp) # index of each cell in the flattened frame
+        self.needs_drawing = np.zeros(0, dtype=bool) # the cell's pixels were redrawn since its label was drawn
+        self.labels_drawn: int = 0 # labels drawn since the overlay was created (to see how many are skipped)
+
+    def update_layout(self, geometry: HeatmapGeometry, frame_shape: tuple[int, int], interp_level: int) -> bool:
+        # Find where each cell of the frame is in the heatmap image, if the geometry changed since the last call.
+        # Returns True if the layout was rebuilt (every label must then be drawn again).
+        key = (geometry.rebuilds, tuple(frame_shape), interp_level)
+        if key == self._key:
+            return False
+        self._key = key
+        level = max(1, interp_level)
+
+        # The image is split into spans of pixel rows (and columns) that come from the same row (column) of cells
+        row_starts, row_ends, row_cells = _cell_spans(geometry.row_map // level)
+        col_starts, col_ends, col_cells = _cell_spans(geometry.col_map // level)
+        rows, cols = np.meshgrid(np.arange(len(row_cells)), np.arange(len(col_cells)), indexing="ij")
+        rows, cols = rows.ravel(), cols.ravel()
+        self.cell_boxes = np.stack([col_starts[cols], row_starts[rows], col_ends[cols], row_ends[rows]], axis=1)
+        if geometry.transpose:
+            # The image's rows come from the frame's columns (see 'HeatmapGeometry.render')
+            self.frame_indices = col_cells[cols] * frame_shape[1] + row_cells[rows]
+        else:
+            self.frame_indices = row_cells[rows] * frame_shape[1] + col_cells[cols]
+        self.needs_drawing = np.ones(len(self.frame_indices), dtype=bool)
+
+        # One font size for every cell, from the smallest cell (a few cells are 1 pixel larger than the others)
+        if len(self.cell_boxes) == 0:
+            self.glyphs = None
+            return True
+        cell_size = (int(np.min(self.cell_boxes[:, 2] - self.cell_boxes[:, 0])),
+                     int(np.min(self.cell_boxes[:, 3] - self.cell_boxes[:, 1])))
+        self.glyphs = self._glyphs_for_cell_size(cell_size)
+        return True
+
+    def invalidate(self, pixel_box: tuple[int, int, int, int] | None = None):
+        # The heatmap pixels in 'pixel_box' (left, top, right, bottom), or all of them if None, were redrawn,
+        # so the labels of the cells that overlap them must be drawn again
+        if pixel_box is None:
+            self.needs_drawing[:] = True
+            return
+        left, top, right, bottom = pixel_box
+        boxes = self.cell_boxes
+        self.needs_drawing |= ((boxes[:, 0] < right) & (boxes[:, 2] > left) & (boxes[:, 1] < bottom) & (boxes[:, 3] > top))
+
+    def draw(self, image: np.ndarray, frame: np.ndarray) -> tuple[int, int, int, int] | None:
+        # Draw the labels that need drawing into 'image', with the readings of 'frame'.
+        # Returns the (left, top, right, bottom) pixels that were drawn on, or None if no labels were drawn.
+        cells = np.flatnonzero(self.needs_drawing)
+        self.needs_drawing[:] = False
+        if self.glyphs is None or len(cells) == 0:
+            return None
+        glyphs = self.glyphs
+        values = np.clip(frame.ravel()[self.frame_indices[cells]], 0, 10 ** MAX_DIGITS - 1).astype(np.intp)
+        boxes = self.cell_boxes[cells]
+        center_x = (boxes[:, 0] + boxes[:, 2]) // 2
+        center_y = (boxes[:, 1] + boxes[:, 3]) // 2
+
+        # Black text on bright cells, white text on dark ones (from the color at the center of each cell)
+        centers_rgb = image[center_y, center_x].astype(np.intp)
+        luminance = (299 * centers_rgb[:, 0] + 587 * centers_rgb[:, 1] + 114 * centers_rgb[:, 2]) // 1000
+        text_colors = np.where(luminance > DARK_TEXT_LUMINANCE, 0, 255).astype(np.uint16)
+
+        # Each label is centered on its cell. Its digits are drawn one after the other, from the most significant.
+        num_digits = np.ones(len(values), dtype=np.intp)
+        for digits in range(2, MAX_DIGITS + 1):
+            num_digits[values >= 10 ** (digits - 1)] = digits
+        x0 = center_x - num_digits * glyphs.advance // 2
+        y0 = center_y - glyphs.height // 2
+        label, slot = np.nonzero(np.arange(MAX_DIGITS)[None, :] < num_digits[:, None]) # one entry per digit drawn
+        digit = (values[label] // 10 ** (num_digits[label] - 1 - slot)) % 10
+        digit_origin = (y0[label] * image.shape[1]) + x0[label] + slot * glyphs.advance # top left pixel (flat index)
+
+        # The pixels each digit covers and how much (precomputed per glyph), moved to where the digits go
+        pixels, coverage, text = [], [], []
+        for value in range(10):
+            same_digit = np.flatnonzero(digit == value)
+            if len(same_digit) == 0:
+                continue
+            glyph_pixels = glyphs.pixel_rows[value] * image.shape[1] + glyphs.pixel_cols[value]
+            pixels.append((digit_origin[same_digit, None] + glyph_pixels[None, :]).ravel())
+            coverage.append(np.tile(glyphs.coverage[value], len(same_digit)))
+            text.append(np.repeat(text_colors[label[same_digit]], len(glyph_pixels)))
+        pixels = np.concatenate(pixels)
+        coverage = np.concatenate(coverage)[:, None]
+        text = np.concatenate(text)[:, None]
+
+        # Blend the text color into those pixels only (most of a label's box is empty),
+        # through a view of the image with one row per pixel
+        image_pixels = image.reshape(-1, 3)
+        background = image_pixels[pixels].astype(np.uint16)
+        image_pixels[pixels] = (background * (255 - coverage) + text * coverage + 127) // 255
+        self.labels_drawn += len(cells)
+        right = x0 + num_digits * glyphs.advance
+        return (int(np.min(x0)), int(np.min(y0)), int(np.max(right)), int(np.max(y0)) + glyphs.height)
+
+    def _glyphs_for_cell_size(self, cell_size: tuple[int, int]) -> DigitGlyphs | None:
+        if cell_size not in self._font_px_by_cell_size:
+            self._font_px_by_cell_size[cell_size] = self._fit_font_px(cell_size)
+        font_px = self._font_px_by_cell_size[cell_size]
+        if font_px < MIN_FONT_PX:
+            return None
+        return self._glyphs(font_px)
+
+    def _fit_font_px(self, cell_size: tuple[int, int]) -> int:
+        # Largest font size whose widest label and digits fit in the cell (0 if none does)
+        cell_width, cell_height = cell_size
+        font_px = min(MAX_FONT_PX, int(cell_height * LABEL_HEIGHT_FRACTION * 1.4)) # digits are about 0.7 of the font size tall
+        while font_px >= MIN_FONT_PX:
+            glyphs = self._glyphs(font_px)
+            if (glyphs.label_width(MAX_DIGITS) <= cell_width * LABEL_WIDTH_FRACTION
+                    and glyphs.height <= cell_height * LABEL_HEIGHT_FRACTION):
+                return font_px
+            font_px -= 1
+        return 0
+
+    def _glyphs(self, font_px: int) -> DigitGlyphs:
+        if font_px not in self._glyphs_by_font_px:
+            self._glyphs_by_font_px[font_px] = DigitGlyphs(font_px)
+        return self._glyphs_by_font_px[font_px]
+
+
+def _cell_spans(pixel_cells: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (first pixel, end pixel, cell) of each run of pixels that come from the same cell
+    boundaries = np.flatnonzero(np.diff(pixel_cells)) + 1
+    starts = np.concatenate(([0], boundaries)).astype(np.intp)
+    ends = np.concatenate((boundaries, [len(pixel_cells)])).astype(np.intp)
+    if len(pixel_cells) == 0:
+        starts, ends = starts[:0], ends[:0]
+    return starts, ends, pixel_cells[starts]
+
+
+def _load_font(font_px: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    for file_name in FONT_FILE_NAMES:
+        try:
+            return ImageFont.truetype(file_name, font_px)
+        except OSError:
+            pass
+    return ImageFont.load_default(font_px)
+
+
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 1024, size=(16, 16), dtype=np.uint16)
+    background = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+
+    def draw_with_pillow(image: np.ndarray, overlay: ValueOverlay) -> np.ndarray:
+        # One ImageDraw.text per cell
+        pil_image = Image.fromarray(image)
+        draw = ImageDraw.Draw(pil_image)
+        font = _load_font(overlay.glyphs.font_px)
+        for (left, top, right, bottom), index in zip(overlay.cell_boxes, overlay.frame_indices):
+            draw.text(((left + right) // 2, (top + bottom) // 2), str(frame.flat[index]), fill=(255, 255, 255),
+                      font=font, anchor="mm")
+        return np.asarray(pil_image)
+
+    for canvas_size in [(400, 400), (950, 700), (1920, 1010), (3840, 2050)]:
+        geometry = HeatmapGeometry()
+        geometry.update((16, 16), canvas_size, 90, False)
+        geometry.render(background)
+        overlay = ValueOverlay()
+        overlay.update_layout(geometry, (16, 16), 1)
+        if overlay.glyphs is None:
+            print(f"canvas {canvas_size[0]:4d}x{canvas_size[1]:<4d} cells too small for labels")
+            continue
+
+        def draw_all():
+            overlay.invalidate()
+            overlay.draw(geometry.image, frame)
+
+        def draw_one_cell():
+            overlay.invalidate(tuple(overlay.cell_boxes[40]))
+            overlay.draw(geometry.image, frame)
+
+        number = 20
+        pillow_time = min(timeit.repeat(lambda: draw_with_pillow(geometry.image, overlay), number=number, repeat=3)) / number
+        all_time = min(timeit.repeat(draw_all, number=number, repeat=3)) / number
+        one_time = min(timeit.repeat(draw_one_cell, number=number, repeat=3)) / number
+        print(f"canvas {canvas_size[0]:4d}x{canvas_size[1]:<4d} font {overlay.glyphs.font_px:3d} px   "
+              f"ImageDraw.text {pillow_time * 1000:6.2f} ms   glyphs: all cells {all_time * 1000:5.2f} ms, "
+              f"one cell {one_time * 1000:5.2f} ms")
@@ -0,0 +1,223 @@
+"""
+Exports a raw recording (see 'raw_recording.py') to an mp4 video of the heatmap, offline.
+
+A video recorded live is written at a fixed frame rate, whatever rate the frames actually came at, so
+the motion in it is sped up or slowed down, and encoding it competes with reading the mat. Exporting
+afterwards from the raw recording avoids both:
+    - Timing: output frame k is shown at 'k / fps' seconds, and is the last frame recorded at or before
+      that time (from the recorded timestamps). Frames recorded faster than 'fps' are skipped, and frames
+      recorded slower are repeated, so the video plays at the speed things happened.
+    - Colors: the color scale comes from the same AutoRange as the live heatmap, fed every recorded frame
+      in order (this is sequential, and cheap: one bincount per frame), so the video looks like the App did.
+    - Rendering: the output frames are split into chunks of CHUNK_FRAMES, and a pool of worker processes
+      renders them with their own HeatmapRenderContext (the same pipeline and settings as 'draw_heatmap'),
+      reading the frames straight from the memory-mapped recording.
+    - Encoding: a single writer process takes the rendered chunks, puts them back in order and encodes
+      them. Its queue holds at most WRITER_QUEUE_CHUNKS chunks, so fast workers wait for a slow encoder
+      instead of filling the memory with images.
+
+Run this file directly to export a recording with the default settings:
+    python video_export.py recording.psraw [video.mp4] [--fps 30] [--size 800x800] [--workers 4]
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+import multiprocessing
+import os
+from typing import Callable
+import cv2
+import numpy as np
+
+from auto_range import AutoRange, RangeMode
+from colormaps import ADC_LEVELS, ColormapName
+from data_types import PIXEL_DTYPE
+from heatmap_geometry import HeatmapGeometry
+from heatmap_interpolation import InterpolationMethod
+from heatmap_renderer import HeatmapRenderContext
+from raw_recording import RawRecordingReader
+
+
+DEFAULT_EXPORT_FPS = 30 # Frames/sec of exported videos
+CHUNK_FRAMES = 16 # output frames rendered by a worker at a time (and sent to the writer together)
+WRITER_QUEUE_CHUNKS = 4 # rendered chunks waiting to be encoded, before the workers wait for the writer
+
+
+@dataclass
+class VideoExportSettings:
+    # What the video looks like (the App passes its own heatmap settings, see 'draw_heatmap')
+    fps: int = DEFAULT_EXPORT_FPS
+    frame_size: tuple[int, int] = (800, 800) # (width, height) the heatmap is fitted into, in pixels
+    aspect_ratio: float = 1.0 # width/height of the heatmap cells
+    colormap: ColormapName = "inferno"
+    rotation: int = 0 # clockwise, 0/90/180/270
+    mirror: bool = False
+    interp_level: int = 1
+    interp_method: InterpolationMethod = "bicubic"
+    show_values: bool = False
+    color_range_mode: RangeMode = "rolling"
+    color_range_fixed: tuple[int, int] = (0, ADC_LEVELS - 1)
+
+
+def resample_indices(timestamps: np.ndarray, fps: float) -> np.ndarray:
+    # Index of the recorded frame shown in each output frame: output frame k is at 'k / fps' seconds from
+    # the first recorded frame, and shows the last frame recorded at or before that time
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.intp)
+    duration = float(timestamps[-1] - timestamps[0])
+    output_times = timestamps[0] + np.arange(int(duration * fps) + 1) / fps
+    return np.searchsorted(timestamps, output_times, side="right") - 1
+
+
+def color_ranges(reader: RawRecordingReader, indices: np.ndarray, settings: VideoExportSettings) -> np.ndarray:
+    # (low, high) color scale of each output frame. Every recorded frame up to the one shown is added to the
+    # auto range first, as the App would have while showing them.
+    auto_range = AutoRange(settings.color_range_mode, fixed_range=tuple(settings.color_range_fixed))
+    ranges = np.zeros((len(indices), 2), dtype=np.int64)
+    added = 0 # recorded frames added to the auto range
+    current = (0, 0)
+    for output_index, index in enumerate(indices):
+        while added <= index:
+            current = auto_range.update(reader.frames[added])
+            added += 1
+        ranges[output_index] = current
+    return ranges
+
+
+def video_size(reader: RawRecordingReader, settings: VideoExportSettings) -> tuple[int, int]:
+    # (width, height) of the heatmap image fitted into 'frame_size', as the workers will render it
+    level = max(1, settings.interp_level)
+    geometry = HeatmapGeometry(settings.aspect_ratio)
+    geometry.update((reader.frame_shape[0] * level, reader.frame_shape[1] * level), settings.frame_size,
+                    settings.rotation, settings.mirror)
+    return geometry.image_size
+
+
+def export_video(recording_path: str, video_path: str, settings: VideoExportSettings | None = None,
+                 workers: int | None = None, progress: Callable[[int, int], None] | None = None) -> int:
+    # Export the recording at 'recording_path' to 'video_path'. 'progress(frames rendered, total frames)' is
+    # called as chunks finish. Returns the number of frames in the video. Raises ValueError if the recording
+    # can't be read, and RuntimeError if the video can't be written.
+    settings = settings or VideoExportSettings()
+    reader = RawRecordingReader(recording_path)
+    if len(reader) == 0:
+        raise ValueError(f"{recording_path} has no frames")
+    indices = resample_indices(reader.timestamps, settings.fps)
+    ranges = color_ranges(reader, indices, settings)
+    size = video_size(reader, settings)
+    if 0 in size:
+        raise ValueError(f"The heatmap doesn't fit in {settings.frame_size}")
+    del reader
+    chunks = [(start, min(start + CHUNK_FRAMES, len(indices))) for start in range(0, len(indices), CHUNK_FRAMES)]
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    # "spawn" everywhere (the default on Windows), so the processes don't inherit the GUI's threads
+    context = multiprocessing.get_context("spawn")
+    writer_queue = context.Queue(WRITER_QUEUE_CHUNKS)
+    writer_result = context.Queue()
+    writer = context.Process(
+        target=process_write_video, args=(video_path, settings.fps, size, len(chunks), writer_queue, writer_result),
+        daemon=True, name="video export writer",
+    )
+    writer.start()
+    try:
+        with ProcessPoolExecutor(workers, context, initializer=_init_render_worker,
+                                 initargs=(recording_path, settings, writer_queue)) as pool:
+            # At most two chunks per worker in flight, so the writer never has many chunks to put back in order
+            pending = set()
+            next_chunk = 0
+            frames_done = 0
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                    start, end = chunks[next_chunk]
+                    pending.add(pool.submit(_render_chunk, next_chunk, indices[start:end], ranges[start:end]))
+                    next_chunk += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    frames_done += future.result() # raises the worker's error
+                if progress is not None:
+                    progress(frames_done, len(indices))
+    except BaseException:
+        writer_queue.put(None) # stop the writer without waiting for the missing chunks
+        writer.join()
+        raise
+    error = writer_result.get()
+    writer.join()
+    if error is not None:
+        raise RuntimeError(error)
+    return len(indices)
+
+
+# Worker processes: each keeps the recording open and its own render context between chunks
+_worker: tuple[RawRecordingReader, HeatmapRenderContext, VideoExportSettings, object] | None = None
+
+
+def _init_render_worker(recording_path: str, settings: VideoExportSettings, writer_queue):
+    global _worker
+    render_context = HeatmapRenderContext(settings.aspect_ratio, settings.colormap)
+    _worker = (RawRecordingReader(recording_path), render_context, settings, writer_queue)
+
+
+def _render_chunk(chunk_number: int, indices: np.ndarray, ranges: np.ndarray) -> int:
+    # Render the output frames of one chunk (BGR, what OpenCV writes) and hand them to the writer
+    reader, render_context, settings, writer_queue = _worker
+    render_context.update_geometry(reader.frame_shape, settings.frame_size, settings.rotation, settings.mirror,
+                                   settings.interp_level)
+    width, height = render_context.geometry.image_size
+    images = np.zeros((len(indices), height, width, 3), dtype=PIXEL_DTYPE)
+    for output_index, (index, (low, high)) in enumerate(zip(indices, ranges)):
+        if output_index > 0 and index == indices[output_index - 1] and low == ranges[output_index - 1][0] \
+                and high == ranges[output_index - 1][1]:
+            images[output_index] = images[output_index - 1] # the same recorded frame, repeated
+            continue
+        image = render_context.render(reader.frames[index], int(low), int(high), settings.interp_level,
+                                      settings.interp_method, settings.show_values)
+        cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=images[output_index])
+    writer_queue.put((chunk_number, images))
+    return len(indices)
+
+
+def process_write_video(video_path: str, fps: int, frame_size: tuple[int, int], chunks: int, writer_queue, writer_result):
+    # Writer process: encode the chunks in order as they arrive (they may come out of order). Puts None on
+    # 'writer_result' when done, or the error message.
+    video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size, True)
+    opened = video.isOpened() # if not, the chunks are still taken, so the workers don't wait for room in the queue
+    waiting: dict[int, np.ndarray] = {} # chunks that came before the ones ahead of them
+    next_chunk = 0
+    while next_chunk < chunks:
+        item = writer_queue.get()
+        if item is None:
+            break # the export was stopped
+        chunk_number, images = item
+        if not opened:
+            next_chunk += 1
+            continue
+        waiting[chunk_number] = images
+        while next_chunk in waiting:
+            for image in waiting.pop(next_chunk):
+                video.write(image)
+            next_chunk += 1
+    video.release()
+    writer_result.put(None if opened else f"No se pudo crear el video '{video_path}'")
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export a raw recording (.psraw) to an mp4 video of the heatmap")
+    parser.add_argument("recording")
+    parser.add_argument("video", nargs="?", help="defaults to the recording's name with .mp4")
+    parser.add_argument("--fps", type=int, default=DEFAULT_EXPORT_FPS)
+    parser.add_argument("--size", default="800x800", help="WIDTHxHEIGHT the heatmap is fitted into")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (defaults to the number of cores)")
+    parser.add_argument("--interp-level", type=int, default=1)
+    parser.add_argument("--show-values", action="store_true")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    export_settings = VideoExportSettings(fps=args.fps, frame_size=(width, height), interp_level=args.interp_level,
+                                          show_values=args.show_values)
+    output_path = args.video or os.path.splitext(args.recording)[0] + ".mp4"
+    started = time.perf_counter()
+    frames = export_video(args.recording, output_path, export_settings, args.workers,
+                          progress=lambda done, total: print(f"\r{done} / {total} frames", end="", flush=True))
+    print(f"\n{output_path}: {frames} frames ({frames / args.fps:.1f} s) in {time.perf_counter() - started:.1f} s")